@@ -25,18 +25,81 @@ class Settings(BaseSettings):
     access_token_exp_minutes: int = int(os.getenv("ACCESS_TOKEN_EXP_MINUTES", str(60 * 24)))
 
     # Local LLM (Hugging Face)
-    llm_provider: str = os.getenv("LLM_PROVIDER", "hf_local")  # hf_local | disabled
+    llm_provider: str = os.getenv("LLM_PROVIDER", "hf_local")  # hf_local | llama_cpp | disabled
 
     hf_model_id: str = os.getenv("HF_MODEL_ID", "Qwen/Qwen3-4B-Instruct-2507")
     hf_device: str = os.getenv("HF_DEVICE", "auto")  # auto | cpu | cuda
+    hf_precision: str = os.getenv("HF_PRECISION", "auto")  # auto | fp32 | bf16 | fp16 | int8 | int4
+    # Speculative decoding: a small model with the same tokenizer drafts tokens for the main one
+    hf_draft_model_id: str = os.getenv("HF_DRAFT_MODEL_ID", "")
+    hf_draft_num_tokens: int = int(os.getenv("HF_DRAFT_NUM_TOKENS", "5"))
+    # Load and warm up the model in the background on startup instead of on the first request
+    llm_preload: bool = os.getenv("LLM_PRELOAD", "0").lower() in {"1", "true", "yes"}
+
+    # llama.cpp (LLM_PROVIDER=llama_cpp): a local GGUF file, or a file from a Hugging Face repo
+    llama_model_path: str = os.getenv("LLAMA_MODEL_PATH", "")
+    llama_repo_id: str = os.getenv("LLAMA_REPO_ID", "Qwen/Qwen2.5-3B-Instruct-GGUF")
+    llama_filename: str = os.getenv("LLAMA_FILENAME", "*q4_k_m.gguf")
+    llama_n_ctx: int = int(os.getenv("LLAMA_N_CTX", "4096"))
+    llama_n_threads: int = int(os.getenv("LLAMA_N_THREADS", "0"))  # 0 = all cores
 
     # Generation params
     hf_max_new_tokens: int = int(os.getenv("HF_MAX_NEW_TOKENS", "256"))
     hf_temperature: float = float(os.getenv("HF_TEMPERATURE", "0.7"))
     hf_top_p: float = float(os.getenv("HF_TOP_P", "0.9"))
 
+    # Batching: concurrent generations collected over a short window run as one batch
+    llm_batch_max_size: int = int(os.getenv("LLM_BATCH_MAX_SIZE", "4"))
+    llm_batch_window_ms: int = int(os.getenv("LLM_BATCH_WINDOW_MS", "25"))
+
+    # Out-of-process inference: LLM_WORKERS model processes owned by this app, or a shared
+    # inference server at LLM_WORKER_ADDRESS (host:port or unix socket path)
+    llm_workers: int = int(os.getenv("LLM_WORKERS", "0"))
+    llm_worker_address: str = os.getenv("LLM_WORKER_ADDRESS", "")
+    llm_worker_timeout_seconds: int = int(os.getenv("LLM_WORKER_TIMEOUT_SECONDS", "120"))
+    llm_worker_start_timeout_seconds: int = int(os.getenv("LLM_WORKER_START_TIMEOUT_SECONDS", "600"))
+
+    # Admission control: queued generations past LLM_QUEUE_MAX get 503 (0 = unbounded);
+    # queued requests older than their deadline are dropped
+    llm_queue_max: int = int(os.getenv("LLM_QUEUE_MAX", "32"))
+    llm_chat_deadline_seconds: float = float(os.getenv("LLM_CHAT_DEADLINE_SECONDS", "60"))
+    llm_summary_deadline_seconds: float = float(os.getenv("LLM_SUMMARY_DEADLINE_SECONDS", "120"))
+
+    # Stored review summaries are regenerated in the background after this many new reviews
+    summary_refresh_min_reviews: int = int(os.getenv("SUMMARY_REFRESH_MIN_REVIEWS", "3"))
+
+    # Review summarization: "map_reduce" summarizes all reviews in token-budgeted chunks and merges
+    # the chunk summaries, "latest" puts the newest 50 reviews into a single prompt
+    summary_mode: str = os.getenv("SUMMARY_MODE", "map_reduce")  # map_reduce | latest
+    summary_chunk_tokens: int = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1500"))
+    summary_max_reviews: int = int(os.getenv("SUMMARY_MAX_REVIEWS", "5000"))
+    summary_chunk_cache_ttl_seconds: int = int(os.getenv("SUMMARY_CHUNK_CACHE_TTL_SECONDS", str(60 * 60 * 24 * 30)))
+    # Budget of the chunk summaries in the LLM cache file, separate from LLM_CACHE_MAX_MB
+    summary_chunk_cache_max_mb: int = int(os.getenv("SUMMARY_CHUNK_CACHE_MAX_MB", "256"))
+
+    # Prefix KV-cache for shared system prompt prefixes (0 disables)
+    llm_prefix_cache_mb: int = int(os.getenv("LLM_PREFIX_CACHE_MB", "1024"))
+
     # Caching
     llm_cache_ttl_seconds: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(60 * 10)))
+    # Persistent LLM cache shared by all workers (empty path keeps it in-process only)
+    llm_cache_path: str = os.getenv("LLM_CACHE_PATH", "./cache/llm_cache.sqlite3")
+    llm_cache_max_mb: int = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+    # In-process tier of the response and summary chunk caches, each
+    llm_cache_memory_mb: int = int(os.getenv("LLM_CACHE_MEMORY_MB", "64"))
+
+    # Semantic chat cache: reuse a reply for a similar question over the same candidate places
+    semantic_cache_enabled: bool = os.getenv("SEMANTIC_CACHE", "0").lower() in {"1", "true", "yes"}
+    semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+    semantic_cache_max_items: int = int(os.getenv("SEMANTIC_CACHE_MAX_ITEMS", "2048"))
+
+    # Counts of filtered place listings, cached per filter set until the catalog changes
+    places_count_cache_items: int = int(os.getenv("PLACES_COUNT_CACHE_ITEMS", "4096"))
+    # In-memory columnar copy of the catalog for filter + rating order reads
+    places_columnar: bool = os.getenv("PLACES_COLUMNAR", "0").lower() in {"1", "true", "yes"}
+
+    # Cache-Control max-age of catalog reads (clients revalidate with If-None-Match after that)
+    http_cache_max_age_seconds: int = int(os.getenv("HTTP_CACHE_MAX_AGE_SECONDS", "30"))
 
     # Logging
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
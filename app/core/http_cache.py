@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import hashlib
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+
+
+def make_etag(*parts: object) -> str:
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = f"public, max-age={settings.http_cache_max_age_seconds}"
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """A 304 response when the client already has this version, else None."""
+    header = request.headers.get("if-none-match")
+    if header and _matches(header, etag):
+        response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+        set_cache_headers(response, etag)
+        return response
+    return None
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal, engine
 from app.models.places import Place
+from app.services.geo import geohash_of
+from app.services.search import index_place_names
 
 
 def _place_to_dict(p: Place) -> dict:
@@ -14,6 +18,10 @@ def _place_to_dict(p: Place) -> dict:
         "city": p.city,
         "address": p.address,
         "description": p.description,
+        "lat": p.lat,
+        "lon": p.lon,
+        # Bulk inserts bypass the ORM flush events that fill it
+        "geohash": geohash_of(p.lat, p.lon),
     }
 
 
@@ -33,7 +41,8 @@ async def insert_places(places: list[Place]) -> int:
 
     db: Session = SessionLocal()
     try:
-        ncols = 5
+        # Bound parameters per row: the explicit values plus the column defaults
+        ncols = len(Place.__table__.columns) - 1
         if dialect == 'sqlite':
             batch_size = max(50, 999 // ncols)
         else:
@@ -43,15 +52,30 @@ async def insert_places(places: list[Place]) -> int:
             values = [_place_to_dict(p) for p in chunk]
 
             stmt = dialect_insert(Place).values(values)
-            if hasattr(stmt, "on_conflict_do_nothing"):
-                stmt = stmt.on_conflict_do_nothing(index_elements=["name", "category", "city", "address"])
+            if hasattr(stmt, "on_conflict_do_update"):
+                # Existing rows are left alone, except that missing coordinates are filled
+                # in (places imported before lat/lon existed)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["name", "category", "city", "address"],
+                    set_={
+                        "lat": stmt.excluded.lat,
+                        "lon": stmt.excluded.lon,
+                        "geohash": stmt.excluded.geohash,
+                        "updated_at": datetime.utcnow(),
+                    },
+                    where=Place.lat.is_(None) & stmt.excluded.lat.is_not(None),
+                )
 
-            res = db.execute(stmt)
+            if engine.dialect.insert_returning:
+                # Only rows actually written come back, they are indexed in the same transaction
+                inserted = db.execute(stmt.returning(Place.id, Place.name)).all()
+                index_place_names(db.connection(), inserted)
+                inserted_total += len(inserted)
+            else:
+                res = db.execute(stmt)
+                inserted_total += max(int(res.rowcount or 0), 0)
             db.commit()
 
-            if res.rowcount and res.rowcount > 0:
-                inserted_total += int(res.rowcount)
-
         return inserted_total
     finally:
         db.close()
@@ -59,3 +83,7 @@ async def insert_places(places: list[Place]) -> int:
 
 def get_places_count(db: Session) -> int:
     return int(db.scalar(select(func.count()).select_from(Place)) or 0)
+
+
+def get_located_places_count(db: Session) -> int:
+    return int(db.scalar(select(func.count()).select_from(Place).where(Place.lat.is_not(None))) or 0)
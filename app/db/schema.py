@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import Engine, inspect, text
+
+from app.db.base import Base
+
+logger = logging.getLogger(__name__)
+
+# Fill columns added to existing tables, keyed by (table, column)
+_BACKFILL = {
+    ("places", "updated_at"): "UPDATE places SET updated_at = created_at WHERE updated_at IS NULL",
+}
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Bring existing tables up to the models: create_all only creates missing tables.
+
+    Adds new columns (nullable, then backfilled) and any missing indexes.
+    """
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                ddl_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {ddl_type}"))
+                backfill = _BACKFILL.get((table.name, col.name))
+                if backfill:
+                    conn.execute(text(backfill))
+                logger.info("Added column %s.%s", table.name, col.name)
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
 from pathlib import Path
@@ -12,12 +13,16 @@ from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
 from app.core.logging_config import configure_logging
 from app.db.base import Base
+from app.db.schema import upgrade_schema
 from app.db.session import engine
 
 import app.models
 
-from app.routers import auth, users, places, reviews, recommendations, chat
+from app.routers import auth, users, places, reviews, recommendations, chat, health
 from app.parsers.geoapify_importer import import_places_on_startup
+from app.services.llm import llm
+from app.services.search import setup_search
+from app.services.summaries import summary_refresher
 
 configure_logging(log_dir=settings.log_dir, level=settings.log_level)
 logger = logging.getLogger(__name__)
@@ -44,13 +49,25 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     async def on_startup() -> None:
         Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
+        setup_search(engine)
         logger.info("DB ready")
 
+        summary_refresher.start()
+
+        if settings.llm_preload:
+            # Keep a reference so the task is not garbage-collected while the model loads
+            app.state.llm_preload_task = asyncio.create_task(llm.preload())
+
         try:
             await import_places_on_startup()
         except Exception:
             logger.exception("Places import failed")
 
+    @app.on_event("shutdown")
+    async def on_shutdown() -> None:
+        await summary_refresher.stop()
+
     @app.middleware("http")
     async def log_requests(request: Request, call_next):
         start = time.time()
@@ -69,6 +86,7 @@ def create_app() -> FastAPI:
     app.include_router(reviews.router)
     app.include_router(recommendations.router)
     app.include_router(chat.router)
+    app.include_router(health.router)
 
     static_dir = Path(__file__).resolve().parent / "static"
     if static_dir.exists():
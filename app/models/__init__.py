@@ -1,5 +1,6 @@
 from app.models.users import UserAuth, UserProfile
 from app.models.places import Place
 from app.models.reviews import Review
+from app.models.summaries import ReviewSummary
 
-__all__ = ["UserAuth", "UserProfile", "Place", "Review"]
+__all__ = ["UserAuth", "UserProfile", "Place", "Review", "ReviewSummary"]
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, Index, Integer, String, UniqueConstraint
+from sqlalchemy import DDL, DateTime, Float, Index, Integer, String, UniqueConstraint, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -19,7 +19,17 @@ class Place(Base):
     address: Mapped[str | None] = mapped_column(String(250), nullable=True)
     description: Mapped[str | None] = mapped_column(String(1000), nullable=True)
 
+    lat: Mapped[float | None] = mapped_column(Float, nullable=True)
+    lon: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Grid index for radius queries, see app.services.geo; filled from lat/lon on
+    # ORM flushes below and by app.db.crud.insert_places for bulk inserts
+    geohash: Mapped[str | None] = mapped_column(String(12), nullable=True, index=True)
+
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped on every update; drives ETags and the catalog change version
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
 
     avg_rating: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, index=True)
     reviews_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -28,5 +38,22 @@ class Place(Base):
 
     __table_args__ = (
         Index("ix_places_category_city", "category", "city"),
+        # Matches the listing order, so keyset pages are index range scans
+        Index("ix_places_rating_order", avg_rating.desc(), reviews_count.desc(), "name", "id"),
         UniqueConstraint("name", "category", "city", "address", name="uq_places_ncca"),
     )
+
+
+# Name search index on SQLite, maintained by app.services.search
+PLACES_FTS_DDL = "CREATE VIRTUAL TABLE IF NOT EXISTS places_fts USING fts5(name_norm, tokenize='unicode61')"
+
+event.listen(Place.__table__, "after_create", DDL(PLACES_FTS_DDL).execute_if(dialect="sqlite"))
+event.listen(Place.__table__, "before_drop", DDL("DROP TABLE IF EXISTS places_fts").execute_if(dialect="sqlite"))
+
+
+@event.listens_for(Place, "before_insert")
+@event.listens_for(Place, "before_update")
+def _fill_geohash(mapper, connection, target: Place) -> None:
+    from app.services.geo import geohash_of
+
+    target.geohash = geohash_of(target.lat, target.lon)
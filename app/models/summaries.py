@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ReviewSummary(Base):
+    __tablename__ = "review_summaries"
+
+    place_id: Mapped[int] = mapped_column(Integer, ForeignKey("places.id"), primary_key=True)
+    summary: Mapped[str] = mapped_column(String(4000), nullable=False)
+
+    # Place.reviews_count when the summary was generated; the gap to the current count is its staleness
+    reviews_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    generated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
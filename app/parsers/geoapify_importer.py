@@ -8,7 +8,7 @@ from aiohttp import ClientResponseError
 from fastapi import status
 
 from app.core.config import settings
-from app.db.crud import insert_places, get_places_count
+from app.db.crud import insert_places, get_located_places_count, get_places_count
 from app.db.session import SessionLocal
 from app.models.places import Place
 
@@ -150,6 +150,12 @@ async def _fetch_single_city(
         if not name or name.isdigit():
             continue
 
+        place_lat, place_lon = props.get("lat"), props.get("lon")
+        if place_lat is None or place_lon is None:
+            coords = (feature.get("geometry") or {}).get("coordinates") or []
+            if len(coords) >= 2:
+                place_lon, place_lat = coords[0], coords[1]
+
         result.append(
             Place(
                 name=name,
@@ -157,6 +163,8 @@ async def _fetch_single_city(
                 address=address,
                 city=city_name,
                 description=None,
+                lat=float(place_lat) if place_lat is not None else None,
+                lon=float(place_lon) if place_lon is not None else None,
             )
         )
 
@@ -203,18 +211,23 @@ async def import_places_on_startup() -> None:
     db = SessionLocal()
     try:
         cnt = get_places_count(db)
+        located = get_located_places_count(db) if cnt else 0
     finally:
         db.close()
 
-    if cnt > 0:
+    if cnt > 0 and located > 0:
         logger.info("Places already present (%s). Import skipped.", cnt)
         return
 
-    logger.info("No places in DB. Importing from Geoapify...")
+    if cnt > 0:
+        # Imported before coordinates were stored: refetch, insert_places fills them in
+        logger.info("Places present (%s) without coordinates. Backfilling from Geoapify...", cnt)
+    else:
+        logger.info("No places in DB. Importing from Geoapify...")
     places = await fetch_all_places()
     if not places:
         logger.warning("No places fetched. Import skipped.")
         return
 
     inserted = await insert_places(places)
-    logger.info("Places import done. Inserted ~%s rows.", inserted)
+    logger.info("Places import done. Inserted or updated ~%s rows.", inserted)
@@ -1,3 +1,3 @@
-from app.routers import auth, users, places, reviews, recommendations, chat
+from app.routers import auth, users, places, reviews, recommendations, chat, health
 
-__all__ = ["auth", "users", "places", "reviews", "recommendations", "chat"]
+__all__ = ["auth", "users", "places", "reviews", "recommendations", "chat", "health"]
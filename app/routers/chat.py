@@ -1,24 +1,32 @@
 from __future__ import annotations
 
+import json
 import logging
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import desc, select, func
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.deps import get_current_user
+from app.core.disconnect import ClientDisconnected, cancel_on_disconnect
 from app.db.session import get_db
 from app.models.places import Place
 from app.models.users import UserAuth, UserProfile
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.routers.places import _to_place_response
-from app.services.llm import llm, LLMError
+from app.services.columnar import load_places, places_catalog
+from app.services.geo import places_within
+from app.services.llm import llm, LLMError, LLMOverloaded
 from app.services.recommendations import parse_categories
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["chat"])
 
+_LLM_ERROR_REPLY = "(Ошибка LLM) Попробуйте позже или используйте /recommendations и /places."
+
 
 def _build_system_prompt(*, profile: UserProfile | None, candidates: list[Place]) -> str:
     cats = parse_categories(profile.preferred_categories) if profile else []
@@ -30,11 +38,16 @@ def _build_system_prompt(*, profile: UserProfile | None, candidates: list[Place]
         "Если информации недостаточно - задай 1 уточняющий вопрос.",
     ]
 
+    profile_lines: list[str] = []
     if profile:
         if profile.city:
-            lines.append(f"Город пользователя: {profile.city}.")
+            profile_lines.append(f"Город пользователя: {profile.city}.")
         if cats:
-            lines.append(f"Предпочтительные категории: {', '.join(cats)}.")
+            profile_lines.append(f"Предпочтительные категории: {', '.join(cats)}.")
+    if profile_lines:
+        # Blank line keeps the static rules a separate prompt prefix for the LLM prefix cache
+        lines.append("")
+        lines.extend(profile_lines)
 
     if candidates:
         lines.append("\nКандидаты мест (можно предлагать только из списка):")
@@ -48,17 +61,11 @@ def _build_system_prompt(*, profile: UserProfile | None, candidates: list[Place]
     return "\n".join(lines)
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(
-    payload: ChatRequest,
-    current: UserAuth = Depends(get_current_user),
-    db: Session = Depends(get_db),
-) -> ChatResponse:
+def _select_candidates(db: Session, *, current: UserAuth, payload: ChatRequest) -> tuple[UserProfile | None, list[Place]]:
     profile = db.get(UserProfile, current.id)
 
     profile_categories = parse_categories(profile.preferred_categories) if profile else []
 
-    city = (payload.city or "").strip() or (profile.city if profile and profile.city else None)
     if payload.category and payload.category.strip():
         categories = [payload.category.strip()]
     elif profile_categories:
@@ -66,9 +73,11 @@ async def chat(
     else:
         categories = []
 
+    near = payload.lat is not None and payload.lon is not None
     city = (payload.city or "").strip() or (profile.city if profile and profile.city else None)
     stmt = select(Place)
-    if city:
+    # A location is more precise than the city
+    if city and not near:
         stmt = stmt.where(Place.city == city.strip())
 
     if categories:
@@ -77,18 +86,98 @@ async def chat(
     if payload.min_rating is not None:
         stmt = stmt.where(Place.avg_rating >= payload.min_rating)
 
+    if near:
+        found = places_within(
+            db,
+            stmt.order_by(desc(Place.avg_rating), desc(Place.reviews_count)),
+            lat=payload.lat,
+            lon=payload.lon,
+            radius_m=payload.radius_m,
+            limit=payload.limit_places,
+        )
+        found.sort(key=lambda item: (-item[0].avg_rating, -item[0].reviews_count, item[1]))
+        return profile, [p for p, _ in found]
+
+    if settings.places_columnar:
+        ids = places_catalog.snapshot(db).matching(
+            city=city.strip() if city else None,
+            categories=[c.strip() for c in categories] or None,
+            min_rating=payload.min_rating,
+        )
+        return profile, load_places(db, ids[: payload.limit_places])
+
     candidates = list(
         db.scalars(
             stmt.order_by(desc(Place.avg_rating), desc(Place.reviews_count), Place.name).limit(payload.limit_places)
         ).all()
     )
+    return profile, candidates
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _overloaded(e: LLMOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="LLM is overloaded, try again later",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
 
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    payload: ChatRequest,
+    request: Request,
+    current: UserAuth = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> ChatResponse | Response:
+    profile, candidates = _select_candidates(db, current=current, payload=payload)
     system = _build_system_prompt(profile=profile, candidates=candidates)
 
     try:
-        reply = await llm.chat(system=system, user_message=payload.message)
+        reply = await cancel_on_disconnect(request, llm.chat(system=system, user_message=payload.message))
+    except ClientDisconnected:
+        # 499: client closed request; nobody reads this response
+        return Response(status_code=499)
+    except LLMOverloaded as e:
+        raise _overloaded(e)
     except LLMError:
         logger.exception("LLM chat error")
-        reply = "(Ошибка LLM) Попробуйте позже или используйте /recommendations и /places."
+        reply = _LLM_ERROR_REPLY
+
+    return ChatResponse(reply=reply, places=[_to_place_response(p) for p in candidates])
+
 
-    return ChatResponse(reply=reply, places=[_to_place_response(p) for p in candidates])
\ No newline at end of file
+@router.post("/chat/stream")
+async def chat_stream(
+    payload: ChatRequest,
+    current: UserAuth = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    # SSE variant of /chat: `places` first, then `token` chunks, then `done`
+    try:
+        llm.check_admission()
+    except LLMOverloaded as e:
+        raise _overloaded(e)
+
+    profile, candidates = _select_candidates(db, current=current, payload=payload)
+    system = _build_system_prompt(profile=profile, candidates=candidates)
+    places = [_to_place_response(p).model_dump(mode="json") for p in candidates]
+
+    async def events():
+        yield _sse("places", {"places": places})
+        try:
+            async for chunk in llm.chat_stream(system=system, user_message=payload.message):
+                yield _sse("token", {"text": chunk})
+        except LLMError:
+            logger.exception("LLM chat stream error")
+            yield _sse("error", {"reply": _LLM_ERROR_REPLY})
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
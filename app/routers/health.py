@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.schemas.health import CacheCounters, CacheStatsResponse, ReadinessResponse, SemanticCacheStats
+from app.services.llm import llm
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("")
+def liveness() -> dict:
+    return {"status": "ok"}
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+def readiness(response: Response, db: Session = Depends(get_db)) -> ReadinessResponse:
+    try:
+        db.execute(text("SELECT 1"))
+        db_ok = True
+    except Exception:
+        logger.exception("Readiness DB check failed")
+        db_ok = False
+
+    ready = db_ok and llm.is_ready
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(ready=ready, database=db_ok, llm=llm.status, llm_error=llm.last_error)
+
+
+@router.get("/cache", response_model=CacheStatsResponse)
+def cache_stats() -> CacheStatsResponse:
+    semantic = llm.semantic_cache
+    return CacheStatsResponse(
+        llm_responses=CacheCounters(**asdict(llm.response_cache.memory.stats())),
+        summary_chunks=CacheCounters(**asdict(llm.chunk_cache.memory.stats())),
+        semantic=SemanticCacheStats(**semantic.stats()) if semantic is not None else None,
+    )
@@ -1,12 +1,32 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select
+import base64
+import binascii
+import json
+import zlib
+from collections.abc import Iterator
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.core.fast_json import FastJSONResponse, dumps
+from app.core.http_cache import make_etag, not_modified, set_cache_headers
+from app.db.session import SessionLocal, get_db
 from app.models.places import Place
-from app.schemas.places import PlaceListResponse, PlaceResponse
+from app.schemas.places import (
+    NearbyPlaceListResponse,
+    NearbyPlaceResponse,
+    PlaceProjectionListResponse,
+    PlaceResponse,
+)
+from app.services.catalog import TOTAL_MODES, catalog_version, count_filters, count_places
+from app.services.columnar import load_places, places_catalog
+from app.services.geo import nearby_places
+from app.services.search import apply_search
 
 router = APIRouter(prefix="/places", tags=["places"])
 
@@ -22,11 +42,86 @@ def _to_place_response(place: Place) -> PlaceResponse:
         created_at=place.created_at,
         avg_rating=place.avg_rating,
         reviews_count=place.reviews_count,
+        lat=place.lat,
+        lon=place.lon,
     )
 
 
-@router.get("", response_model=PlaceListResponse)
+# Listing order; id makes it total so a cursor position is unambiguous
+_ORDER = (Place.avg_rating.desc(), Place.reviews_count.desc(), Place.name, Place.id)
+
+PLACE_FIELDS = tuple(PlaceResponse.model_fields)
+# Always selected: the cursor is built from them
+_CURSOR_FIELDS = ("avg_rating", "reviews_count", "name", "id")
+
+
+# Export lines also carry updated_at, the sync position for updated_since
+EXPORT_FIELDS = (*PLACE_FIELDS, "updated_at")
+EXPORT_BATCH_SIZE = 1000
+
+
+def _parse_fields(fields: str | None, allowed: tuple[str, ...] = PLACE_FIELDS) -> tuple[str, ...]:
+    """Fields to return (id is always included); all allowed ones by default."""
+    if not fields:
+        return allowed
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return tuple(f for f in allowed if f in requested or f == "id")
+
+
+def _place_columns(fields: tuple[str, ...]) -> list:
+    return [getattr(Place, f) for f in PLACE_FIELDS if f in fields or f in _CURSOR_FIELDS]
+
+
+def _list_payload(
+    rows: list, fields: tuple[str, ...], *, limit: int, total: int | None, exact: bool, cursor: bool
+) -> dict:
+    """PlaceProjectionListResponse as plain data from projected rows (limit + 1 of them when there may be a next page)."""
+    return {
+        "items": [{f: getattr(row, f) for f in fields} for row in rows[:limit]],
+        "total": total,
+        "total_exact": exact,
+        "next_cursor": encode_cursor(rows[limit - 1]) if cursor and len(rows) > limit else None,
+    }
+
+
+def encode_cursor(place) -> str:
+    # place: a Place or a row with its cursor fields
+    raw = json.dumps([place.avg_rating, place.reviews_count, place.name, place.id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[float, int, str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rating, count, name, place_id = json.loads(raw)
+        return float(rating), int(count), str(name), int(place_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _after_cursor(position: tuple[float, int, str, int]):
+    rating, count, name, place_id = position
+    # Rows strictly after the cursor in _ORDER (mixed directions, so no row-value comparison).
+    # The redundant leading bound lets the planner seek ix_places_rating_order instead of scanning it.
+    return and_(
+        Place.avg_rating <= rating,
+        or_(
+            Place.avg_rating < rating,
+            and_(Place.avg_rating == rating, Place.reviews_count < count),
+            and_(Place.avg_rating == rating, Place.reviews_count == count, Place.name > name),
+            and_(Place.avg_rating == rating, Place.reviews_count == count, Place.name == name, Place.id > place_id),
+        ),
+    )
+
+
+@router.get("", response_model=PlaceProjectionListResponse)
 def list_places(
+    request: Request,
     db: Session = Depends(get_db),
     q: str | None = Query(default=None, max_length=200),
     category: str | None = Query(default=None, max_length=80),
@@ -34,32 +129,187 @@ def list_places(
     min_rating: float | None = Query(default=None, ge=0, le=5),
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
-) -> PlaceListResponse:
-    stmt = select(Place)
+    cursor: str | None = Query(default=None, max_length=500, description="next_cursor of the previous page; replaces offset"),
+    total: str = Query(default="exact", pattern=f"^({'|'.join(TOTAL_MODES)})$"),
+    fields: str | None = Query(
+        default=None, max_length=500, description="comma-separated PlaceResponse fields; items only have these keys"
+    ),
+) -> PlaceProjectionListResponse | Response:
+    version = catalog_version(db)
+    etag = make_etag("places", version, request.url.query)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    selected = _parse_fields(fields)
+    position = _decode_cursor(cursor) if cursor else None
+    if settings.places_columnar and not q:
+        payload = _list_places_columnar(
+            db,
+            version,
+            fields=selected,
+            category=category,
+            city=city,
+            min_rating=min_rating,
+            limit=limit,
+            offset=offset,
+            position=position,
+            total=total,
+        )
+        return _json_response(payload, etag)
+
+    stmt = select(*_place_columns(selected))
 
+    relevance = None
     if q:
-        stmt = stmt.where(func.lower(Place.name).like(f"%{q.lower()}%"))
+        stmt, relevance = apply_search(db, stmt, q)
+        if relevance is not None and cursor:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cursor is not supported with q, use offset")
+    if category:
+        stmt = stmt.where(Place.category == category.strip())
+    if city:
+        stmt = stmt.where(Place.city == city.strip())
+    if min_rating is not None:
+        stmt = stmt.where(Place.avg_rating >= min_rating)
+
+    filters = count_filters(q=q, category=category, city=city, min_rating=min_rating)
+    count, exact = count_places(db, stmt, filters=filters, version=version, mode=total)
+    if relevance is not None:
+        page = stmt.order_by(relevance, *_ORDER).offset(offset)
+    else:
+        page = stmt.order_by(*_ORDER)
+        page = page.where(_after_cursor(position)) if position else page.offset(offset)
+    # One extra row tells whether there is a next page
+    rows = db.execute(page.limit(limit + 1)).all()
+    # Search results are ordered by relevance, which a cursor cannot encode
+    payload = _list_payload(rows, selected, limit=limit, total=count, exact=exact, cursor=relevance is None)
+    return _json_response(payload, etag)
+
+
+def _json_response(payload: dict, etag: str) -> FastJSONResponse:
+    # Rows are already plain values, so response_model validation is skipped
+    response = FastJSONResponse(payload)
+    set_cache_headers(response, etag)
+    return response
+
+
+def _list_places_columnar(
+    db: Session,
+    version: str,
+    *,
+    fields: tuple[str, ...],
+    category: str | None,
+    city: str | None,
+    min_rating: float | None,
+    limit: int,
+    offset: int,
+    position: tuple[float, int, str, int] | None,
+    total: str,
+) -> dict:
+    columns = places_catalog.snapshot(db, version)
+    filters = {
+        "city": city.strip() if city else None,
+        "categories": [category.strip()] if category else None,
+        "min_rating": min_rating,
+    }
+    ids = columns.matching(**filters)
+    # The filtered count comes for free here, so the total is always exact
+    count = None if total == "none" else len(ids)
+    ids = columns.matching(**filters, after=position) if position is not None else ids[offset:]
+    rows = load_places(db, ids[: limit + 1], columns=_place_columns(fields))
+    return _list_payload(rows, fields, limit=limit, total=count, exact=total != "none", cursor=True)
+
+
+@router.get("/nearby", response_model=NearbyPlaceListResponse)
+def list_nearby_places(
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    radius: float = Query(default=2000, gt=0, le=50000, description="meters"),
+    category: str | None = Query(default=None, max_length=80),
+    min_rating: float | None = Query(default=None, ge=0, le=5),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> NearbyPlaceListResponse:
+    stmt = select(Place)
+    if category:
+        stmt = stmt.where(Place.category == category.strip())
+    if min_rating is not None:
+        stmt = stmt.where(Place.avg_rating >= min_rating)
+
+    found = nearby_places(db, stmt, lat=lat, lon=lon, radius_m=radius, limit=limit)
+    return NearbyPlaceListResponse(
+        items=[
+            NearbyPlaceResponse(**_to_place_response(p).model_dump(), distance_m=round(d, 1)) for p, d in found
+        ]
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_places(
+    category: str | None = Query(default=None, max_length=80),
+    city: str | None = Query(default=None, max_length=120),
+    min_rating: float | None = Query(default=None, ge=0, le=5),
+    updated_since: datetime | None = Query(default=None, description="only places updated at or after this time (UTC)"),
+    fields: str | None = Query(default=None, max_length=500, description="comma-separated fields"),
+    gzip: bool = Query(default=False),
+) -> StreamingResponse:
+    """Every matching place as NDJSON, oldest update first.
+
+    Mirrors pass the updated_at of the last line they got as the next
+    updated_since; lines at that exact time come again, so upserts must be idempotent.
+    """
+    selected = _parse_fields(fields, EXPORT_FIELDS)
+    stmt = select(*[getattr(Place, f) for f in selected])
     if category:
         stmt = stmt.where(Place.category == category.strip())
     if city:
         stmt = stmt.where(Place.city == city.strip())
     if min_rating is not None:
         stmt = stmt.where(Place.avg_rating >= min_rating)
+    if updated_since is not None:
+        if updated_since.tzinfo is not None:
+            updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+        stmt = stmt.where(Place.updated_at >= updated_since)
+    # updated_at is indexed, so this is an index scan rather than a sort
+    stmt = stmt.order_by(Place.updated_at, Place.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
 
-    total = db.scalar(select(func.count()).select_from(stmt.subquery()))
-    items = list(
-        db.scalars(
-            stmt.order_by(Place.avg_rating.desc(), Place.reviews_count.desc(), Place.name)
-            .limit(limit)
-            .offset(offset)
-        ).all()
+    headers = {"Cache-Control": "no-store"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        _export_chunks(stmt, selected, compress=gzip), media_type="application/x-ndjson", headers=headers
     )
-    return PlaceListResponse(items=[_to_place_response(p) for p in items], total=int(total or 0))
+
+
+def _export_chunks(stmt, fields: tuple[str, ...], *, compress: bool) -> Iterator[bytes]:
+    # A session of its own: the request's one is closed before the body is streamed.
+    # yield_per keeps a server-side cursor open and holds one batch in memory at a time.
+    gz = zlib.compressobj(wbits=31) if compress else None
+    with SessionLocal() as db:
+        for batch in db.execute(stmt).partitions():
+            chunk = b"".join(dumps({f: getattr(row, f) for f in fields}) + b"\n" for row in batch)
+            if gz is not None:
+                chunk = gz.compress(chunk)
+                if not chunk:
+                    continue
+            yield chunk
+    if gz is not None:
+        yield gz.flush()
 
 
 @router.get("/{place_id}", response_model=PlaceResponse)
-def get_place(place_id: int, db: Session = Depends(get_db)) -> PlaceResponse:
-    place = db.get(Place, place_id)
-    if not place:
+def get_place(
+    place_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+) -> PlaceResponse | Response:
+    updated_at = db.scalar(select(Place.updated_at).where(Place.id == place_id))
+    if updated_at is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
+    etag = make_etag("place", place_id, updated_at.isoformat())
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    set_cache_headers(response, etag)
+
+    place = db.get(Place, place_id)
     return _to_place_response(place)
@@ -21,6 +21,9 @@ def get_recommendations(
     limit: int = Query(default=10, ge=1, le=50),
     city: str | None = Query(default=None, max_length=120),
     exclude_reviewed: bool = Query(default=True),
+    lat: float | None = Query(default=None, ge=-90, le=90),
+    lon: float | None = Query(default=None, ge=-180, le=180),
+    radius: float = Query(default=5000, gt=0, le=50000, description="meters, used with lat/lon"),
 ) -> RecommendationResponse:
     profile = db.get(UserProfile, current.id)
     cats = parse_categories(profile.preferred_categories if profile else "")
@@ -33,6 +36,7 @@ def get_recommendations(
         city=city_val,
         limit=limit,
         exclude_reviewed=exclude_reviewed,
+        near=(lat, lon, radius) if lat is not None and lon is not None else None,
     )
 
     items = [_to_place_response(p) for p in places]
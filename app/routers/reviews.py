@@ -1,21 +1,19 @@
 from __future__ import annotations
 
-import logging
-
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.core.deps import get_current_user
+from app.core.http_cache import make_etag, not_modified, set_cache_headers
 from app.db.session import get_db
 from app.models.places import Place
 from app.models.reviews import Review
+from app.models.summaries import ReviewSummary
 from app.models.users import UserAuth
 from app.schemas.reviews import ReviewCreate, ReviewListResponse, ReviewResponse, ReviewSummaryResponse
-from app.services.llm import llm, LLMError
 from app.services.ratings import recompute_place_rating
-
-logger = logging.getLogger(__name__)
+from app.services.summaries import build_extractive_summary, is_stale, refresh_if_stale, summary_refresher
 
 router = APIRouter(prefix="/places/{place_id}/reviews", tags=["reviews"])
 
@@ -53,6 +51,7 @@ def create_review(
     db.refresh(review)
 
     recompute_place_rating(db, place_id=place_id)
+    refresh_if_stale(db, place=place)
 
     return _to_review_response(review)
 
@@ -60,13 +59,20 @@ def create_review(
 @router.get("", response_model=ReviewListResponse)
 def list_reviews(
     place_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(default=50, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
-) -> ReviewListResponse:
-    place = db.get(Place, place_id)
-    if not place:
+) -> ReviewListResponse | Response:
+    # A new review recomputes the place's rating, which bumps its updated_at
+    updated_at = db.scalar(select(Place.updated_at).where(Place.id == place_id))
+    if updated_at is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
+    etag = make_etag("reviews", place_id, updated_at.isoformat(), request.url.query)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    set_cache_headers(response, etag)
 
     stmt = (
         select(Review)
@@ -79,30 +85,24 @@ def list_reviews(
 
 
 @router.get("/summary", response_model=ReviewSummaryResponse)
-async def summarize_reviews(
-    place_id: int,
-    db: Session = Depends(get_db),
-) -> ReviewSummaryResponse:
+def summarize_reviews(place_id: int, db: Session = Depends(get_db)) -> ReviewSummaryResponse:
+    # Sync on purpose: the DB reads and the extractive ranking run in the threadpool, off the event loop
     place = db.get(Place, place_id)
     if not place:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
 
-    reviews = list(
-        db.scalars(
-            select(Review)
-            .where(Review.place_id == place_id)
-            .order_by(Review.created_at.desc())
-            .limit(50)
-        ).all()
-    )
-    texts = [r.text for r in reviews if r.text]
-    if not texts:
+    stored = db.get(ReviewSummary, place_id)
+    if stored is not None:
+        stale = is_stale(stored, place)
+        if stale:
+            summary_refresher.enqueue(place_id)
+        return ReviewSummaryResponse(
+            place_id=place_id, summary=stored.summary, generated_at=stored.generated_at, stale=stale
+        )
+
+    # Nothing stored yet: answer instantly with the extractive summary, the LLM one is generated in the background
+    summary = build_extractive_summary(db, place_id=place_id)
+    if summary is None:
         return ReviewSummaryResponse(place_id=place_id, summary="Нет текстовых отзывов.")
-
-    try:
-        summary = await llm.summarize_reviews(place_name=place.name, reviews=texts)
-    except LLMError:
-        logger.exception("LLM summary error")
-        summary = "(Ошибка LLM при суммаризации)"
-
-    return ReviewSummaryResponse(place_id=place_id, summary=summary)
+    summary_refresher.enqueue(place_id)
+    return ReviewSummaryResponse(place_id=place_id, summary=summary, source="extractive")
@@ -11,6 +11,10 @@ class ChatRequest(BaseModel):
     category: str | None = None
     min_rating: float | None = None
     limit_places: int = Field(default=5, ge=1, le=20)
+    # User location: candidates come from this radius instead of the city
+    lat: float | None = Field(default=None, ge=-90, le=90)
+    lon: float | None = Field(default=None, ge=-180, le=180)
+    radius_m: float = Field(default=3000, gt=0, le=50000)
 
 
 class ChatResponse(BaseModel):
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    database: bool
+    llm: str
+    llm_error: str | None = None
+
+
+class SemanticCacheStats(BaseModel):
+    threshold: float
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class CacheCounters(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    items: int
+    bytes: int
+    max_bytes: int | None = None
+
+
+class CacheStatsResponse(BaseModel):
+    # In-process tiers of the LLM response caches
+    llm_responses: CacheCounters
+    summary_chunks: CacheCounters
+    # None when SEMANTIC_CACHE is off
+    semantic: SemanticCacheStats | None = None
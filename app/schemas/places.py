@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, create_model
 
 
 class PlaceResponse(BaseModel):
@@ -15,8 +15,35 @@ class PlaceResponse(BaseModel):
     created_at: datetime
     avg_rating: float
     reviews_count: int
+    lat: float | None = None
+    lon: float | None = None
 
 
 class PlaceListResponse(BaseModel):
     items: list[PlaceResponse]
-    total: int
+    # None with total=none
+    total: int | None
+    # False when total is an estimate
+    total_exact: bool = True
+    # Pass as ?cursor= to get the next page; None on the last page
+    next_cursor: str | None = None
+
+
+# Derived from PlaceResponse so the two cannot drift apart: every field, optional
+PlaceProjection = create_model(
+    "PlaceProjection",
+    __doc__="A PlaceResponse of GET /places; with ?fields= only the requested keys are present.",
+    **{name: (f.annotation | None, None) for name, f in PlaceResponse.model_fields.items()},
+)
+
+
+class PlaceProjectionListResponse(PlaceListResponse):
+    items: list[PlaceProjection]
+
+
+class NearbyPlaceResponse(PlaceResponse):
+    distance_m: float
+
+
+class NearbyPlaceListResponse(BaseModel):
+    items: list[NearbyPlaceResponse]
@@ -27,3 +27,8 @@ class ReviewListResponse(BaseModel):
 class ReviewSummaryResponse(BaseModel):
     place_id: int
     summary: str
+    generated_at: datetime | None = None
+    # True while a refresh for newer reviews is pending
+    stale: bool = False
+    # "extractive" while the LLM summary is not available yet
+    source: str = "llm"
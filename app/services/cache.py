@@ -1,37 +1,325 @@
 from __future__ import annotations
 
+import logging
+import os
+import sqlite3
+import sys
+import threading
 import time
-from dataclasses import dataclass
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, replace
+from typing import Generic, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def _sizeof(key: object, value: object) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
 
 
 @dataclass
-class _Entry:
-    value: str
-    expires_at: float
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    items: int = 0
+    bytes: int = 0
+    max_bytes: int | None = None
 
 
-class TTLCache:
+class LRUCache(Generic[K, V]):
+    """Thread-safe LRU cache bounded by bytes and/or items, with an optional TTL.
 
-    def __init__(self, ttl_seconds: int = 600, max_items: int = 512):
-        self.ttl_seconds = ttl_seconds
+    Lookups, inserts and evictions are O(1) on OrderedDicts. All entries share
+    one TTL, so write order is expiry order: every call pops at most
+    sweep_batch expired entries from the front of the write queue, which
+    reclaims memory of keys that are never read again at amortized O(1) cost.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int | None = None,
+        max_items: int | None = None,
+        ttl_seconds: float | None = None,
+        sizeof: Callable[[K, V], int] = _sizeof,
+        sweep_batch: int = 8,
+    ) -> None:
+        self.max_bytes = max_bytes
         self.max_items = max_items
-        self._data: dict[str, _Entry] = {}
+        self.ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._sweep_batch = sweep_batch
+        self._lock = threading.Lock()
+        # Recency order: least recently used first; values are (value, size)
+        self._data: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        # Write order with expiry times, only maintained with a TTL
+        self._expiry: OrderedDict[K, float] = OrderedDict()
+        self._bytes = 0
+        self._stats = CacheStats(max_bytes=max_bytes)
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            ent = self._data.get(key)
+            if ent is None:
+                self._stats.misses += 1
+                return default
+            if self.ttl_seconds is not None and self._expiry[key] <= now:
+                self._remove(key)
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return ent[0]
+
+    def set(self, key: K, value: V) -> None:
+        size = self._sizeof(key, value)
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            if key in self._data:
+                self._remove(key)
+            # Too large to keep: the stale value is dropped, the new one is not stored
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = (value, size)
+            self._bytes += size
+            if self.ttl_seconds is not None:
+                self._expiry[key] = now + self.ttl_seconds
+            while self._data and (
+                (self.max_bytes is not None and self._bytes > self.max_bytes)
+                or (self.max_items is not None and len(self._data) > self.max_items)
+            ):
+                self._remove(next(iter(self._data)))
+                self._stats.evictions += 1
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            ent = self._data.get(key)
+            if ent is None:
+                return default
+            self._remove(key)
+            return ent[0]
+
+    def _remove(self, key: K) -> None:
+        _, size = self._data.pop(key)
+        self._expiry.pop(key, None)
+        self._bytes -= size
+
+    def _sweep(self, now: float) -> None:
+        for _ in range(self._sweep_batch):
+            if not self._expiry:
+                return
+            key, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                return
+            self._remove(key)
+            self._stats.expirations += 1
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return replace(self._stats, items=len(self._data), bytes=self._bytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+            self._bytes = 0
+
+
+class SQLiteCache:
+    """Disk-backed TTL cache shared by every process that opens the same file.
+
+    WAL mode lets readers and a writer work concurrently across uvicorn
+    workers; the least recently read entries are evicted past max_bytes.
+    Each cache keeps its entries in its own table with its own budget, and
+    triggers keep the table's byte total in cache_usage, so a write only
+    scans entries when the cache is over budget. SQLite errors (a locked or
+    unwritable file) are logged and treated as misses and skipped writes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        table: str = "cache_entries",
+        ttl_seconds: int = 600,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table!r}")
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        t = self.table
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {t} ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{t}_accessed ON {t} (accessed_at)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{t}_expires ON {t} (expires_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_usage (name TEXT PRIMARY KEY, bytes INTEGER NOT NULL)")
+            if conn.execute("SELECT 1 FROM cache_usage WHERE name = ?", (t,)).fetchone() is None:
+                # Seeds the total of a table created before the triggers existed
+                conn.execute(
+                    f"INSERT INTO cache_usage (name, bytes) SELECT ?, COALESCE(SUM(size), 0) FROM {t}", (t,)
+                )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {t}_usage_insert AFTER INSERT ON {t} BEGIN"
+                f" UPDATE cache_usage SET bytes = bytes + new.size WHERE name = '{t}'; END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {t}_usage_update AFTER UPDATE OF size ON {t} BEGIN"
+                f" UPDATE cache_usage SET bytes = bytes + new.size - old.size WHERE name = '{t}'; END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {t}_usage_delete AFTER DELETE ON {t} BEGIN"
+                f" UPDATE cache_usage SET bytes = bytes - old.size WHERE name = '{t}'; END"
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.close()
+            raise
+        self._local.conn = conn
+        return conn
 
     def get(self, key: str) -> str | None:
+        try:
+            return self._get(key)
+        except (sqlite3.Error, OSError) as e:
+            # The disk tier is best effort: a locked or unwritable file is a miss
+            logger.warning("LLM disk cache read failed: %s", e)
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        try:
+            self._set(key, value)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("LLM disk cache write failed: %s", e)
+
+    def _get(self, key: str) -> str | None:
         now = time.time()
-        ent = self._data.get(key)
-        if not ent:
+        conn = self._conn()
+        row = conn.execute(f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
             return None
-        if ent.expires_at < now:
-            self._data.pop(key, None)
+        value, expires_at = row
+        if expires_at < now:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ? AND expires_at < ?", (key, now))
             return None
-        return ent.value
+        conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
 
-    def set(self, key: str, value: str) -> None:
+    def _set(self, key: str, value: str) -> None:
         now = time.time()
-        if len(self._data) >= self.max_items and key not in self._data:
-            self._data.pop(next(iter(self._data)), None)
-        self._data[key] = _Entry(value=value, expires_at=now + self.ttl_seconds)
+        size = len(key) + len(value.encode("utf-8"))
+        conn = self._conn()
+        if size > self.max_bytes:
+            # Too large to keep: the stale value is dropped, the new one is not stored
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # An upsert (not INSERT OR REPLACE) so the update trigger sees the old size
+            conn.execute(
+                f"INSERT INTO {self.table} (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size,"
+                " expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, value, size, now + self.ttl_seconds, now),
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def total_bytes(self) -> int:
+        row = self._conn().execute("SELECT bytes FROM cache_usage WHERE name = ?", (self.table,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        # Index range scan: only the expired entries are visited
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+
+        freed = 0
+        victims: list[str] = []
+        for key, size in conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at"):
+            victims.append(key)
+            freed += int(size)
+            if freed >= excess:
+                break
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k in victims])
+
+    def clear(self) -> None:
+        try:
+            self._conn().execute(f"DELETE FROM {self.table}")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("LLM disk cache clear failed: %s", e)
+
+
+class TieredCache:
+    """In-process LRUCache in front of a shared persistent cache."""
+
+    def __init__(self, memory: LRUCache[str, str], disk: SQLiteCache | None = None) -> None:
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> str | None:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
 
     def clear(self) -> None:
-        self._data.clear()
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.places import Place
+from app.services.cache import LRUCache
+from app.services.search import normalize
+
+logger = logging.getLogger(__name__)
+
+TOTAL_MODES = ("exact", "estimate", "none")
+
+# Normalized filters -> (catalog version, count)
+_counts: LRUCache[tuple, tuple[str, int]] = LRUCache(max_items=settings.places_count_cache_items)
+
+
+def catalog_version(db: Session) -> str:
+    """Changes whenever a place is inserted, updated (e.g. its rating after a new review) or deleted.
+
+    Single-aggregate subqueries: the maxima are answered from indexes, the
+    row count (which is what catches a deleted place that was not the
+    newest one) from the smallest index.
+    """
+    updated, max_id, count = db.execute(
+        select(
+            select(func.max(Place.updated_at)).scalar_subquery(),
+            select(func.max(Place.id)).scalar_subquery(),
+            select(func.count()).select_from(Place).scalar_subquery(),
+        )
+    ).one()
+    stamp = updated.isoformat() if updated is not None else "0"
+    return f"{stamp}-{max_id or 0}-{count}"
+
+
+def count_filters(
+    *, q: str | None, category: str | None, city: str | None, min_rating: float | None
+) -> tuple:
+    return (
+        " ".join(normalize(q).split()) if q else None,
+        category.strip() if category else None,
+        city.strip() if city else None,
+        min_rating,
+    )
+
+
+def _planner_estimate(db: Session, stmt: Select) -> int | None:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = stmt.compile(dialect=bind.dialect)
+    try:
+        # A failed statement aborts the whole Postgres transaction; the savepoint
+        # keeps the session usable for the exact count that follows
+        with db.begin_nested():
+            plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        logger.exception("Planner row estimate failed")
+        return None
+
+
+def count_places(db: Session, stmt: Select, *, filters: tuple, version: str, mode: str) -> tuple[int | None, bool]:
+    """Total rows of the filtered stmt as (total, exact).
+
+    exact: cached per filters until the catalog version changes.
+    estimate: a cached count from an older version or the planner's row
+    estimate (Postgres) when available, else the exact count.
+    none: no count at all.
+    """
+    if mode == "none":
+        return None, False
+
+    cached = _counts.get(filters)
+    if cached is not None and cached[0] == version:
+        return cached[1], True
+    if mode == "estimate":
+        if cached is not None:
+            return cached[1], False
+        estimate = _planner_estimate(db, stmt)
+        if estimate is not None:
+            return estimate, False
+
+    total = int(db.scalar(select(func.count()).select_from(stmt.subquery())) or 0)
+    _counts.set(filters, (version, total))
+    return total, True
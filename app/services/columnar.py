@@ -0,0 +1,230 @@
+"""Read-side copy of the places catalog as NumPy columns.
+
+Filters (city, category, rating) and the listing order (rating desc, reviews
+desc, name, id) are answered in memory: city and category are dictionary
+encoded, the order is precomputed once per catalog version. Only the rows of
+the requested page are read from the database, by primary key.
+
+The copy follows catalog_version: on a change only places updated since the
+last refresh (and new ids) are read and merged in; if the row count or the
+sum of ids no longer match (deleted places), it falls back to a full reload.
+"""
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.places import Place
+from app.services.catalog import catalog_version
+
+
+@dataclass(frozen=True)
+class PlaceColumns:
+    version: str | None
+    ids: np.ndarray
+    rating: np.ndarray
+    reviews: np.ndarray
+    city: np.ndarray
+    category: np.ndarray
+    name: np.ndarray
+    # Position of each name among names_sorted; compares like the names (code point order)
+    name_rank: np.ndarray
+    names_sorted: np.ndarray
+    cities: dict[str, int]
+    categories: dict[str, int]
+    # Row indexes in listing order
+    order: np.ndarray
+    rows: dict[int, int]
+    since: datetime | None
+
+    @classmethod
+    def empty(cls) -> PlaceColumns:
+        return cls(
+            version=None,
+            ids=np.zeros(0, dtype=np.int64),
+            rating=np.zeros(0, dtype=np.float64),
+            reviews=np.zeros(0, dtype=np.int64),
+            city=np.zeros(0, dtype=np.int32),
+            category=np.zeros(0, dtype=np.int32),
+            name=np.zeros(0, dtype=object),
+            name_rank=np.zeros(0, dtype=np.int64),
+            names_sorted=np.zeros(0, dtype=object),
+            cities={},
+            categories={},
+            order=np.zeros(0, dtype=np.int64),
+            rows={},
+            since=None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def matching(
+        self,
+        *,
+        city: str | None = None,
+        categories: Iterable[str] | None = None,
+        min_rating: float | None = None,
+        exclude_ids: Iterable[int] | None = None,
+        after: tuple[float, int, str, int] | None = None,
+    ) -> np.ndarray:
+        """Ids of matching places in listing order; after is a (rating, reviews, name, id) cursor position."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        if city is not None:
+            code = self.cities.get(city)
+            mask &= self.city == (-1 if code is None else code)
+        if categories is not None:
+            codes = [self.categories[c] for c in categories if c in self.categories]
+            mask &= np.isin(self.category, codes)
+        if min_rating is not None:
+            mask &= self.rating >= min_rating
+        if exclude_ids is not None:
+            mask &= ~np.isin(self.ids, np.fromiter(exclude_ids, dtype=np.int64))
+        if after is not None:
+            mask &= self._after(*after)
+        return self.ids[self.order[mask[self.order]]]
+
+    def _after(self, rating: float, reviews: int, name: str, place_id: int) -> np.ndarray:
+        lo = int(np.searchsorted(self.names_sorted, name, side="left"))
+        hi = int(np.searchsorted(self.names_sorted, name, side="right"))
+        name_gt = self.name_rank >= hi
+        name_eq = (self.name_rank >= lo) & (self.name_rank < hi)
+        same_rating = self.rating == rating
+        same_reviews = same_rating & (self.reviews == reviews)
+        return (
+            (self.rating < rating)
+            | (same_rating & (self.reviews < reviews))
+            | (same_reviews & name_gt)
+            | (same_reviews & name_eq & (self.ids > place_id))
+        )
+
+
+def _merge(prev: PlaceColumns, rows: list, version: str) -> PlaceColumns:
+    ids, rating, reviews = prev.ids.copy(), prev.rating.copy(), prev.reviews.copy()
+    city, category, name = prev.city.copy(), prev.category.copy(), prev.name.copy()
+    cities, categories, positions = dict(prev.cities), dict(prev.categories), dict(prev.rows)
+    since = prev.since
+    names_changed = False
+    new = []
+
+    for r in rows:
+        since = r.updated_at if since is None or r.updated_at > since else since
+        i = positions.get(r.id)
+        if i is None:
+            new.append(r)
+            continue
+        rating[i] = r.avg_rating
+        reviews[i] = r.reviews_count
+        city[i] = cities.setdefault(r.city, len(cities))
+        category[i] = categories.setdefault(r.category, len(categories))
+        if name[i] != r.name:
+            name[i] = r.name
+            names_changed = True
+
+    if new:
+        start = len(ids)
+        ids = np.concatenate([ids, np.fromiter((r.id for r in new), dtype=np.int64, count=len(new))])
+        rating = np.concatenate([rating, np.fromiter((r.avg_rating for r in new), dtype=np.float64, count=len(new))])
+        reviews = np.concatenate([reviews, np.fromiter((r.reviews_count for r in new), dtype=np.int64, count=len(new))])
+        city = np.concatenate(
+            [city, np.fromiter((cities.setdefault(r.city, len(cities)) for r in new), dtype=np.int32, count=len(new))]
+        )
+        category = np.concatenate(
+            [
+                category,
+                np.fromiter(
+                    (categories.setdefault(r.category, len(categories)) for r in new), dtype=np.int32, count=len(new)
+                ),
+            ]
+        )
+        added = np.empty(len(new), dtype=object)
+        added[:] = [r.name for r in new]
+        name = np.concatenate([name, added])
+        positions.update((r.id, start + k) for k, r in enumerate(new))
+        names_changed = True
+
+    if names_changed:
+        names_sorted, name_rank = np.unique(name, return_inverse=True)
+    else:
+        names_sorted, name_rank = prev.names_sorted, prev.name_rank
+
+    # lexsort sorts by the last key first
+    order = np.lexsort((ids, name_rank, -reviews, -rating))
+    return PlaceColumns(
+        version=version,
+        ids=ids,
+        rating=rating,
+        reviews=reviews,
+        city=city,
+        category=category,
+        name=name,
+        name_rank=name_rank,
+        names_sorted=names_sorted,
+        cities=cities,
+        categories=categories,
+        order=order,
+        rows=positions,
+        since=since,
+    )
+
+
+class ColumnarCatalog:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._columns = PlaceColumns.empty()
+
+    def snapshot(self, db: Session, version: str | None = None) -> PlaceColumns:
+        """Columns as of the current catalog version; refreshes them first if the catalog changed."""
+        version = version or catalog_version(db)
+        columns = self._columns
+        if columns.version == version:
+            return columns
+        with self._lock:
+            columns = self._columns
+            if columns.version != version:
+                columns = self._refresh(db, columns, version)
+                self._columns = columns
+            return columns
+
+    def _refresh(self, db: Session, prev: PlaceColumns, version: str) -> PlaceColumns:
+        stmt = select(
+            Place.id, Place.name, Place.category, Place.city, Place.avg_rating, Place.reviews_count, Place.updated_at
+        )
+        if prev.since is not None:
+            # >=: rows updated within the same timestamp as the last refresh are read again
+            max_id = int(prev.ids.max()) if len(prev) else 0
+            changed = stmt.where(or_(Place.updated_at >= prev.since, Place.id > max_id))
+            columns = _merge(prev, db.execute(changed).all(), version)
+            count, id_sum = db.execute(select(func.count(), func.coalesce(func.sum(Place.id), 0))).one()
+            if (count, id_sum) == (len(columns), int(columns.ids.sum())):
+                return columns
+        return _merge(PlaceColumns.empty(), db.execute(stmt).all(), version)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._columns = PlaceColumns.empty()
+
+
+def load_places(db: Session, ids: Iterable[int], *, columns: Sequence | None = None) -> list:
+    """Places by id, in the given order; ids deleted meanwhile are skipped.
+
+    With columns (which must include Place.id) returns rows of just those columns.
+    """
+    ids = [int(i) for i in ids]
+    if not ids:
+        return []
+    if columns is None:
+        found = db.scalars(select(Place).where(Place.id.in_(ids)))
+    else:
+        found = db.execute(select(*columns).where(Place.id.in_(ids)))
+    by_id = {p.id: p for p in found}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+places_catalog = ColumnarCatalog()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import math
+import re
+
+import numpy as np
+
+# Enough to rank a few thousand reviews in milliseconds
+MAX_SENTENCES = 2000
+
+_SENTENCE_RE = re.compile(r"[^.!?…\n]+[.!?…]*")
+_WORD_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "and the for with that this was are "
+    "все всё это как так что чтобы если или для при про над под без его она они оно мне меня нам нас вам вас "
+    "был была было были быть есть очень тут там где когда уже еще ещё тоже только даже просто один одна".split()
+)
+
+
+def _split_sentences(text: str) -> list[str]:
+    out = []
+    for m in _SENTENCE_RE.finditer(text):
+        s = m.group(0).strip()
+        if len(s) >= 15:
+            out.append(s)
+    return out
+
+
+def _tokens(sentence: str) -> list[str]:
+    words = _WORD_RE.findall(sentence.casefold().replace("ё", "е"))
+    return [w for w in words if len(w) > 2 and not w.isdigit() and w not in _STOPWORDS]
+
+
+def rank_sentences(sentences: list[str]) -> np.ndarray:
+    """Score sentences by TF-IDF cosine centrality: mean similarity to all other sentences.
+
+    Works on the (sentence, term) pairs only, so memory is O(words) rather
+    than sentences x vocabulary.
+    """
+    n = len(sentences)
+    if n == 0:
+        return np.zeros(0)
+
+    vocab: dict[str, int] = {}
+    rows: list[int] = []
+    cols: list[int] = []
+    for i, s in enumerate(sentences):
+        for w in _tokens(s):
+            rows.append(i)
+            cols.append(vocab.setdefault(w, len(vocab)))
+    if not vocab:
+        return np.zeros(n)
+
+    v = len(vocab)
+    pairs, tf = np.unique(np.asarray(rows, dtype=np.int64) * v + np.asarray(cols, dtype=np.int64), return_counts=True)
+    r, c = pairs // v, pairs % v
+    df = np.bincount(c, minlength=v)
+    idf = np.log((1 + n) / (1 + df)) + 1.0
+    w = tf / np.maximum(np.bincount(r, weights=tf, minlength=n), 1.0)[r] * idf[c]
+    w /= np.maximum(np.sqrt(np.bincount(r, weights=w * w, minlength=n)), 1e-9)[r]
+
+    # Sum of cosine similarities to every sentence equals a dot product with the summed vectors
+    totals = np.bincount(c, weights=w, minlength=v)
+    centrality = (np.bincount(r, weights=w * totals[c], minlength=n) - 1.0) / max(1, n - 1)
+    # Very short sentences are rarely informative on their own
+    lengths = np.fromiter((len(s) for s in sentences), dtype=np.float64, count=n)
+    return centrality * np.minimum(1.0, lengths / 40.0)
+
+
+def _pick(sentences: list[str], scores: np.ndarray, k: int, exclude: set[str]) -> list[str]:
+    picked: list[str] = []
+    seen: list[set[str]] = [set(_tokens(s)) for s in exclude]
+    for i in np.argsort(-scores, kind="stable"):
+        if len(picked) >= k or scores[i] <= 0:
+            break
+        s = sentences[i]
+        words = set(_tokens(s))
+        # Skip near-duplicates of what was already picked
+        if any(len(words & other) > 0.6 * max(1, min(len(words), len(other))) for other in seen):
+            continue
+        picked.append(s)
+        seen.append(words)
+    return picked
+
+
+def rating_highlights(counts: dict[int, int]) -> list[str]:
+    total = sum(counts.values())
+    if total == 0:
+        return []
+    avg = sum(r * c for r, c in counts.items()) / total
+    lines = [f"Средняя оценка {avg:.1f} из 5 по {total} отзывам."]
+    lines.append("Оценки: " + ", ".join(f"{r}★ — {counts.get(r, 0)}" for r in range(5, 0, -1)) + ".")
+    positive = (counts.get(4, 0) + counts.get(5, 0)) / total
+    negative = (counts.get(1, 0) + counts.get(2, 0)) / total
+    lines.append(f"Довольны {math.floor(positive * 100 + 0.5)}%, недовольны {math.floor(negative * 100 + 0.5)}%.")
+    return lines
+
+
+def extractive_summary(
+    reviews: list[tuple[int, str]],
+    *,
+    rating_counts: dict[int, int] | None = None,
+    max_sentences: int = 5,
+) -> str:
+    """Instant summary without the LLM: rating highlights plus the most central review sentences.
+
+    reviews are (rating, text) pairs, newest first.
+    """
+    sentences: list[str] = []
+    ratings: list[int] = []
+    for rating, text in reviews:
+        for s in _split_sentences(text or ""):
+            sentences.append(s)
+            ratings.append(rating)
+        if len(sentences) >= MAX_SENTENCES:
+            break
+    sentences, ratings = sentences[:MAX_SENTENCES], ratings[:MAX_SENTENCES]
+
+    if rating_counts is None:
+        rating_counts = {}
+        for rating, _ in reviews:
+            rating_counts[rating] = rating_counts.get(rating, 0) + 1
+    lines = rating_highlights(rating_counts)
+
+    if sentences:
+        scores = rank_sentences(sentences)
+        r = np.asarray(ratings)
+        top = _pick(sentences, scores, max_sentences, set())
+        pros = _pick(sentences, np.where(r >= 4, scores, 0.0), 1, set(top))
+        cons = _pick(sentences, np.where(r <= 2, scores, 0.0), 1, set(top) | set(pros))
+        if top:
+            lines.append("")
+            lines.append("Чаще всего пишут:")
+            lines.extend(f"- {s}" for s in top)
+        if pros:
+            lines.append(f"Хвалят: {pros[0]}")
+        if cons:
+            lines.append(f"Критикуют: {cons[0]}")
+
+    return "\n".join(lines)
@@ -0,0 +1,157 @@
+"""Geohash grid index and radius search for places.
+
+Each place with coordinates stores a geohash; a radius query is pruned to the
+geohash cells covering its bounding box (index range scans), then to the box
+itself, and finally filtered and sorted by exact haversine distance.
+"""
+from __future__ import annotations
+
+import math
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.orm import Session
+
+from app.models.places import Place
+
+EARTH_RADIUS_M = 6_371_000.0
+GEOHASH_PRECISION = 9
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# More cells give a tighter cover but a longer OR of range conditions
+_MAX_COVER_CELLS = 12
+# Smallest page read by places_within
+_MIN_PAGE = 50
+
+
+def encode_geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    out: list[str] = []
+    bits = 0
+    value = 0
+    even = True
+    while len(out) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value *= 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value *= 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(out)
+
+
+def geohash_of(lat: float | None, lon: float | None) -> str | None:
+    return encode_geohash(lat, lon) if lat is not None and lon is not None else None
+
+
+def _cell_size(precision: int) -> tuple[float, float]:
+    # (height, width) in degrees; longitude gets the extra bit of odd precisions
+    total = 5 * precision
+    return 180.0 / 2 ** (total // 2), 360.0 / 2 ** (total - total // 2)
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_m: float) -> tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) containing the circle."""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat)))
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), max(-180.0, lon - dlon), min(180.0, lon + dlon)
+
+
+def covering_prefixes(box: tuple[float, float, float, float]) -> list[str]:
+    """Geohash prefixes whose cells cover the box, at the finest precision with few cells."""
+    min_lat, max_lat, min_lon, max_lon = box
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        # Geohash cells are aligned to (-90, -180)
+        first_row, last_row = math.floor((min_lat + 90) / height), math.floor((max_lat + 90) / height)
+        first_col, last_col = math.floor((min_lon + 180) / width), math.floor((max_lon + 180) / width)
+        if (last_row - first_row + 1) * (last_col - first_col + 1) > _MAX_COVER_CELLS:
+            continue
+        cells = set()
+        for r in range(first_row, last_row + 1):
+            for c in range(first_col, last_col + 1):
+                # Any point inside a cell encodes to its prefix; use the center, clamped to the globe
+                cell_lat = min(89.999999, (r + 0.5) * height - 90)
+                cell_lon = min(179.999999, (c + 0.5) * width - 180)
+                cells.add(encode_geohash(cell_lat, cell_lon, precision))
+        return sorted(cells)
+    return [""]
+
+
+def within_box(stmt: Select, lat: float, lon: float, radius_m: float) -> Select:
+    """Prune stmt to places that may lie within radius_m; callers finish with haversine_m."""
+    box = bounding_box(lat, lon, radius_m)
+    prefixes = [p for p in covering_prefixes(box) if p]
+    if prefixes:
+        # "~" sorts after every base32 character, so each prefix is one index range
+        stmt = stmt.where(or_(*[and_(Place.geohash >= p, Place.geohash < p + "~") for p in prefixes]))
+    min_lat, max_lat, min_lon, max_lon = box
+    return stmt.where(Place.lat.between(min_lat, max_lat), Place.lon.between(min_lon, max_lon))
+
+
+def nearby_places(
+    db: Session,
+    stmt: Select,
+    *,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    limit: int | None = None,
+) -> list[tuple[Place, float]]:
+    """Places of stmt within radius_m of (lat, lon) as (place, distance_m), nearest first."""
+    rows = db.scalars(within_box(stmt, lat, lon, radius_m)).all()
+    found = [(p, haversine_m(lat, lon, p.lat, p.lon)) for p in rows]
+    found = [(p, d) for p, d in found if d <= radius_m]
+    found.sort(key=lambda item: item[1])
+    return found[:limit] if limit is not None else found
+
+
+def places_within(
+    db: Session, stmt: Select, *, lat: float, lon: float, radius_m: float, limit: int
+) -> list[tuple[Place, float]]:
+    """The first limit places of the ordered stmt within radius_m, as (place, distance_m).
+
+    The box is read in pages of that order rather than whole, so a wide radius
+    costs about limit rows instead of every place it covers.
+    """
+    # Box corners outside the circle are dropped below, so a page usually suffices
+    page = max(2 * limit, _MIN_PAGE)
+    # The id makes the order total, pages neither overlap nor skip rows
+    stmt = within_box(stmt, lat, lon, radius_m).order_by(Place.id)
+    found: list[tuple[Place, float]] = []
+    offset = 0
+    while len(found) < limit:
+        rows = db.scalars(stmt.offset(offset).limit(page)).all()
+        for p in rows:
+            distance = haversine_m(lat, lon, p.lat, p.lon)
+            if distance <= radius_m:
+                found.append((p, distance))
+        if len(rows) < page:
+            break
+        offset += page
+    return found[:limit]
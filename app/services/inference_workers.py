@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing as mp
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing.connection import Client, Connection, Listener, wait
+
+from app.core.config import settings
+from app.services.llm import GenParams, LLMError, TextCallback
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_address(address: str) -> tuple[str, int] | str:
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    # Anything else is a unix socket path
+    return address
+
+
+def _authkey() -> bytes:
+    return settings.app_secret_key.encode("utf-8")
+
+
+def _worker_main(worker_id: int, provider: str, conn: Connection) -> None:
+    # Runs in a spawned process that owns its own copy of the model and its own pipe
+    from app.services.llm import get_backend
+
+    try:
+        backend = get_backend(provider)
+        state = backend.load()
+    except Exception as e:
+        conn.send(("failed", str(e)))
+        return
+    conn.send(("ready",))
+
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            return
+        if item is None:
+            return
+        req_id, batch, params, stream, deadline = item
+        if time.time() > deadline:
+            # The caller has given up already
+            conn.send(("expired", req_id))
+            continue
+
+        on_text = None
+        if stream:
+            def on_text(text: str, req_id: str = req_id) -> None:
+                conn.send(("chunk", req_id, text))
+
+        try:
+            texts = backend.run(state, batch, params, on_text)
+        except Exception as e:
+            conn.send(("error", req_id, str(e)))
+            continue
+        conn.send(("ok", req_id, texts))
+
+
+@dataclass
+class _Waiter:
+    done: threading.Event
+    on_text: TextCallback | None
+    result: list[str] | None = None
+    error: str | None = None
+
+
+@dataclass
+class _Request:
+    req_id: str
+    batch: list[list[dict]]
+    params: GenParams
+    stream: bool
+    # Wall clock (time.time()), comparable inside the worker processes
+    deadline: float
+
+
+class WorkerPool:
+    """Model worker processes, each with its own pipe.
+
+    Requests wait in a queue in this process and are handed to idle workers
+    one at a time; results come back tagged with the request id. One
+    collector thread reads every pipe, fails the requests of a crashed worker
+    and respawns it. A request that times out while queued is withdrawn; one
+    that times out while running kills its worker, which only breaks that
+    worker's own pipe. Requests carry their deadline, so a worker skips one
+    that expired before it got there.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        *,
+        timeout_seconds: int = 120,
+        start_timeout_seconds: int = 600,
+        provider: str | None = None,
+    ) -> None:
+        self.size = max(1, int(size))
+        self.timeout_seconds = timeout_seconds
+        self.start_timeout_seconds = start_timeout_seconds
+        self.provider = provider or settings.llm_provider
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._ready_cond = threading.Condition(self._lock)
+        self._procs: dict[int, mp.process.BaseProcess] = {}
+        self._conns: dict[int, Connection] = {}
+        # Loaded workers, and those of them waiting for a request
+        self._ready: set[int] = set()
+        self._idle: set[int] = set()
+        # Killed on a timeout; respawned like crashed ones
+        self._killed: set[int] = set()
+        self._pending: deque[_Request] = deque()
+        self._waiters: dict[str, _Waiter] = {}
+        self._assigned: dict[str, int] = {}
+        self._load_error: str | None = None
+        self._collector: threading.Thread | None = None
+        self._closed = False
+
+    @property
+    def started(self) -> bool:
+        return bool(self._ready)
+
+    def start(self) -> None:
+        """Spawn the workers and block until one of them has loaded the model.
+
+        Raises LLMError when a worker fails to load or dies while loading, or
+        when none is ready within start_timeout_seconds.
+        """
+        deadline = time.monotonic() + self.start_timeout_seconds
+        with self._lock:
+            self._closed = False
+            self._load_error = None
+            for worker_id in range(self.size):
+                proc = self._procs.get(worker_id)
+                if proc is None or not proc.is_alive():
+                    self._spawn(worker_id)
+            if self._collector is None or not self._collector.is_alive():
+                self._collector = threading.Thread(target=self._collect, name="llm-worker-collector", daemon=True)
+                self._collector.start()
+
+            while not self._ready:
+                if self._load_error is not None:
+                    raise LLMError(f"Inference worker failed to load the model: {self._load_error}")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMError(f"Inference workers did not load the model in {self.start_timeout_seconds}s")
+                self._ready_cond.wait(min(1.0, remaining))
+
+    def _spawn(self, worker_id: int) -> None:
+        conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.provider, child_conn),
+            name=f"llm-worker-{worker_id}",
+            daemon=True,
+        )
+        proc.start()
+        # The child has its own copy; EOF on ours then means the worker is gone
+        child_conn.close()
+        self._procs[worker_id] = proc
+        self._conns[worker_id] = conn
+        logger.info("Inference worker %s started (pid=%s)", worker_id, proc.pid)
+
+    def run(self, batch: list[list[dict]], params: GenParams, on_text: TextCallback | None = None) -> list[str]:
+        if not self._procs:
+            raise LLMError("Inference workers are not started")
+
+        req = _Request(uuid.uuid4().hex, batch, params, on_text is not None, time.time() + self.timeout_seconds)
+        waiter = _Waiter(done=threading.Event(), on_text=on_text)
+        with self._lock:
+            self._waiters[req.req_id] = waiter
+            self._pending.append(req)
+            self._dispatch()
+
+        if not waiter.done.wait(self.timeout_seconds):
+            with self._lock:
+                self._waiters.pop(req.req_id, None)
+                # Still queued: withdrawn, so it never takes a worker later
+                self._pending = deque(r for r in self._pending if r is not req)
+                worker_id = self._assigned.pop(req.req_id, None)
+                proc = self._procs.get(worker_id) if worker_id is not None else None
+                if proc is not None:
+                    self._idle.discard(worker_id)
+                    self._killed.add(worker_id)
+            if proc is not None:
+                # A stuck generation would block the worker forever; the collector respawns it
+                logger.warning("Inference request %s timed out, killing worker %s", req.req_id, worker_id)
+                proc.terminate()
+            raise LLMError("Inference request timed out")
+
+        if waiter.error is not None:
+            raise LLMError(waiter.error)
+        return waiter.result or []
+
+    def _dispatch(self) -> None:
+        # Called with the lock held
+        now = time.time()
+        while self._pending and self._idle:
+            req = self._pending.popleft()
+            if req.req_id not in self._waiters or req.deadline < now:
+                continue
+            worker_id = self._idle.pop()
+            try:
+                self._conns[worker_id].send((req.req_id, req.batch, req.params, req.stream, req.deadline))
+            except (KeyError, OSError, ValueError):
+                # The worker is gone: the collector respawns it, the request goes to the next idle one
+                self._pending.appendleft(req)
+                continue
+            self._assigned[req.req_id] = worker_id
+
+    def _collect(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                conns = {conn: worker_id for worker_id, conn in self._conns.items()}
+            try:
+                readable = wait(list(conns), timeout=0.5) if conns else []
+            except (OSError, ValueError):
+                readable = []
+            if not conns:
+                time.sleep(0.5)
+            for conn in readable:
+                worker_id = conns[conn]
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    # The worker died; _check_workers fails its request and respawns it
+                    with self._lock:
+                        if self._conns.get(worker_id) is conn:
+                            del self._conns[worker_id]
+                    conn.close()
+                    continue
+                self._handle(worker_id, msg)
+            self._check_workers()
+
+    def _handle(self, worker_id: int, msg: tuple) -> None:
+        kind = msg[0]
+        if kind == "chunk":
+            with self._lock:
+                waiter = self._waiters.get(msg[1])
+            if waiter is not None and waiter.on_text is not None:
+                try:
+                    waiter.on_text(msg[2])
+                except Exception:
+                    logger.warning("Dropping stream chunk for request %s", msg[1])
+            return
+
+        with self._lock:
+            if kind == "ready":
+                self._ready.add(worker_id)
+                self._idle.add(worker_id)
+                self._ready_cond.notify_all()
+                self._dispatch()
+                return
+            if kind == "failed":
+                self._load_error = msg[1]
+                self._ready_cond.notify_all()
+                return
+
+            # ok, error or expired: the worker is free again
+            req_id = msg[1]
+            if self._assigned.get(req_id) == worker_id:
+                del self._assigned[req_id]
+            if worker_id in self._ready and worker_id not in self._killed:
+                self._idle.add(worker_id)
+            waiter = self._waiters.pop(req_id, None)
+            if waiter is not None:
+                if kind == "ok":
+                    waiter.result = msg[2]
+                elif kind == "expired":
+                    waiter.error = "Inference request timed out"
+                else:
+                    waiter.error = msg[2]
+                waiter.done.set()
+            self._dispatch()
+
+    def _check_workers(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            for worker_id, proc in list(self._procs.items()):
+                if proc.is_alive():
+                    continue
+                was_ready = worker_id in self._ready or worker_id in self._killed
+                self._ready.discard(worker_id)
+                self._idle.discard(worker_id)
+                self._killed.discard(worker_id)
+                conn = self._conns.pop(worker_id, None)
+                if conn is not None:
+                    conn.close()
+                for req_id, assigned in list(self._assigned.items()):
+                    if assigned != worker_id:
+                        continue
+                    self._assigned.pop(req_id, None)
+                    waiter = self._waiters.pop(req_id, None)
+                    if waiter is not None:
+                        waiter.error = "Inference worker crashed"
+                        waiter.done.set()
+                if was_ready:
+                    logger.warning("Inference worker %s exited (code=%s), restarting", worker_id, proc.exitcode)
+                    self._spawn(worker_id)
+                else:
+                    # Died while loading (OOM, segfault): start() reports it, the next start() retries
+                    del self._procs[worker_id]
+                    if not self._ready and self._load_error is None:
+                        self._load_error = f"worker {worker_id} exited while loading (code={proc.exitcode})"
+                        self._ready_cond.notify_all()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            procs = list(self._procs.values())
+            conns = list(self._conns.values())
+            self._procs.clear()
+            self._conns.clear()
+            self._ready.clear()
+            self._idle.clear()
+        for conn in conns:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for proc in procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        for conn in conns:
+            conn.close()
+
+
+class RemoteWorkerPool:
+    """Client for an inference server shared by several API processes."""
+
+    def __init__(self, address: str, *, timeout_seconds: int = 120, start_timeout_seconds: int = 600) -> None:
+        self.address = _parse_address(address)
+        self.timeout_seconds = timeout_seconds
+        self.start_timeout_seconds = start_timeout_seconds
+        self._started = False
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    def _connect(self) -> Connection:
+        try:
+            return Client(self.address, authkey=_authkey())
+        except OSError as e:
+            raise LLMError(f"Inference server is unreachable: {e}") from e
+
+    def start(self) -> None:
+        """Block until the server reports that its workers have loaded the model."""
+        deadline = time.monotonic() + self.start_timeout_seconds
+        while True:
+            with self._connect() as conn:
+                conn.send(("ping",))
+                kind, ready = conn.recv()
+            if kind == "pong" and ready:
+                self._started = True
+                return
+            if time.monotonic() >= deadline:
+                raise LLMError(f"Inference server did not become ready in {self.start_timeout_seconds}s")
+            time.sleep(1.0)
+
+    def run(self, batch: list[list[dict]], params: GenParams, on_text: TextCallback | None = None) -> list[str]:
+        deadline = time.monotonic() + self.timeout_seconds
+        with self._connect() as conn:
+            conn.send(("run", batch, params, on_text is not None))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not conn.poll(remaining):
+                    raise LLMError("Inference request timed out")
+                try:
+                    msg = conn.recv()
+                except EOFError as e:
+                    raise LLMError("Inference server closed the connection") from e
+                if msg[0] == "chunk":
+                    if on_text is not None:
+                        on_text(msg[1])
+                elif msg[0] == "ok":
+                    return msg[1]
+                else:
+                    raise LLMError(msg[1])
+
+
+def _serve_connection(pool: WorkerPool, conn: Connection) -> None:
+    with conn:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg[0] == "ping":
+            conn.send(("pong", pool.started))
+            return
+
+        _, batch, params, stream = msg
+        on_text = (lambda text: conn.send(("chunk", text))) if stream else None
+        try:
+            texts = pool.run(batch, params, on_text)
+        except LLMError as e:
+            conn.send(("error", str(e)))
+        except OSError:
+            # Client went away mid-stream
+            pass
+        else:
+            conn.send(("ok", texts))
+
+
+def serve(address: str, workers: int) -> None:
+    pool = WorkerPool(
+        workers,
+        timeout_seconds=settings.llm_worker_timeout_seconds,
+        start_timeout_seconds=settings.llm_worker_start_timeout_seconds,
+    )
+    with Listener(_parse_address(address), authkey=_authkey()) as listener:
+        logger.info("Inference server listening on %s with %s workers", address, workers)
+        threading.Thread(target=pool.start, name="llm-pool-start", daemon=True).start()
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError):
+                    logger.exception("Inference server accept failed")
+                    continue
+                threading.Thread(target=_serve_connection, args=(pool, conn), daemon=True).start()
+        finally:
+            pool.shutdown()
+
+
+def main() -> None:
+    from app.core.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Shared local LLM inference server")
+    parser.add_argument("--address", default=settings.llm_worker_address or "127.0.0.1:8765")
+    parser.add_argument("--workers", type=int, default=max(1, settings.llm_workers))
+    args = parser.parse_args()
+
+    configure_logging(log_dir=settings.log_dir, level=settings.log_level)
+    serve(args.address, args.workers)
+
+
+if __name__ == "__main__":
+    main()
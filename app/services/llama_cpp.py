@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.services.llm import GenParams, InferenceBackend, LLMError, TextCallback
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _LlamaState:
+    llama: object
+    source: str
+    # A llama.cpp context runs one sequence at a time
+    lock: threading.Lock
+    precision: str = "gguf"
+
+
+class LlamaCppBackend(InferenceBackend):
+    """GGUF models on llama.cpp through llama-cpp-python: quantized CPU inference, fast startup.
+
+    The chat template comes from the GGUF metadata. Rows of a batch run one
+    after another; LLM_PREFIX_CACHE_MB sizes llama.cpp's RAM cache of prompt states.
+    """
+
+    name = "llama_cpp"
+
+    def load(self) -> _LlamaState:
+        try:
+            from llama_cpp import Llama, LlamaRAMCache
+        except ImportError as e:
+            raise LLMError("LLM_PROVIDER=llama_cpp requires the llama-cpp-python package") from e
+
+        kwargs: dict = {"n_ctx": settings.llama_n_ctx, "verbose": False}
+        if settings.llama_n_threads > 0:
+            kwargs["n_threads"] = settings.llama_n_threads
+
+        if settings.llama_model_path:
+            source = settings.llama_model_path
+            llama = Llama(model_path=settings.llama_model_path, **kwargs)
+        else:
+            source = f"{settings.llama_repo_id}/{settings.llama_filename}"
+            llama = Llama.from_pretrained(
+                repo_id=settings.llama_repo_id,
+                filename=settings.llama_filename,
+                cache_dir="weights",
+                **kwargs,
+            )
+
+        if settings.llm_prefix_cache_mb > 0:
+            llama.set_cache(LlamaRAMCache(capacity_bytes=settings.llm_prefix_cache_mb * 1024 * 1024))
+        return _LlamaState(llama=llama, source=source, lock=threading.Lock())
+
+    def run(
+        self,
+        state: _LlamaState,
+        batch: list[list[dict]],
+        params: GenParams,
+        on_text: TextCallback | None = None,
+    ) -> list[str]:
+        max_new_tokens, temperature, top_p = params
+        kwargs = {
+            "max_tokens": int(max_new_tokens),
+            # llama.cpp samples greedily at temperature 0
+            "temperature": float(temperature),
+            "top_p": float(top_p),
+        }
+        texts: list[str] = []
+        with state.lock:
+            for messages in batch:
+                if on_text is not None:
+                    parts: list[str] = []
+                    for chunk in state.llama.create_chat_completion(messages=messages, stream=True, **kwargs):
+                        text = chunk["choices"][0]["delta"].get("content")
+                        if text:
+                            parts.append(text)
+                            on_text(text)
+                    texts.append("".join(parts).strip())
+                else:
+                    out = state.llama.create_chat_completion(messages=messages, **kwargs)
+                    texts.append((out["choices"][0]["message"].get("content") or "").strip())
+        return texts
+
+    def describe(self, state: _LlamaState) -> str:
+        return f"{state.source} (llama.cpp, cpu)"
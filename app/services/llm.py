@@ -1,19 +1,102 @@
 from __future__ import annotations
 
+import asyncio
+import copy
 import hashlib
+import importlib
 import json
 import logging
-from dataclasses import dataclass
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
 from functools import partial
 
 import anyio
 
 from app.core.config import settings
-from app.services.cache import TTLCache
+from app.services.cache import LRUCache, SQLiteCache, TieredCache
+from app.services.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
-_cache = TTLCache(ttl_seconds=settings.llm_cache_ttl_seconds, max_items=512)
+_cache = TieredCache(
+    LRUCache(max_bytes=settings.llm_cache_memory_mb * 1024 * 1024, ttl_seconds=settings.llm_cache_ttl_seconds),
+    SQLiteCache(
+        settings.llm_cache_path,
+        ttl_seconds=settings.llm_cache_ttl_seconds,
+        max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+    )
+    if settings.llm_cache_path
+    else None,
+)
+
+
+# Chunk summaries of map-reduce summarization only change when their reviews do, so they live much longer
+_chunk_cache = TieredCache(
+    LRUCache(max_bytes=settings.llm_cache_memory_mb * 1024 * 1024, ttl_seconds=settings.summary_chunk_cache_ttl_seconds),
+    SQLiteCache(
+        settings.llm_cache_path,
+        table="summary_chunks",
+        ttl_seconds=settings.summary_chunk_cache_ttl_seconds,
+        max_bytes=settings.summary_chunk_cache_max_mb * 1024 * 1024,
+    )
+    if settings.llm_cache_path
+    else None,
+)
+
+_SUMMARY_FINAL = (
+    "Суммаризируй отзывы о месте '{place}'.\n"
+    "Сделай: 5–8 буллетов (плюсы/минусы) и общий вывод в 1 предложение."
+)
+_SUMMARY_CHUNK = (
+    "Это часть отзывов о месте '{place}'.\n"
+    "Кратко перечисли главные плюсы и минусы, которые в них упоминаются, 3–6 пунктами."
+)
+_SUMMARY_MERGE = (
+    "Ниже — краткие сводки по частям отзывов о месте '{place}'.\n"
+    "Объедини их: 5–8 буллетов (плюсы/минусы) и общий вывод в 1 предложение."
+)
+
+
+def approx_tokens(text: str) -> int:
+    # Works without a tokenizer (also in the API process when inference runs elsewhere);
+    # Russian text averages about 3 characters per token for Qwen-style vocabularies
+    return len(text) // 3 + 1
+
+
+# A merge prompt must fit at least two partial summaries, or reducing never converges
+MIN_SUMMARY_CHUNK_TOKENS = 512
+_MAX_REDUCE_ROUNDS = 8
+
+
+def summary_chunk_budget() -> int:
+    return max(MIN_SUMMARY_CHUNK_TOKENS, settings.summary_chunk_tokens)
+
+
+def chunk_starts(lengths: list[int], budget_tokens: int) -> list[int]:
+    """Start indexes of the chunks chunk_reviews makes of texts with these lengths (in characters)."""
+    starts: list[int] = []
+    used = 0
+    for i, length in enumerate(lengths):
+        cost = length // 3 + 1  # approx_tokens
+        if not starts or used + cost > budget_tokens:
+            starts.append(i)
+            used = 0
+        used += cost
+    return starts
+
+
+def chunk_reviews(reviews: list[str], budget_tokens: int) -> list[list[str]]:
+    """Greedily pack reviews, in order, into chunks of at most budget_tokens.
+
+    Packing from the oldest review keeps earlier chunk boundaries fixed as
+    new reviews are appended. A single review over budget gets its own chunk.
+    """
+    starts = chunk_starts([len(r) for r in reviews], budget_tokens)
+    return [reviews[a:b] for a, b in zip(starts, [*starts[1:], len(reviews)])]
 
 
 def _cache_key(prefix: str, payload: dict) -> str:
@@ -25,41 +108,785 @@ class LLMError(Exception):
     pass
 
 
+class LLMOverloaded(LLMError):
+    """The generation queue is full; retry after the given number of seconds."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("LLM queue is full")
+        self.retry_after = retry_after
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+HF_PRECISIONS = ("auto", "fp32", "bf16", "fp16", "int8", "int4")
+
+
+_DISABLED_CHAT_REPLY = (
+    "(LLM отключена) Я могу подобрать места по фильтрам. "
+    "Откройте /recommendations или /places?category=..."
+)
+
+
+def _kv_nbytes(kv: object) -> int:
+    layers = getattr(kv, "layers", None)
+    if layers is not None:
+        tensors = [t for layer in layers for t in (getattr(layer, "keys", None), getattr(layer, "values", None))]
+    else:
+        tensors = list(getattr(kv, "key_cache", [])) + list(getattr(kv, "value_cache", []))
+    return sum(int(t.numel() * t.element_size()) for t in tensors if t is not None and hasattr(t, "numel"))
+
+
+class PrefixKVCache:
+    """LRU cache of past-key-values for prompt prefixes, bounded by bytes.
+
+    Keys are token-id prefixes, so an entry can only be reused by a prompt
+    that tokenizes to exactly the same leading ids.
+    """
+
+    def __init__(self, max_bytes: int, *, sizeof: Callable[[object], int] = _kv_nbytes) -> None:
+        self.max_bytes = int(max_bytes)
+        self._data: LRUCache[str, object] = LRUCache(max_bytes=self.max_bytes, sizeof=lambda _, kv: sizeof(kv))
+
+    @staticmethod
+    def _key(ids: list[int]) -> str:
+        return hashlib.sha256(json.dumps(ids).encode("ascii")).hexdigest()
+
+    def get(self, ids: list[int]) -> object | None:
+        return self._data.get(self._key(ids))
+
+    def put(self, ids: list[int], kv: object) -> None:
+        self._data.set(self._key(ids), kv)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
 @dataclass
 class _HFState:
     tokenizer: object
     model: object
     device: str
+    precision: str = "fp32"
+    prefix_cache: PrefixKVCache | None = field(default=None)
+    # Small model proposing tokens for speculative (assisted) decoding
+    draft_model: object | None = None
 
 
-class LocalLLM:
+# (max_new_tokens, temperature, top_p): only jobs with equal params share a batch
+GenParams = tuple[int, float, float]
+TextCallback = Callable[[str], None]
+BatchRunner = Callable[[list[list[dict]], GenParams, TextCallback | None], list[str]]
+
+
+@dataclass
+class _GenJob:
+    messages: list[dict]
+    params: GenParams
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    # Set for streaming jobs; called from the worker thread with each decoded text chunk
+    on_text: TextCallback | None = None
+    priority: int = 0
+    # time.monotonic() after which a still-queued job is dropped
+    deadline: float | None = None
+
+
+def _resolve(fut: asyncio.Future, result: str | None, error: BaseException | None) -> None:
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+
+def _deliver(job: _GenJob, result: str | None, error: BaseException | None) -> None:
+    try:
+        job.loop.call_soon_threadsafe(_resolve, job.future, result, error)
+    except RuntimeError:
+        # Caller's event loop is already closed; nobody is waiting for this result
+        pass
+
+
+class BatchScheduler:
+    """Collects generation jobs over a short window and runs them as one batch.
+
+    A single worker thread owns the model, so concurrent requests no longer
+    compete for it; callers await their own result on their event loop.
+    The queue is bounded: past max_queue pending jobs new ones are rejected
+    with LLMOverloaded, more urgent priorities are served first and jobs
+    whose deadline passed while queued are dropped.
+    """
+
+    def __init__(
+        self,
+        runner: BatchRunner,
+        *,
+        max_batch_size: int = 4,
+        window_ms: int = 25,
+        concurrency: int = 1,
+        max_queue: int = 0,
+    ) -> None:
+        self._runner = runner
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window_seconds = max(0, int(window_ms)) / 1000.0
+        # Number of batches in flight at once: 1 for an in-process model, one per worker process otherwise
+        self.concurrency = max(1, int(concurrency))
+        # 0 means unbounded
+        self.max_queue = max(0, int(max_queue))
+        self._cond = threading.Condition()
+        self._pending: list[_GenJob] = []
+        self._threads: list[threading.Thread] = []
+        # Moving average of batch run time, used for Retry-After estimates
+        self._avg_batch_seconds = 1.0
+
+    def _make_job(
+        self,
+        messages: list[dict],
+        *,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        priority: int,
+        timeout: float | None,
+        on_text: TextCallback | None = None,
+    ) -> _GenJob:
+        loop = asyncio.get_running_loop()
+        return _GenJob(
+            messages=messages,
+            params=(int(max_new_tokens), float(temperature), float(top_p)),
+            loop=loop,
+            future=loop.create_future(),
+            on_text=on_text,
+            priority=int(priority),
+            deadline=time.monotonic() + timeout if timeout else None,
+        )
+
+    async def submit(
+        self,
+        messages: list[dict],
+        *,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: float | None = None,
+    ) -> str:
+        job = self._make_job(
+            messages,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            priority=priority,
+            timeout=timeout,
+        )
+        self._enqueue(job)
+        try:
+            # The deadline only bounds the time spent queued, like in stream()
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            if self._withdraw(job):
+                raise LLMTimeout("LLM request deadline exceeded") from None
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        # Already picked up by a batch: its result is not thrown away
+        return await job.future
+
+    async def stream(
+        self,
+        messages: list[dict],
+        *,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: float | None = None,
+    ) -> AsyncIterator[str]:
+        """Run one generation on its own and yield text chunks as they are decoded.
+
+        The timeout only bounds the time spent queued: a started stream runs to the end.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue[str | None] = asyncio.Queue()
+
+        def on_text(text: str) -> None:
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, text)
+            except RuntimeError:
+                pass
+
+        job = self._make_job(
+            messages,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            priority=priority,
+            timeout=timeout,
+            on_text=on_text,
+        )
+        # Chunks and the final result are scheduled on the loop in order, so the sentinel comes last
+        job.future.add_done_callback(lambda _: chunks.put_nowait(None))
+        self._enqueue(job)
+
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            job.future.result()
+        finally:
+            job.future.cancel()
+
+    def retry_after(self) -> int:
+        """Rough number of seconds until the current queue has drained."""
+        batches = len(self._pending) / self.max_batch_size + 1
+        return max(1, math.ceil(batches * self._avg_batch_seconds / self.concurrency))
+
+    def check_admission(self) -> None:
+        if self.max_queue and len(self._pending) >= self.max_queue:
+            raise LLMOverloaded(self.retry_after())
+
+    def _enqueue(self, job: _GenJob) -> None:
+        with self._cond:
+            self.check_admission()
+            self._ensure_worker()
+            self._pending.append(job)
+            self._cond.notify()
+
+    def _withdraw(self, job: _GenJob) -> bool:
+        """Take a job off the queue; False if a batch already picked it up."""
+        with self._cond:
+            keep = [j for j in self._pending if j is not job]
+            if len(keep) == len(self._pending):
+                return False
+            self._pending = keep
+        job.future.cancel()
+        return True
+
+    def _ensure_worker(self) -> None:
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.concurrency:
+            t = threading.Thread(target=self._worker, name=f"llm-batch-scheduler-{len(self._threads)}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _drop_stale(self) -> None:
+        now = time.monotonic()
+        keep: list[_GenJob] = []
+        for job in self._pending:
+            if job.future.cancelled():
+                continue
+            if job.deadline is not None and job.deadline < now:
+                _deliver(job, None, LLMTimeout("LLM request deadline exceeded"))
+                continue
+            keep.append(job)
+        self._pending = keep
+
+    def _next_batch(self) -> list[_GenJob]:
+        with self._cond:
+            while True:
+                self._drop_stale()
+                if self._pending:
+                    break
+                self._cond.wait()
+
+            # Most urgent first, arrival order within a priority (sort is stable)
+            self._pending.sort(key=lambda j: j.priority)
+
+            # Streaming jobs are never batched and should not wait for the window
+            if self._pending[0].on_text is not None:
+                return [self._pending.pop(0)]
+
+            # Give concurrent callers a short window to join the batch
+            deadline = time.monotonic() + self.window_seconds
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._drop_stale()
+            if not self._pending:
+                return []
+            self._pending.sort(key=lambda j: j.priority)
+
+            params = self._pending[0].params
+            batch: list[_GenJob] = []
+            rest: list[_GenJob] = []
+            for job in self._pending:
+                if job.on_text is None and job.params == params and len(batch) < self.max_batch_size:
+                    batch.append(job)
+                else:
+                    rest.append(job)
+            self._pending = rest
+            return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._next_batch()
+            batch = [j for j in batch if not j.future.cancelled()]
+            if not batch:
+                continue
+            started = time.monotonic()
+            try:
+                results = self._runner([j.messages for j in batch], batch[0].params, batch[0].on_text)
+            except Exception as e:
+                for j in batch:
+                    _deliver(j, None, e)
+                continue
+            finally:
+                self._avg_batch_seconds = 0.8 * self._avg_batch_seconds + 0.2 * (time.monotonic() - started)
+            for j, text in zip(batch, results):
+                _deliver(j, text, None)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one underlying call.
+
+    The call runs as its own task, so a caller that goes away does not cancel
+    the work the other callers are waiting for; it is cancelled only once
+    every caller has gone.
+    """
 
     def __init__(self) -> None:
-        self.provider = (settings.llm_provider or "").lower().strip()
-        self._state: _HFState | None = None
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._callers: dict[str, int] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._tasks
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(fn())
+            self._tasks[key] = task
+            self._callers[key] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        self._callers[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._tasks.get(key) is task and self._callers[key] == 1:
+                task.cancel()
+            raise
+        finally:
+            if self._tasks.get(key) is task:
+                self._callers[key] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            del self._callers[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even when every caller has gone away
+            task.exception()
+
+
+class LocalLLM:
+
+    def __init__(self, *, runner: BatchRunner | None = None) -> None:
+        # A custom runner (e.g. the benchmark stand-in model) replaces the HF model entirely
+        self._runner = runner
+        self.provider = "custom" if runner is not None else (settings.llm_provider or "").lower().strip()
+        # Replies of a custom runner must not end up in the shared cache of the real model
+        self.response_cache = _cache if runner is None else TieredCache(LRUCache(max_items=1024))
+        self.chunk_cache = _chunk_cache if runner is None else TieredCache(LRUCache(max_items=1024))
+        self.semantic_cache: SemanticCache | None = None
+        if settings.semantic_cache_enabled:
+            self.semantic_cache = SemanticCache(
+                threshold=settings.semantic_cache_threshold,
+                max_items=settings.semantic_cache_max_items,
+            )
+        self._backend: InferenceBackend | None = None
+        # Model state of the backend, e.g. _HFState
+        self._state: object | None = None
         self._load_lock = anyio.Lock()
+        # disabled | idle | loading | warming | ready | error
+        if runner is not None:
+            self.status = "ready"
+        else:
+            self.status = "disabled" if self.provider == "disabled" else "idle"
+        self.last_error: str | None = None
+        self._flights = SingleFlight()
 
-    async def _ensure_loaded(self) -> _HFState:
-        if self._state is not None:
-            return self._state
+        # Optional out-of-process inference: a local pool of model processes or a shared server
+        self._use_pool = runner is None and (bool(settings.llm_worker_address) or settings.llm_workers > 0)
+        self._pool = None
+        self._scheduler = BatchScheduler(
+            runner or (self._run_pool if self._use_pool else self._run_batch),
+            max_batch_size=settings.llm_batch_max_size,
+            window_ms=settings.llm_batch_window_ms,
+            concurrency=max(1, settings.llm_workers),
+            max_queue=settings.llm_queue_max,
+        )
+
+    def _make_pool(self):
+        # Imported lazily: the worker module imports this one
+        from app.services.inference_workers import RemoteWorkerPool, WorkerPool
+
+        timeout = settings.llm_worker_timeout_seconds
+        start_timeout = settings.llm_worker_start_timeout_seconds
+        if settings.llm_worker_address:
+            return RemoteWorkerPool(
+                settings.llm_worker_address, timeout_seconds=timeout, start_timeout_seconds=start_timeout
+            )
+        return WorkerPool(settings.llm_workers, timeout_seconds=timeout, start_timeout_seconds=start_timeout)
+
+    def _is_loaded(self) -> bool:
+        if self._runner is not None:
+            return True
+        if self._use_pool:
+            return self._pool is not None and self._pool.started
+        return self._state is not None
+
+    async def _ensure_loaded(self) -> None:
+        if self._is_loaded():
+            return
 
         async with self._load_lock:
-            if self._state is not None:
-                return self._state
+            if self._is_loaded():
+                return
 
             if self.provider == "disabled":
                 raise LLMError("LLM is disabled")
 
-            if self.provider not in {"hf_local", "hf"}:
-                raise LLMError(f"Unknown LLM provider: {self.provider}")
+            if self._backend is None:
+                self._backend = get_backend(self.provider)
 
-            logger.info(
-                "Loading HF model: %s (device=%s)", settings.hf_model_id, settings.hf_device
-            )
-            state = await anyio.to_thread.run_sync(self._load_sync)
+            if self._use_pool:
+                logger.info("Starting inference workers (provider=%s)", self.provider)
+                if self._pool is None:
+                    self._pool = self._make_pool()
+                self.status = "loading"
+                try:
+                    await anyio.to_thread.run_sync(self._pool.start)
+                except Exception as e:
+                    self.status = "error"
+                    self.last_error = str(e)
+                    raise
+                self.status = "ready"
+                logger.info("Inference workers ready")
+                return
+
+            logger.info("Loading LLM (provider=%s)", self.provider)
+            self.status = "loading"
+            try:
+                state = await anyio.to_thread.run_sync(self._backend.load)
+            except Exception as e:
+                self.status = "error"
+                self.last_error = str(e)
+                raise
             self._state = state
-            logger.info("HF model ready: %s (%s)", settings.hf_model_id, state.device)
-            return state
+            self.status = "ready"
+            logger.info("LLM ready: %s", self._backend.describe(state))
+
+    async def preload(self) -> None:
+        """Load the model and run one short generation so the first real request is fast."""
+        if self.provider == "disabled":
+            return
+
+        try:
+            await self._ensure_loaded()
+            self.status = "warming"
+            started = time.monotonic()
+            await self._scheduler.submit(
+                [{"role": "user", "content": "Привет"}],
+                max_new_tokens=4,
+                temperature=0.0,
+                top_p=1.0,
+            )
+        except Exception as e:
+            logger.exception("LLM preload failed")
+            self.status = "error"
+            self.last_error = str(e)
+            return
+
+        self.status = "ready"
+        logger.info("LLM warmed up in %.1fs", time.monotonic() - started)
+
+    @property
+    def is_ready(self) -> bool:
+        if self.status in {"ready", "disabled"}:
+            return True
+        # Lazy loading: the model is loaded by the first request, nothing to wait for
+        return self.status == "idle" and not settings.llm_preload
+
+    def _run_batch(self, batch: list[list[dict]], params: GenParams, on_text: TextCallback | None = None) -> list[str]:
+        if self._state is None or self._backend is None:
+            raise LLMError("LLM is not loaded")
+        return self._backend.run(self._state, batch, params, on_text)
+
+    def _run_pool(self, batch: list[list[dict]], params: GenParams, on_text: TextCallback | None = None) -> list[str]:
+        if self._pool is None:
+            raise LLMError("Inference workers are not started")
+        return self._pool.run(batch, params, on_text)
+
+    @staticmethod
+    def _chat_request(*, system: str, user_message: str, context: list[dict] | None) -> tuple[list[dict], str]:
+        messages: list[dict] = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        if context:
+            messages.extend(context)
+        messages.append({"role": "user", "content": user_message})
+
+        payload = {
+            "model": settings.hf_model_id,
+            "messages": messages,
+            "max_new_tokens": settings.hf_max_new_tokens,
+            "temperature": settings.hf_temperature,
+            "top_p": settings.hf_top_p,
+        }
+        return messages, _cache_key("chat", payload)
+
+    async def chat(self, *, system: str, user_message: str, context: list[dict] | None = None) -> str:
+        if self.provider == "disabled":
+            return _DISABLED_CHAT_REPLY
+
+        messages, key = self._chat_request(system=system, user_message=user_message, context=context)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached
+        namespace = self._semantic_namespace(system, context)
+        if namespace is not None:
+            cached = self.semantic_cache.get(namespace, user_message)
+            if cached is not None:
+                return cached
+
+        async def generate() -> str:
+            text = await self._generate(
+                key,
+                messages,
+                max_new_tokens=settings.hf_max_new_tokens,
+                temperature=settings.hf_temperature,
+                top_p=settings.hf_top_p,
+                priority=PRIORITY_INTERACTIVE,
+                timeout=settings.llm_chat_deadline_seconds,
+                what="chat",
+            )
+            # Inside the flight, so callers coalesced into it store the reply once
+            if namespace is not None:
+                self.semantic_cache.set(namespace, user_message, text)
+            return text
+
+        return await self._flights.run(key, generate)
+
+    def _semantic_namespace(self, system: str, context: list[dict] | None) -> str | None:
+        # Same system prompt means the same profile and candidate places
+        if self.semantic_cache is None:
+            return None
+        raw = json.dumps([system, context or []], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def check_admission(self) -> None:
+        """Raise LLMOverloaded right away if a new generation would not be queued."""
+        if self.provider != "disabled":
+            self._scheduler.check_admission()
+
+    async def _generate(
+        self,
+        key: str,
+        messages: list[dict],
+        *,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        priority: int,
+        timeout: float,
+        what: str,
+        cache: TieredCache | None = None,
+    ) -> str:
+        try:
+            await self._ensure_loaded()
+            text = await self._scheduler.submit(
+                messages,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                priority=priority,
+                timeout=timeout,
+            )
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            logger.exception("LLM %s failed", what)
+            raise LLMError(str(e)) from e
+
+        text = text.strip() or "(пустой ответ модели)"
+        (cache or self.response_cache).set(key, text)
+        return text
+
+    async def chat_stream(
+        self, *, system: str, user_message: str, context: list[dict] | None = None
+    ) -> AsyncIterator[str]:
+        """Same as chat(), but yields the reply in chunks as the model produces them."""
+        if self.provider == "disabled":
+            yield _DISABLED_CHAT_REPLY
+            return
+
+        messages, key = self._chat_request(system=system, user_message=user_message, context=context)
+        cached = self.response_cache.get(key)
+        namespace = self._semantic_namespace(system, context)
+        if cached is None and namespace is not None:
+            cached = self.semantic_cache.get(namespace, user_message)
+        if cached is not None:
+            yield cached
+            return
+
+        parts: list[str] = []
+        try:
+            await self._ensure_loaded()
+            async for chunk in self._scheduler.stream(
+                messages,
+                max_new_tokens=settings.hf_max_new_tokens,
+                temperature=settings.hf_temperature,
+                top_p=settings.hf_top_p,
+                priority=PRIORITY_INTERACTIVE,
+                timeout=settings.llm_chat_deadline_seconds,
+            ):
+                parts.append(chunk)
+                yield chunk
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            logger.exception("LLM chat stream failed")
+            raise LLMError(str(e)) from e
+
+        text = "".join(parts).strip()
+        if not text:
+            yield "(пустой ответ модели)"
+            return
+        self.response_cache.set(key, text)
+        if namespace is not None:
+            self.semantic_cache.set(namespace, user_message, text)
+
+    async def summarize_reviews(self, *, place_name: str, reviews: list[str]) -> str:
+        """Summarize reviews, map-reducing over token-budgeted chunks when they do not fit one prompt.
+
+        Reviews are expected oldest first, starting at a chunk boundary (see
+        summaries.load_review_texts), so a new review only changes the last
+        chunk; summaries of the other chunks come from the chunk cache.
+        SUMMARY_MODE=latest summarizes them in a single prompt.
+        """
+        if self.provider == "disabled":
+            return "(LLM отключена)"
+
+        budget = summary_chunk_budget()
+        chunks = chunk_reviews(reviews, budget)
+        if settings.summary_mode == "latest" or len(chunks) <= 1:
+            return await self._summarize(place_name, reviews, instruction=_SUMMARY_FINAL, cache=self.response_cache)
+
+        # Map: each chunk is summarized on its own; later rounds re-summarize partial summaries
+        partials = await self._summarize_chunks(place_name, chunks)
+        for _ in range(_MAX_REDUCE_ROUNDS):
+            chunks = chunk_reviews(partials, budget)
+            if len(chunks) <= 1:
+                break
+            if len(chunks) >= len(partials):
+                # Partials over budget one by one: merge them pairwise so every round shrinks the list
+                chunks = [partials[i : i + 2] for i in range(0, len(partials), 2)]
+            partials = await self._summarize_chunks(place_name, chunks)
+
+        # Reduce: merge the partial summaries into the final answer
+        return await self._summarize(place_name, partials, instruction=_SUMMARY_MERGE, cache=self.response_cache)
+
+    async def _summarize_chunks(self, place_name: str, chunks: list[list[str]]) -> list[str]:
+        # At most one batch worth of chunks in the queue at a time, so a large place cannot fill it
+        limiter = anyio.Semaphore(self._scheduler.max_batch_size)
+        results: list[str] = [""] * len(chunks)
+
+        async def one(i: int, chunk: list[str]) -> None:
+            async with limiter:
+                results[i] = await self._summarize(place_name, chunk, instruction=_SUMMARY_CHUNK, cache=self.chunk_cache)
+
+        async with anyio.create_task_group() as tg:
+            for i, chunk in enumerate(chunks):
+                tg.start_soon(one, i, chunk)
+        return results
+
+    async def _summarize(self, place_name: str, items: list[str], *, instruction: str, cache: TieredCache) -> str:
+        joined = "\n".join(f"- {r}" for r in items)
+        system = "Ты помощник, который кратко суммаризирует отзывы." \
+            " Пиши по-русски, без воды."
+        user_message = (
+            f"{instruction.format(place=place_name)}\n\n"
+            f"Отзывы:\n{joined}"
+        )
+
+        payload = {
+            "model": settings.hf_model_id,
+            "place": place_name,
+            "instruction": instruction,
+            "reviews_hash": hashlib.sha256(joined.encode("utf-8")).hexdigest(),
+            "max_new_tokens": min(256, settings.hf_max_new_tokens),
+            "temperature": 0.2,
+            "top_p": 0.9,
+        }
+        key = _cache_key("summary_chunk" if cache is self.chunk_cache else "summary", payload)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user_message},
+        ]
+        fn = partial(
+            self._generate,
+            key,
+            messages,
+            max_new_tokens=min(256, settings.hf_max_new_tokens),
+            temperature=0.2,
+            top_p=0.9,
+            priority=PRIORITY_BACKGROUND,
+            timeout=settings.llm_summary_deadline_seconds,
+            what="summary",
+            cache=cache,
+        )
+        return await self._flights.run(key, fn)
+
+
+class InferenceBackend(ABC):
+    """Engine behind LocalLLM, chosen by LLM_PROVIDER.
+
+    load() and run() block; they are called from worker threads or from an
+    inference worker process, never on the event loop.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def load(self) -> object:
+        """Load the model; the returned state is passed back to run()."""
+
+    @abstractmethod
+    def run(
+        self,
+        state: object,
+        batch: list[list[dict]],
+        params: GenParams,
+        on_text: TextCallback | None = None,
+    ) -> list[str]:
+        """Generate one reply per conversation; on_text streams the reply of a single-row batch."""
+
+    def describe(self, state: object) -> str:
+        return self.name
+
+
+class HFBackend(InferenceBackend):
+    """transformers + torch, on CPU or CUDA."""
+
+    name = "hf_local"
 
     @staticmethod
     def _pick_device() -> str:
@@ -73,28 +900,106 @@ class LocalLLM:
         except Exception:
             return "cpu"
 
-    @classmethod
-    def _load_sync(cls) -> _HFState:
+    @staticmethod
+    def _pick_precision(device: str) -> str:
+        wanted = (settings.hf_precision or "auto").lower().strip()
+        if wanted not in HF_PRECISIONS:
+            raise LLMError(f"Unknown HF_PRECISION: {wanted} (expected one of: {', '.join(HF_PRECISIONS)})")
+        if wanted == "auto":
+            return "fp16" if device == "cuda" else "fp32"
+        if wanted == "fp16" and device == "cpu":
+            raise LLMError("HF_PRECISION=fp16 is not supported on CPU, use bf16")
+        return wanted
+
+    def load(self) -> _HFState:
         # Heavy imports inside so app starts fast when LLM is disabled
         from transformers import AutoModelForCausalLM, AutoTokenizer
 
         import torch
 
-        device = cls._pick_device()
+        device = self._pick_device()
+        # Validate before downloading or loading any weights
+        precision = self._pick_precision(device)
 
-        # Dtype: fp16 on CUDA; fp32 on CPU
-        dtype = torch.float16 if device == "cuda" else torch.float32
+        load_kwargs: dict = {"low_cpu_mem_usage": True, "cache_dir": "weights"}
+        quantized_on_load = False
+        if precision in {"fp32", "bf16", "fp16"}:
+            load_kwargs["torch_dtype"] = {
+                "fp32": torch.float32,
+                "bf16": torch.bfloat16,
+                "fp16": torch.float16,
+            }[precision]
+        elif precision == "int4" or (precision == "int8" and device == "cuda"):
+            try:
+                import bitsandbytes  # noqa: F401
+                from transformers import BitsAndBytesConfig
+            except ImportError as e:
+                raise LLMError(f"HF_PRECISION={precision} requires the bitsandbytes package") from e
+
+            if precision == "int4":
+                quant_config = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=torch.bfloat16,
+                )
+            else:
+                quant_config = BitsAndBytesConfig(load_in_8bit=True)
+            load_kwargs["quantization_config"] = quant_config
+            load_kwargs["device_map"] = device
+            quantized_on_load = True
+        else:
+            # int8 on CPU: dynamic quantization of Linear weights after an fp32 load
+            load_kwargs["torch_dtype"] = torch.float32
 
         tokenizer = AutoTokenizer.from_pretrained(settings.hf_model_id, use_fast=True)
-        model = AutoModelForCausalLM.from_pretrained(
-            settings.hf_model_id,
-            torch_dtype=dtype,
+        model = AutoModelForCausalLM.from_pretrained(settings.hf_model_id, **load_kwargs)
+        model.eval()
+        if precision == "int8" and device == "cpu":
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if not quantized_on_load:
+            # bitsandbytes models are placed by device_map and cannot be moved
+            model.to(device)
+
+        draft_model = None
+        if settings.hf_draft_model_id:
+            draft_model = self._load_draft_sync(tokenizer, device)
+
+        prefix_cache = None
+        if settings.llm_prefix_cache_mb > 0:
+            prefix_cache = PrefixKVCache(settings.llm_prefix_cache_mb * 1024 * 1024)
+        return _HFState(
+            tokenizer=tokenizer,
+            model=model,
+            device=device,
+            precision=precision,
+            prefix_cache=prefix_cache,
+            draft_model=draft_model,
+        )
+
+    @staticmethod
+    def _load_draft_sync(tokenizer: object, device: str) -> object:
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        import torch
+
+        # Assisted generation verifies draft token ids directly, so both models must share a vocabulary
+        draft_tokenizer = AutoTokenizer.from_pretrained(settings.hf_draft_model_id, use_fast=True)
+        if draft_tokenizer.get_vocab() != tokenizer.get_vocab():
+            raise LLMError(
+                f"HF_DRAFT_MODEL_ID={settings.hf_draft_model_id} does not share the tokenizer of {settings.hf_model_id}"
+            )
+
+        draft = AutoModelForCausalLM.from_pretrained(
+            settings.hf_draft_model_id,
+            torch_dtype=torch.float16 if device == "cuda" else torch.float32,
             low_cpu_mem_usage=True,
-            cache_dir="weights"
+            cache_dir="weights",
         )
-        model.eval()
-        model.to(device)
-        return _HFState(tokenizer=tokenizer, model=model, device=device)
+        draft.eval()
+        draft.to(device)
+        draft.generation_config.num_assistant_tokens = settings.hf_draft_num_tokens
+        logger.info("Draft model ready: %s", settings.hf_draft_model_id)
+        return draft
 
     @staticmethod
     def _build_prompt(tokenizer: object, messages: list[dict]) -> str:
@@ -115,6 +1020,123 @@ class LocalLLM:
         parts.append("[ASSISTANT]\n")
         return "\n".join(parts)
 
+    @staticmethod
+    def _gen_kwargs(*, max_new_tokens: int, temperature: float, top_p: float) -> dict:
+        do_sample = temperature > 0
+        gen_kwargs = {
+            "max_new_tokens": int(max_new_tokens),
+            "do_sample": bool(do_sample),
+        }
+        if do_sample:
+            gen_kwargs.update(
+                {
+                    "temperature": float(temperature),
+                    "top_p": float(top_p),
+                }
+            )
+        return gen_kwargs
+
+    @staticmethod
+    def _make_streamer(tokenizer: object, on_text: TextCallback) -> object:
+        from transformers import TextStreamer
+
+        class _CallbackStreamer(TextStreamer):
+            def on_finalized_text(self, text: str, stream_end: bool = False) -> None:
+                if text:
+                    on_text(text)
+
+        return _CallbackStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+    @classmethod
+    def _prefix_lengths(cls, tokenizer: object, messages: list[dict], prompt: str, ids: list[int]) -> list[int]:
+        """Token lengths of reusable prompt prefixes, shortest first.
+
+        Boundaries are every blank line inside the system message and the end
+        of the system turn, kept only where the prefix tokenizes to exactly
+        the leading ids of the full prompt.
+        """
+        if not messages or messages[0].get("role") != "system":
+            return []
+        content = messages[0].get("content") or ""
+
+        apply = getattr(tokenizer, "apply_chat_template", None)
+        if callable(apply):
+            system_turn = apply(messages[:1], tokenize=False, add_generation_prompt=False)
+        else:
+            system_turn = cls._build_prompt(tokenizer, messages[:1])
+            system_turn = system_turn[: system_turn.rfind("[ASSISTANT]")]
+        start = system_turn.find(content)
+        if not content or start < 0 or not prompt.startswith(system_turn):
+            return []
+
+        cuts: list[int] = []
+        pos = content.find("\n\n")
+        while pos >= 0:
+            cuts.append(start + pos + 2)
+            pos = content.find("\n\n", pos + 2)
+        cuts.append(len(system_turn))
+
+        lengths: list[int] = []
+        for cut in cuts:
+            prefix_ids = list(tokenizer(prompt[:cut])["input_ids"])
+            n = len(prefix_ids)
+            if 0 < n < len(ids) and prefix_ids == ids[:n] and (not lengths or n > lengths[-1]):
+                lengths.append(n)
+        return lengths
+
+    @classmethod
+    def _prefix_past(cls, state: _HFState, messages: list[dict], prompt: str, input_ids: object) -> object | None:
+        """Past-key-values covering the longest known prefix, prefilling and caching missing ones."""
+        if state.prefix_cache is None:
+            return None
+        ids = input_ids[0].tolist()
+        lengths = cls._prefix_lengths(state.tokenizer, messages, prompt, ids)
+        return cls._cached_past(state, ids, lengths) if lengths else None
+
+    @classmethod
+    def _batch_prefix_past(
+        cls, state: _HFState, messages: list[dict], prompt: str, rows: list[list[int]]
+    ) -> tuple[int, object | None]:
+        """(length, past-key-values) of the longest prefix shared by every row, expanded to the batch size."""
+        if state.prefix_cache is None:
+            return 0, None
+        first = rows[0]
+        lengths = [
+            n
+            for n in cls._prefix_lengths(state.tokenizer, messages, prompt, first)
+            if all(len(r) > n and r[:n] == first[:n] for r in rows)
+        ]
+        if not lengths:
+            return 0, None
+        past = cls._cached_past(state, first, lengths)
+        past.batch_repeat_interleave(len(rows))
+        return lengths[-1], past
+
+    @staticmethod
+    def _cached_past(state: _HFState, ids: list[int], lengths: list[int]) -> object:
+        cache = state.prefix_cache
+        past: object | None = None
+        done = 0
+        for n in lengths:
+            hit = cache.get(ids[:n])
+            if hit is not None:
+                past, done = hit, n
+                continue
+
+            import torch
+            from transformers import DynamicCache
+
+            work = copy.deepcopy(past) if past is not None else DynamicCache()
+            with torch.inference_mode():
+                state.model(
+                    input_ids=torch.tensor([ids[done:n]], device=state.device), past_key_values=work, use_cache=True
+                )
+            cache.put(ids[:n], work)
+            past, done = work, n
+
+        # generate() extends the cache in place, so never hand it the cached copy
+        return copy.deepcopy(past)
+
     @classmethod
     def _generate_sync(
         cls,
@@ -124,6 +1146,7 @@ class LocalLLM:
         max_new_tokens: int,
         temperature: float,
         top_p: float,
+        on_text: TextCallback | None = None,
     ) -> str:
         import torch
 
@@ -135,119 +1158,148 @@ class LocalLLM:
         inputs = {k: v.to(state.device) for k, v in inputs.items()}
         input_len = inputs["input_ids"].shape[-1]
 
-        do_sample = temperature > 0
-        gen_kwargs = {
-            "max_new_tokens": int(max_new_tokens),
-            "do_sample": bool(do_sample),
-        }
-        if do_sample:
-            gen_kwargs.update(
-                {
-                    "temperature": float(temperature),
-                    "top_p": float(top_p),
-                }
-            )
+        gen_kwargs = cls._gen_kwargs(max_new_tokens=max_new_tokens, temperature=temperature, top_p=top_p)
+        if on_text is not None:
+            gen_kwargs["streamer"] = cls._make_streamer(tokenizer, on_text)
 
-        with torch.inference_mode():
-            out = model.generate(**inputs, **gen_kwargs)
+        calls = {"target": 0, "draft": 0}
+        hooks = []
+        if state.draft_model is not None:
+            # Assisted generation keeps its own caches, so the prefix cache is not used here
+            gen_kwargs["assistant_model"] = state.draft_model
+            hooks = [
+                model.register_forward_hook(lambda *_: calls.__setitem__("target", calls["target"] + 1)),
+                state.draft_model.register_forward_hook(lambda *_: calls.__setitem__("draft", calls["draft"] + 1)),
+            ]
+        else:
+            past = cls._prefix_past(state, messages, prompt, inputs["input_ids"])
+            if past is not None:
+                gen_kwargs["past_key_values"] = past
+
+        try:
+            with torch.inference_mode():
+                out = model.generate(**inputs, **gen_kwargs)
+        finally:
+            for h in hooks:
+                h.remove()
 
         new_tokens = out[0][input_len:]
+        if hooks:
+            cls._log_speculation(len(new_tokens), target_calls=calls["target"], draft_calls=calls["draft"])
         text = tokenizer.decode(new_tokens, skip_special_tokens=True)
         return (text or "").strip()
 
-    async def chat(self, *, system: str, user_message: str, context: list[dict] | None = None) -> str:
-        if self.provider == "disabled":
-            return (
-                "(LLM отключена) Я могу подобрать места по фильтрам. "
-                "Откройте /recommendations или /places?category=..."
-            )
+    @staticmethod
+    def _log_speculation(new_tokens: int, *, target_calls: int, draft_calls: int) -> None:
+        # Every target pass emits one token of its own; the rest were accepted draft tokens.
+        # Each draft forward proposes exactly one token.
+        accepted = max(0, new_tokens - target_calls)
+        rate = accepted / draft_calls if draft_calls else 0.0
+        logger.info(
+            "Speculative decoding: %s new tokens, %s target passes, %s/%s draft tokens accepted (%.0f%%)",
+            new_tokens,
+            target_calls,
+            accepted,
+            draft_calls,
+            rate * 100,
+        )
 
-        messages: list[dict] = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        if context:
-            messages.extend(context)
-        messages.append({"role": "user", "content": user_message})
+    @classmethod
+    def _generate_batch_sync(
+        cls,
+        state: _HFState,
+        batch: list[list[dict]],
+        *,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+    ) -> list[str]:
+        # Assisted generation only supports a batch of one, so with a draft model rows run one by one
+        if len(batch) == 1 or state.draft_model is not None:
+            return [
+                cls._generate_sync(
+                    state, messages, max_new_tokens=max_new_tokens, temperature=temperature, top_p=top_p
+                )
+                for messages in batch
+            ]
 
-        payload = {
-            "model": settings.hf_model_id,
-            "messages": messages,
-            "max_new_tokens": settings.hf_max_new_tokens,
-            "temperature": settings.hf_temperature,
-            "top_p": settings.hf_top_p,
-        }
-        key = _cache_key("chat", payload)
-        cached = _cache.get(key)
-        if cached is not None:
-            return cached
+        import torch
 
-        try:
-            state = await self._ensure_loaded()
-            fn = partial(
-                self._generate_sync,
-                state,
-                messages,
-                max_new_tokens=settings.hf_max_new_tokens,
-                temperature=settings.hf_temperature,
-                top_p=settings.hf_top_p,
-            )
-            text = await anyio.to_thread.run_sync(fn)
-        except Exception as e:
-            logger.exception("HF LLM chat failed")
-            raise LLMError(str(e)) from e
+        tokenizer = state.tokenizer
+        model = state.model
 
-        text = text.strip() or "(пустой ответ модели)"
-        _cache.set(key, text)
-        return text
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        pad = tokenizer.pad_token_id
 
-    async def summarize_reviews(self, *, place_name: str, reviews: list[str]) -> str:
-        if self.provider == "disabled":
-            return "(LLM отключена)"
+        prompts = [cls._build_prompt(tokenizer, m) for m in batch]
+        rows = [list(tokenizer(p)["input_ids"]) for p in prompts]
+        # Rows sharing a cached system prompt prefix start from its past-key-values and only prefill the rest
+        done, past = cls._batch_prefix_past(state, batch[0], prompts[0], rows)
 
-        joined = "\n".join(f"- {r}" for r in reviews)
-        system = "Ты помощник, который кратко суммаризирует отзывы." \
-            " Пиши по-русски, без воды."
-        user_message = (
-            f"Суммаризируй отзывы о месте '{place_name}'.\n"
-            "Сделай: 5–8 буллетов (плюсы/минусы) и общий вывод в 1 предложение.\n\n"
-            f"Отзывы:\n{joined}"
-        )
+        # Decoder-only models need left padding so every row continues from its own prompt;
+        # with a shared prefix the padding goes between the prefix and each row's own tokens
+        width = max(len(r) for r in rows) - done
+        input_ids = [r[:done] + [pad] * (width - len(r) + done) + r[done:] for r in rows]
+        attention_mask = [[1] * done + [0] * (width - len(r) + done) + [1] * (len(r) - done) for r in rows]
+        input_ids = torch.tensor(input_ids, device=state.device)
+        input_len = input_ids.shape[-1]
 
-        payload = {
-            "model": settings.hf_model_id,
-            "place": place_name,
-            "reviews_hash": hashlib.sha256(joined.encode("utf-8")).hexdigest(),
-            "max_new_tokens": min(256, settings.hf_max_new_tokens),
-            "temperature": 0.2,
-            "top_p": 0.9,
-        }
-        key = _cache_key("summary", payload)
-        cached = _cache.get(key)
-        if cached is not None:
-            return cached
+        gen_kwargs = cls._gen_kwargs(max_new_tokens=max_new_tokens, temperature=temperature, top_p=top_p)
+        gen_kwargs["pad_token_id"] = pad
+        if past is not None:
+            gen_kwargs["past_key_values"] = past
 
-        try:
-            state = await self._ensure_loaded()
-            messages = [
-                {"role": "system", "content": system},
-                {"role": "user", "content": user_message},
-            ]
-            fn = partial(
-                self._generate_sync,
-                state,
-                messages,
-                max_new_tokens=min(256, settings.hf_max_new_tokens),
-                temperature=0.2,
-                top_p=0.9,
+        with torch.inference_mode():
+            out = model.generate(
+                input_ids=input_ids, attention_mask=torch.tensor(attention_mask, device=state.device), **gen_kwargs
             )
-            text = await anyio.to_thread.run_sync(fn)
-        except Exception as e:
-            logger.exception("HF LLM summary failed")
-            raise LLMError(str(e)) from e
 
-        text = text.strip() or "(пустой ответ модели)"
-        _cache.set(key, text)
-        return text
+        texts = tokenizer.batch_decode(out[:, input_len:], skip_special_tokens=True)
+        return [(t or "").strip() for t in texts]
+
+    def run(
+        self,
+        state: _HFState,
+        batch: list[list[dict]],
+        params: GenParams,
+        on_text: TextCallback | None = None,
+    ) -> list[str]:
+        max_new_tokens, temperature, top_p = params
+        if on_text is not None:
+            return [
+                self._generate_sync(
+                    state,
+                    batch[0],
+                    max_new_tokens=max_new_tokens,
+                    temperature=temperature,
+                    top_p=top_p,
+                    on_text=on_text,
+                )
+            ]
+        return self._generate_batch_sync(
+            state, batch, max_new_tokens=max_new_tokens, temperature=temperature, top_p=top_p
+        )
+
+    def describe(self, state: _HFState) -> str:
+        return f"{settings.hf_model_id} ({state.device}, {state.precision})"
+
+
+# Imported on demand so optional engines cost nothing unless selected
+_BACKENDS = {
+    "hf_local": "app.services.llm:HFBackend",
+    "hf": "app.services.llm:HFBackend",
+    "llama_cpp": "app.services.llama_cpp:LlamaCppBackend",
+}
+
+
+def get_backend(provider: str) -> InferenceBackend:
+    # "package.module:Class" plugs in a backend that is not registered here
+    target = _BACKENDS.get(provider) or (provider if ":" in provider else None)
+    if target is None:
+        raise LLMError(f"Unknown LLM provider: {provider} (expected one of: {', '.join(_BACKENDS)}, disabled)")
+    module, _, name = target.partition(":")
+    return getattr(importlib.import_module(module), name)()
 
 
 llm = LocalLLM()
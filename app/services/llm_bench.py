@@ -0,0 +1,227 @@
+"""Load generator for LocalLLM: latency, time-to-first-token, throughput and memory.
+
+Drives LocalLLM.chat / chat_stream / summarize_reviews at a fixed concurrency
+with prompts built by the chat router, against either the configured model or
+StandInModel, a deterministic offline model with configurable latencies.
+Used by scripts/bench_llm.py and the `bench` pytest marker.
+"""
+from __future__ import annotations
+
+import hashlib
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+import anyio
+
+from app.core.config import settings
+from app.services.llm import GenParams, LocalLLM, TextCallback, approx_tokens
+
+WORKLOADS = ("chat", "stream", "summary")
+
+_WORDS = (
+    "уютное кафе рядом с центром хороший кофе вкусные десерты приятная музыка "
+    "недорого парк для прогулок музей современного искусства театр вечером рейтинг высокий"
+).split()
+
+_QUESTIONS = [
+    "Посоветуй уютное кафе для встречи с друзьями вечером.",
+    "Куда сходить с ребёнком в выходные, если идёт дождь?",
+    "Нужен недорогой спортзал рядом с центром, что выбрать?",
+    "Хочу провести романтический вечер: ресторан или театр?",
+    "Где можно вкусно позавтракать в субботу?",
+]
+
+_REVIEWS = [
+    "Очень вкусный кофе и свежая выпечка, персонал приветливый.",
+    "Долго ждали заказ, но еда того стоила.",
+    "Шумно по вечерам, зато отличная музыка и атмосфера.",
+    "Цены выше среднего, порции небольшие.",
+    "Лучшее место в районе, приходим всей семьёй каждую неделю.",
+]
+
+
+class StandInModel:
+    """Deterministic fake model: the reply depends only on the prompt, time is simulated with sleeps.
+
+    A batch costs one prefill for its longest prompt plus one decode step per
+    generated token; each extra row makes a step batch_overhead slower.
+    """
+
+    def __init__(
+        self,
+        *,
+        token_latency_ms: float = 20.0,
+        prefill_ms_per_token: float = 0.2,
+        batch_overhead: float = 0.1,
+    ) -> None:
+        self.token_latency_s = token_latency_ms / 1000.0
+        self.prefill_s_per_token = prefill_ms_per_token / 1000.0
+        self.batch_overhead = batch_overhead
+
+    @staticmethod
+    def reply_tokens(messages: list[dict], max_new_tokens: int) -> list[str]:
+        digest = hashlib.sha256(repr(messages).encode("utf-8")).digest()
+        # Between half and all of the budget, like a model that stops on EOS
+        n = max(1, max_new_tokens // 2 + digest[0] % (max_new_tokens // 2 + 1))
+        return [_WORDS[(digest[i % len(digest)] + i) % len(_WORDS)] for i in range(n)]
+
+    def __call__(self, batch: list[list[dict]], params: GenParams, on_text: TextCallback | None = None) -> list[str]:
+        max_new_tokens = params[0]
+        replies = [self.reply_tokens(messages, max_new_tokens) for messages in batch]
+        prompt_tokens = max(sum(approx_tokens(m["content"]) for m in messages) for messages in batch)
+        time.sleep(prompt_tokens * self.prefill_s_per_token)
+
+        step = self.token_latency_s * (1.0 + self.batch_overhead * (len(batch) - 1))
+        for i in range(max(len(r) for r in replies)):
+            time.sleep(step)
+            if on_text is not None and i < len(replies[0]):
+                on_text(("" if i == 0 else " ") + replies[0][i])
+        return [" ".join(r) for r in replies]
+
+
+@dataclass
+class BenchConfig:
+    workload: str = "chat"
+    requests: int = 32
+    concurrency: int = 8
+    candidates: int = 10
+    reviews: int = 40
+    # Identical prompts hit the response cache; off by default to measure the model
+    allow_cache_hits: bool = False
+
+
+def _candidates(n: int) -> list:
+    from app.models.places import Place
+
+    cats = ["Кафе", "Ресторан", "Музей", "Парк", "Театр"]
+    return [
+        Place(
+            id=i + 1,
+            name=f"Место {i + 1}",
+            category=cats[i % len(cats)],
+            city="Москва",
+            address=f"ул. Тверская, {i + 1}",
+            avg_rating=3.5 + (i % 3) * 0.5,
+            reviews_count=10 + i,
+        )
+        for i in range(n)
+    ]
+
+
+def build_chat_prompts(config: BenchConfig) -> list[tuple[str, str]]:
+    from app.models.users import UserProfile
+    from app.routers.chat import _build_system_prompt
+
+    profile = UserProfile(user_id="bench", city="Москва", preferred_categories="Кафе,Музей")
+    system = _build_system_prompt(profile=profile, candidates=_candidates(config.candidates))
+    prompts = []
+    for i in range(config.requests):
+        question = _QUESTIONS[i % len(_QUESTIONS)]
+        if not config.allow_cache_hits:
+            question = f"{question} (#{i})"
+        prompts.append((system, question))
+    return prompts
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(q / 100.0 * (len(ordered) - 1))))
+    return round(ordered[idx], 4)
+
+
+def _count_tokens(llm: LocalLLM, text: str) -> int:
+    tokenizer = getattr(llm._state, "tokenizer", None)
+    if tokenizer is not None:
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+    return len(text.split())
+
+
+def _describe(llm: LocalLLM) -> str:
+    if llm.provider == "custom":
+        return "stand-in"
+    if llm._state is not None:
+        return llm._backend.describe(llm._state)
+    # Out-of-process workers: the model lives elsewhere
+    return f"{llm.provider} (workers)"
+
+
+def _rss_peak_mb() -> float | None:
+    """Peak resident memory of this process; None where it cannot be measured."""
+    try:
+        import resource
+    except ImportError:
+        # Windows: no resource module, psutil reports the peak working set
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_benchmark(llm: LocalLLM, config: BenchConfig) -> dict:
+    if config.workload not in WORKLOADS:
+        raise ValueError(f"Unknown workload: {config.workload}")
+
+    prompts = build_chat_prompts(config)
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    tokens = 0
+    errors = 0
+    limiter = anyio.Semaphore(max(1, config.concurrency))
+
+    async def one(i: int) -> None:
+        nonlocal tokens, errors
+        system, question = prompts[i]
+        async with limiter:
+            started = time.perf_counter()
+            try:
+                if config.workload == "stream":
+                    parts: list[str] = []
+                    async for chunk in llm.chat_stream(system=system, user_message=question):
+                        if not parts:
+                            ttfts.append(time.perf_counter() - started)
+                        parts.append(chunk)
+                    text = "".join(parts)
+                elif config.workload == "summary":
+                    suffix = "" if config.allow_cache_hits else f" #{i}"
+                    reviews = [_REVIEWS[j % len(_REVIEWS)] + suffix for j in range(config.reviews)]
+                    text = await llm.summarize_reviews(place_name=f"Место {i % 10}", reviews=reviews)
+                else:
+                    text = await llm.chat(system=system, user_message=question)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+            tokens += _count_tokens(llm, text)
+
+    wall_started = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for i in range(config.requests):
+            tg.start_soon(one, i)
+    wall = time.perf_counter() - wall_started
+
+    return {
+        "config": asdict(config),
+        "model": _describe(llm),
+        "provider": llm.provider,
+        "precision": getattr(llm._state, "precision", None),
+        "batch_max_size": settings.llm_batch_max_size,
+        "batch_window_ms": settings.llm_batch_window_ms,
+        "requests_ok": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 4),
+        "requests_per_s": round(len(latencies) / wall, 3) if wall else None,
+        "tokens_per_s": round(tokens / wall, 2) if wall else None,
+        "latency_p50_s": _percentile(latencies, 50),
+        "latency_p99_s": _percentile(latencies, 99),
+        "ttft_p50_s": _percentile(ttfts, 50),
+        "ttft_p99_s": _percentile(ttfts, 99),
+        "rss_peak_mb": _rss_peak_mb(),
+    }
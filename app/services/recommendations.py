@@ -3,8 +3,11 @@ from __future__ import annotations
 from sqlalchemy import desc, select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.places import Place
 from app.models.reviews import Review
+from app.services.columnar import load_places, places_catalog
+from app.services.geo import places_within
 
 
 def parse_categories(csv: str) -> list[str]:
@@ -23,10 +26,19 @@ def recommend_places(
     city: str | None = None,
     limit: int = 10,
     exclude_reviewed: bool = True,
+    near: tuple[float, float, float] | None = None,
 ) -> list[Place]:
+    """Best rated places; near=(lat, lon, radius_m) replaces the city filter with a radius."""
+    if settings.places_columnar and near is None:
+        reviewed = db.scalars(select(Review.place_id).where(Review.user_id == user_id)) if exclude_reviewed else None
+        ids = places_catalog.snapshot(db).matching(
+            city=city or None, categories=categories or None, exclude_ids=reviewed
+        )
+        return load_places(db, ids[:limit])
+
     q = select(Place)
 
-    if city:
+    if city and near is None:
         q = q.where(Place.city == city)
     if categories:
         q = q.where(Place.category.in_(categories))
@@ -35,5 +47,9 @@ def recommend_places(
         subq = select(Review.place_id).where(Review.user_id == user_id)
         q = q.where(~Place.id.in_(subq))
 
-    q = q.order_by(desc(Place.avg_rating), desc(Place.reviews_count), Place.name).limit(limit)
-    return list(db.scalars(q).all())
+    q = q.order_by(desc(Place.avg_rating), desc(Place.reviews_count), Place.name)
+    if near is not None:
+        lat, lon, radius_m = near
+        # Keep the rating order, distance only filters
+        return [p for p, _ in places_within(db, q, lat=lat, lon=lon, radius_m=radius_m, limit=limit)]
+    return list(db.scalars(q.limit(limit)).all())
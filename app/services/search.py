@@ -0,0 +1,127 @@
+"""Place name search backed by a real index.
+
+SQLite: an FTS5 table places_fts (rowid = places.id) over the normalized name,
+prefix matching per word and bm25 ranking. It is created and dropped with the
+places table (see app.models.places) and kept in sync on the write paths:
+ORM flushes of Place (events below) and insert_places. Startup reconciles it
+with the table, which also covers writes made outside the app.
+Postgres: a pg_trgm GIN index on the normalized name, ranked by similarity;
+without the extension, plain LIKE matching without relevance order.
+Names are normalized the same way on both sides: case folding and ё→е.
+"""
+from __future__ import annotations
+
+import logging
+import re
+
+from sqlalchemy import Connection, Engine, Select, and_, column, event, func, inspect, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models.places import PLACES_FTS_DDL, Place
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+_fts = table("places_fts", column("rowid"), column("name_norm"))
+
+# Set by setup_search: similarity() is only there with the pg_trgm extension
+_pg_trgm = False
+
+
+def normalize(text_: str) -> str:
+    return text_.casefold().replace("ё", "е")
+
+
+def _pg_norm(col):
+    return func.translate(func.lower(col), "Ёё", "ее")
+
+
+def setup_search(engine: Engine) -> None:
+    """Create the search index for an existing database."""
+    global _pg_trgm
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text(PLACES_FTS_DDL))
+            reconcile_search_index(conn)
+    elif engine.dialect.name == "postgresql":
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(
+                    text(
+                        "CREATE INDEX IF NOT EXISTS ix_places_name_trgm ON places "
+                        "USING gin (translate(lower(name), 'Ёё', 'ее') gin_trgm_ops)"
+                    )
+                )
+        except Exception:
+            logger.exception("pg_trgm search index is unavailable, name search will scan the table")
+        with engine.connect() as conn:
+            _pg_trgm = conn.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")) is not None
+
+
+def index_place_names(conn: Connection, rows) -> None:
+    """Add or replace the index entries of (id, name) rows (SQLite only)."""
+    params = [{"id": place_id, "name": normalize(name)} for place_id, name in rows]
+    if params and conn.dialect.name == "sqlite":
+        conn.execute(text("INSERT OR REPLACE INTO places_fts (rowid, name_norm) VALUES (:id, :name)"), params)
+
+
+def reconcile_search_index(conn: Connection) -> int:
+    """Make places_fts match places: drop entries of deleted places, (re)index missing and renamed ones.
+
+    Returns how many entries were written. A full pass, meant for startup.
+    """
+    conn.execute(text("DELETE FROM places_fts WHERE rowid NOT IN (SELECT id FROM places)"))
+    rows = conn.execute(
+        select(Place.id, Place.name, _fts.c.name_norm).outerjoin(_fts, _fts.c.rowid == Place.id)
+    ).all()
+    stale = [(place_id, name) for place_id, name, indexed in rows if indexed != normalize(name)]
+    index_place_names(conn, stale)
+    return len(stale)
+
+
+@event.listens_for(Place, "after_insert")
+def _index_inserted(mapper, connection: Connection, target: Place) -> None:
+    index_place_names(connection, [(target.id, target.name)])
+
+
+@event.listens_for(Place, "after_update")
+def _index_renamed(mapper, connection: Connection, target: Place) -> None:
+    if inspect(target).attrs.name.history.has_changes():
+        index_place_names(connection, [(target.id, target.name)])
+
+
+@event.listens_for(Place, "after_delete")
+def _unindex_deleted(mapper, connection: Connection, target: Place) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DELETE FROM places_fts WHERE rowid = :id"), {"id": target.id})
+
+
+def apply_search(db: Session, stmt: Select, q: str) -> tuple[Select, object | None]:
+    """Filter stmt to places matching q; also returns an ORDER BY clause putting the best matches first, if any."""
+    words = _WORD_RE.findall(normalize(q))
+    if not words:
+        return stmt, None
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        # Every word must match as a prefix of some word of the name
+        match = " ".join(f'"{w}"*' for w in words)
+        hits = (
+            select(_fts.c.rowid.label("place_id"), literal_column("bm25(places_fts)").label("rank"))
+            .select_from(_fts)
+            .where(_fts.c.name_norm.op("MATCH")(match))
+            .subquery()
+        )
+        return stmt.join(hits, hits.c.place_id == Place.id), hits.c.rank
+
+    if dialect == "postgresql":
+        name = _pg_norm(Place.name)
+        stmt = stmt.where(and_(*[name.like(f"%{w}%") for w in words]))
+        if not _pg_trgm:
+            return stmt, None
+        return stmt, func.similarity(name, " ".join(words)).desc()
+
+    name = func.lower(Place.name)
+    return stmt.where(and_(*[name.like(f"%{w}%") for w in words])), None
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset("в во на с со и а к у о об по за из от до для мне нам меня можно хочу".split())
+
+# Intent words that mean the same for place search, folded onto one feature
+_SYNONYMS = [
+    ("куда где", "куда"),
+    ("сходить пойти погулять посетить сходим пойдем погуляем провести", "сходить"),
+    ("дети детьми детей детский детская ребенок ребенком ребенка ребенку семьей семья", "дети"),
+    ("посоветуй посоветуйте подскажи подскажите порекомендуй порекомендуйте", "посоветуй"),
+    ("недорого недорогой недорогое дешево дешевый бюджетный", "недорого"),
+    ("поесть покушать перекусить", "поесть"),
+    ("вечером вечер вечернее", "вечер"),
+]
+
+
+def _stem(word: str) -> str:
+    # Crude but stable: Russian inflections mostly change the word ending
+    return word[:5] if len(word) > 5 else word
+
+
+_SYNONYM_STEMS = {_stem(w): target for words, target in _SYNONYMS for w in words.split()}
+
+
+def normalize(text: str) -> list[str]:
+    words = _WORD_RE.findall(text.casefold().replace("ё", "е"))
+    features = []
+    for w in words:
+        if w in _STOPWORDS:
+            continue
+        s = _stem(w)
+        features.append(_SYNONYM_STEMS.get(s, s))
+    return features
+
+
+class SemanticCache:
+    """Chat replies looked up by similarity of the user message instead of exact equality.
+
+    Messages are embedded with a signed hashing vectorizer over normalized word
+    stems. Entries are grouped by namespace (system prompt with its candidate
+    places and the conversation context), so a reply is only reused for the
+    same candidates. Namespaces are evicted LRU once max_items is exceeded.
+    """
+
+    def __init__(self, *, threshold: float = 0.9, max_items: int = 2048, per_namespace: int = 64, n_features: int = 4096) -> None:
+        self.threshold = threshold
+        self.max_items = max(1, int(max_items))
+        self.per_namespace = max(1, int(per_namespace))
+        self.n_features = n_features
+        self._lock = threading.Lock()
+        self._groups: OrderedDict[str, tuple[list[np.ndarray], list[str]]] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.n_features, dtype=np.float32)
+        for f in normalize(text):
+            h = zlib.crc32(f.encode("utf-8"))
+            vec[h % self.n_features] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, namespace: str, text: str) -> str | None:
+        vec = self.embed(text)
+        with self._lock:
+            group = self._groups.get(namespace)
+            if group is not None and vec.any():
+                vectors, replies = group
+                sims = np.stack(vectors) @ vec
+                best = int(sims.argmax())
+                if sims[best] >= self.threshold:
+                    self._groups.move_to_end(namespace)
+                    self.hits += 1
+                    return replies[best]
+            self.misses += 1
+            return None
+
+    def set(self, namespace: str, text: str, reply: str) -> None:
+        vec = self.embed(text)
+        if not vec.any():
+            return
+        with self._lock:
+            vectors, replies = self._groups.setdefault(namespace, ([], []))
+            self._groups.move_to_end(namespace)
+            vectors.append(vec)
+            replies.append(reply)
+            self._size += 1
+            if len(vectors) > self.per_namespace:
+                del vectors[0], replies[0]
+                self._size -= 1
+            while self._size > self.max_items and len(self._groups) > 1:
+                _, (old, _) = self._groups.popitem(last=False)
+                self._size -= len(old)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "entries": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+            self._size = 0
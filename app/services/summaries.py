@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+
+import anyio
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.places import Place
+from app.models.reviews import Review
+from app.models.summaries import ReviewSummary
+from app.services.extractive import extractive_summary
+from app.services.llm import LLMError, chunk_starts, llm, summary_chunk_budget
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_REVIEWS_LIMIT = 50
+
+
+def load_review_texts(db: Session, *, place_id: int, limit: int | None = None) -> list[str]:
+    """Review texts to summarize, oldest first.
+
+    latest mode takes the newest SUMMARY_REVIEWS_LIMIT reviews. map_reduce
+    mode takes up to summary_max_reviews (or limit) newest ones, but cut at a
+    chunk boundary of the whole review history: boundaries are computed from
+    text lengths starting at the first review, so they stay put as the window
+    slides and the chunk cache keeps hitting.
+    """
+    texts_q = select(Review.text).where(Review.place_id == place_id, Review.text.is_not(None), Review.text != "")
+    if settings.summary_mode != "map_reduce":
+        newest = texts_q.order_by(Review.created_at.desc(), Review.id.desc()).limit(limit or SUMMARY_REVIEWS_LIMIT)
+        return list(reversed(db.scalars(newest).all()))
+
+    limit = limit or settings.summary_max_reviews
+    order = (Review.created_at, Review.id)
+    lengths = list(db.scalars(texts_q.with_only_columns(func.length(Review.text)).order_by(*order)))
+    skip = 0
+    if len(lengths) > limit:
+        # The oldest chunk start that still leaves at most limit reviews
+        starts = chunk_starts(lengths, summary_chunk_budget())
+        skip = next((s for s in starts if len(lengths) - s <= limit), len(lengths) - limit)
+    return list(db.scalars(texts_q.order_by(*order).offset(skip)))
+
+
+def build_extractive_summary(db: Session, *, place_id: int) -> str | None:
+    """None when the place has no text reviews."""
+    counts = dict(
+        db.execute(
+            select(Review.rating, func.count()).where(Review.place_id == place_id).group_by(Review.rating)
+        ).all()
+    )
+    rows = db.execute(
+        select(Review.rating, Review.text)
+        .where(Review.place_id == place_id, Review.text.is_not(None), Review.text != "")
+        .order_by(Review.created_at.desc(), Review.id.desc())
+        .limit(settings.summary_max_reviews)
+    ).all()
+    if not rows:
+        return None
+    return extractive_summary([(rating, text) for rating, text in rows], rating_counts=counts)
+
+
+def is_stale(stored: ReviewSummary, place: Place) -> bool:
+    return place.reviews_count - stored.reviews_count >= settings.summary_refresh_min_reviews
+
+
+def store_summary(db: Session, *, place: Place, summary: str, reviews_count: int) -> ReviewSummary:
+    stored = db.get(ReviewSummary, place.id)
+    if stored is None:
+        stored = ReviewSummary(place_id=place.id)
+    stored.summary = summary
+    stored.reviews_count = reviews_count
+    stored.generated_at = datetime.utcnow()
+    db.add(stored)
+    db.commit()
+    return stored
+
+
+def can_persist() -> bool:
+    # Placeholder replies of a disabled LLM are not worth storing
+    return llm.provider != "disabled"
+
+
+class SummaryRefresher:
+    """Background worker regenerating stored review summaries that went stale.
+
+    Runs on the app's event loop; enqueue() is safe to call from the sync
+    handlers running in the threadpool.
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[int] | None = None
+        self._queued: set[int] = set()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._queued.clear()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        self._loop = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def enqueue(self, place_id: int) -> None:
+        loop = self._loop
+        if loop is None or not can_persist():
+            return
+        try:
+            loop.call_soon_threadsafe(self._put, place_id)
+        except RuntimeError:
+            pass
+
+    def _put(self, place_id: int) -> None:
+        if self._queue is None or place_id in self._queued:
+            return
+        self._queued.add(place_id)
+        self._queue.put_nowait(place_id)
+
+    async def _run(self) -> None:
+        while True:
+            place_id = await self._queue.get()
+            self._queued.discard(place_id)
+            try:
+                await refresh_summary(place_id)
+            except LLMError:
+                logger.warning("Summary refresh for place %s failed", place_id)
+            except Exception:
+                logger.exception("Summary refresh for place %s failed", place_id)
+
+
+async def refresh_summary(place_id: int) -> None:
+    def _load() -> tuple[str, int, list[str]] | None:
+        db = SessionLocal()
+        try:
+            place = db.get(Place, place_id)
+            if place is None:
+                return None
+            return place.name, place.reviews_count, load_review_texts(db, place_id=place_id)
+        finally:
+            db.close()
+
+    loaded = await anyio.to_thread.run_sync(_load)
+    if loaded is None:
+        return
+    name, reviews_count, texts = loaded
+    if not texts:
+        return
+
+    summary = await llm.summarize_reviews(place_name=name, reviews=texts)
+
+    def _store() -> None:
+        db = SessionLocal()
+        try:
+            place = db.get(Place, place_id)
+            if place is not None:
+                store_summary(db, place=place, summary=summary, reviews_count=reviews_count)
+        finally:
+            db.close()
+
+    await anyio.to_thread.run_sync(_store)
+    logger.info("Review summary refreshed for place %s", place_id)
+
+
+def refresh_if_stale(db: Session, *, place: Place) -> None:
+    stored = db.get(ReviewSummary, place.id)
+    if stored is not None and is_stale(stored, place):
+        summary_refresher.enqueue(place.id)
+
+
+summary_refresher = SummaryRefresher()
@@ -183,6 +183,49 @@ async function apiFetch(path, options={}){
   return data;
 }
 
+// POST JSON and consume a text/event-stream reply, calling onEvent(event, data) per message.
+async function apiStream(path, body, onEvent){
+  const headers = new Headers({ "Content-Type": "application/json", "Accept": "text/event-stream" });
+  if (state.token) headers.set("Authorization", `Bearer ${state.token}`);
+
+  const res = await fetch(apiUrl(path), { method:"POST", headers, body: JSON.stringify(body) });
+  if (!res.ok || !res.body){
+    const e = new Error(`HTTP ${res.status}`);
+    e.status = res.status;
+    e.data = await res.text().catch(()=> "");
+    throw e;
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+
+  const flush = (block) => {
+    let event = "message";
+    const data = [];
+    for (const line of block.split("\n")){
+      if (line.startsWith("event:")) event = line.slice(6).trim();
+      else if (line.startsWith("data:")) data.push(line.slice(5).replace(/^ /, ""));
+    }
+    if (!data.length) return;
+    let parsed;
+    try { parsed = JSON.parse(data.join("\n")); } catch { parsed = data.join("\n"); }
+    onEvent(event, parsed);
+  };
+
+  while (true){
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let idx;
+    while ((idx = buf.indexOf("\n\n")) >= 0){
+      flush(buf.slice(0, idx));
+      buf = buf.slice(idx + 2);
+    }
+  }
+  if (buf.trim()) flush(buf);
+}
+
 function openTab(name){
   $$(".nav").forEach(b => b.classList.toggle("active", b.dataset.tab === name));
   $$(".tab").forEach(t => t.classList.toggle("active", t.id === `tab-${name}`));
@@ -670,30 +713,85 @@ function renderChat(){
     return;
   }
 
-  for (const m of state.chat){
-    const row = document.createElement("div");
-    row.className = "msg " + (m.role === "user" ? "user" : "bot");
-    const bubble = document.createElement("div");
-    bubble.className = "bubble";
-    // Bot messages may contain Markdown formatting.
-    // User messages are also rendered safely (escaped), so formatting can't inject HTML.
-    bubble.innerHTML = `<div class="md">${renderMarkdownSafe(m.content)}</div>`;
-
-    const meta = document.createElement("div");
-    meta.className = "mmeta";
-    meta.textContent = m.role === "user" ? "Вы" : "Restify";
-
-    const wrap = document.createElement("div");
-    wrap.appendChild(bubble);
-    wrap.appendChild(meta);
-
-    row.appendChild(wrap);
-    log.appendChild(row);
+  for (const m of state.chat) log.appendChild(chatMessageNode(m));
+  log.scrollTop = log.scrollHeight;
+}
+
+function addChatMessage(m){
+  const log = $("#chatLog");
+  if (state.chat.length === 1) log.innerHTML = "";  // drop the placeholder
+  log.appendChild(chatMessageNode(m));
+  log.scrollTop = log.scrollHeight;
+}
+
+function chatMessageNode(m){
+  const row = document.createElement("div");
+  row.className = "msg " + (m.role === "user" ? "user" : "bot");
+  const bubble = document.createElement("div");
+  bubble.className = "bubble";
+  const md = document.createElement("div");
+  md.className = "md";
+  bubble.appendChild(md);
+
+  const places = document.createElement("div");
+  places.className = "chatplaces";
+
+  const meta = document.createElement("div");
+  meta.className = "mmeta";
+  meta.textContent = m.role === "user" ? "Вы" : "Restify";
+
+  const wrap = document.createElement("div");
+  wrap.appendChild(bubble);
+  wrap.appendChild(places);
+  wrap.appendChild(meta);
+  row.appendChild(wrap);
+
+  // Kept on the message so streaming updates touch only its own nodes
+  m.el = { md, places };
+  updateChatMessage(m);
+  renderChatPlaces(m);
+  return row;
+}
+
+function updateChatMessage(m){
+  // Bot messages may contain Markdown formatting.
+  // User messages are also rendered safely (escaped), so formatting can't inject HTML.
+  m.el.md.classList.remove("streaming");
+  m.el.md.innerHTML = renderMarkdownSafe(m.content);
+}
+
+function appendChatText(m, text, first){
+  // While streaming, tokens are appended as plain text; Markdown is rendered once at the end
+  const md = m.el.md;
+  if (first){
+    md.textContent = "";
+    md.classList.add("streaming");
   }
+  const last = md.lastChild;
+  if (last && last.nodeType === Node.TEXT_NODE) last.appendData(text);
+  else md.appendChild(document.createTextNode(text));
 
+  const log = $("#chatLog");
   log.scrollTop = log.scrollHeight;
 }
 
+function renderChatPlaces(m){
+  const box = m.el.places;
+  box.innerHTML = "";
+  const places = (m.places || []).map(pickPlace).filter(p => p.id !== null);
+  box.classList.toggle("hidden", !places.length);
+  for (const p of places){
+    const r = fmtRating(p.avg);
+    const btn = document.createElement("button");
+    btn.type = "button";
+    btn.className = "tag chatplace";
+    btn.textContent = r !== null ? `${p.name} · ${r} ★` : p.name;
+    btn.title = `${p.category} • ${p.city}`;
+    btn.addEventListener("click", () => openPlace(p));
+    box.appendChild(btn);
+  }
+}
+
 function autosize(ta){
   ta.style.height = "auto";
   ta.style.height = Math.min(ta.scrollHeight, 140) + "px";
@@ -705,22 +803,39 @@ async function onChat(e){
   const message = ta.value.trim();
   if (!message) return;
 
-  state.chat.push({ role:"user", content: message });
-  renderChat();
+  const user = { role:"user", content: message };
+  state.chat.push(user);
+  addChatMessage(user);
   ta.value = "";
   autosize(ta);
 
+  const bot = { role:"bot", content: "…", places: [] };
+  let started = false;
+  state.chat.push(bot);
+  addChatMessage(bot);
+
   try{
-    const data = await apiFetch("/chat", { method:"POST", body:{ message } });
-    const reply = typeof data === "string" ? data : (data.reply ?? data.message ?? pretty(data));
-    state.chat.push({ role:"bot", content: reply });
-    renderChat();
+    await apiStream("/chat/stream", { message }, (event, data) => {
+      if (event === "places"){
+        bot.places = data.places || [];
+        renderChatPlaces(bot);
+      } else if (event === "token"){
+        const text = data.text || "";
+        bot.content = (started ? bot.content : "") + text;
+        appendChatText(bot, text, !started);
+        started = true;
+      } else if (event === "error"){
+        bot.content = data.reply || "Не удалось получить ответ.";
+        started = true;
+      }
+    });
+    if (!started) bot.content = "(пустой ответ модели)";
   } catch (err){
     const msg = err.status === 401 ? "Пожалуйста, войдите в аккаунт, чтобы пользоваться чатом." : "Не удалось получить ответ.";
-    state.chat.push({ role:"bot", content: msg });
-    renderChat();
+    bot.content = msg;
     toast("Ошибка чата");
   }
+  updateChatMessage(bot);
 }
 
 /* INIT */
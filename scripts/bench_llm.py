@@ -0,0 +1,82 @@
+"""Benchmark LocalLLM under concurrent load.
+
+Measures latency p50/p99, time-to-first-token (stream workload), tokens/sec
+and peak RSS for chat, chat_stream and summarize_reviews. Runs against the
+configured model (--model real) or a deterministic offline stand-in with
+configurable per-token latency, so batching and caching changes can be
+compared on CI hardware without a GPU or network.
+
+Usage:
+    python scripts/bench_llm.py --workloads chat,stream,summary --concurrency 1,8 --out bench_llm.json
+    python scripts/bench_llm.py --model real --workloads chat --requests 16
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=["standin", "real"], default="standin")
+    parser.add_argument("--workloads", default="chat,stream,summary")
+    parser.add_argument("--concurrency", default="1,8", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--token-latency-ms", type=float, default=20.0)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.2)
+    parser.add_argument("--batch-overhead", type=float, default=0.1)
+    parser.add_argument("--cache-hits", action="store_true", help="repeat identical prompts")
+    parser.add_argument("--out", default="bench_llm.json")
+    args = parser.parse_args()
+
+    # Settings are read at import time; benchmark replies must not land in the app's disk cache
+    os.environ.setdefault("LLM_CACHE_PATH", "")
+    os.environ.setdefault("LLM_PROVIDER", "hf_local")
+    sys.path.insert(0, str(ROOT))
+
+    import anyio
+
+    from app.services.llm import LocalLLM
+    from app.services.llm_bench import BenchConfig, StandInModel, run_benchmark
+
+    reports = []
+    for workload in [w.strip() for w in args.workloads.split(",") if w.strip()]:
+        for concurrency in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+            # A fresh instance per run: no warm caches carried over between runs
+            if args.model == "standin":
+                llm = LocalLLM(
+                    runner=StandInModel(
+                        token_latency_ms=args.token_latency_ms,
+                        prefill_ms_per_token=args.prefill_ms_per_token,
+                        batch_overhead=args.batch_overhead,
+                    )
+                )
+            else:
+                llm = LocalLLM()
+                anyio.run(llm.preload)
+            config = BenchConfig(
+                workload=workload,
+                requests=args.requests,
+                concurrency=concurrency,
+                allow_cache_hits=args.cache_hits,
+            )
+            reports.append(anyio.run(run_benchmark, llm, config))
+
+    Path(args.out).write_text(json.dumps(reports, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    cols = ["workload", "concurrency", "requests_ok", "errors", "latency_p50_s", "latency_p99_s", "ttft_p50_s", "tokens_per_s"]
+    print(" | ".join(cols))
+    for r in reports:
+        row = {**r["config"], **r}
+        print(" | ".join(str(row.get(c)) for c in cols))
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
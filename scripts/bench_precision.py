@@ -0,0 +1,189 @@
+"""Compare HF_PRECISION modes of the local LLM against fp32.
+
+Each precision is loaded in its own subprocess so peak RSS is per mode.
+Reports load time, latency, tokens/sec, memory and quality versus the fp32
+outputs (exact-match rate, text similarity and perplexity of the fp32
+replies under the tested model).
+
+Usage:
+    python scripts/bench_precision.py --precisions fp32,bf16,int8,int4 --out bench_precision.json
+"""
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PROMPTS = [
+    "Посоветуй уютное кафе для встречи с друзьями вечером.",
+    "Куда сходить с ребёнком в выходные, если идёт дождь?",
+    "Нужен недорогой спортзал рядом с центром, что выбрать?",
+    "Хочу провести романтический вечер: ресторан или театр?",
+]
+SYSTEM = (
+    "Ты - ассистент для подбора мест отдыха и развлечений.\n"
+    "Отвечай по-русски, коротко и по делу."
+)
+
+
+def _rss_mb() -> float | None:
+    # Imported late: settings are read at import time, after run_worker has set HF_PRECISION
+    from app.services.llm_bench import _rss_peak_mb
+
+    return _rss_peak_mb()
+
+
+def _reference_nll(state, messages: list[dict], reference: str) -> tuple[float, int]:
+    import torch
+
+    from app.services.llm import HFBackend
+
+    tokenizer = state.tokenizer
+    prompt = HFBackend._build_prompt(tokenizer, messages)
+    prompt_ids = tokenizer(prompt, return_tensors="pt")["input_ids"]
+    ref_ids = tokenizer(reference, add_special_tokens=False, return_tensors="pt")["input_ids"]
+    if ref_ids.shape[-1] == 0:
+        return 0.0, 0
+
+    ids = torch.cat([prompt_ids, ref_ids], dim=-1).to(state.device)
+    with torch.inference_mode():
+        logits = state.model(input_ids=ids).logits.float()
+    start = prompt_ids.shape[-1]
+    pred = logits[0, start - 1 : -1]
+    nll = torch.nn.functional.cross_entropy(pred, ids[0, start:].to(pred.device), reduction="sum")
+    return float(nll), int(ref_ids.shape[-1])
+
+
+def run_worker(precision: str, max_new_tokens: int, reference_path: str | None) -> dict:
+    # Settings are read at import time, so the precision must be set first
+    os.environ["HF_PRECISION"] = precision
+    os.environ["LLM_PREFIX_CACHE_MB"] = "0"
+    sys.path.insert(0, str(ROOT))
+
+    from app.services.llm import HFBackend
+
+    started = time.perf_counter()
+    state = HFBackend().load()
+    load_s = time.perf_counter() - started
+    rss_after_load = _rss_mb()
+
+    footprint = getattr(state.model, "get_memory_footprint", None)
+    weights_mb = footprint() / (1024 * 1024) if callable(footprint) else None
+
+    outputs: list[str] = []
+    latencies: list[float] = []
+    new_tokens = 0
+    for text in PROMPTS:
+        messages = [{"role": "system", "content": SYSTEM}, {"role": "user", "content": text}]
+        t0 = time.perf_counter()
+        reply = HFBackend._generate_sync(
+            state, messages, max_new_tokens=max_new_tokens, temperature=0.0, top_p=1.0
+        )
+        latencies.append(time.perf_counter() - t0)
+        outputs.append(reply)
+        new_tokens += len(state.tokenizer(reply, add_special_tokens=False)["input_ids"])
+
+    report: dict = {
+        "precision": state.precision,
+        "device": state.device,
+        "load_s": round(load_s, 2),
+        "latency_mean_s": round(sum(latencies) / len(latencies), 3),
+        "latency_max_s": round(max(latencies), 3),
+        "tokens_per_s": round(new_tokens / sum(latencies), 2) if sum(latencies) else None,
+        "weights_mb": round(weights_mb, 1) if weights_mb is not None else None,
+        "rss_after_load_mb": rss_after_load,
+        "rss_peak_mb": _rss_mb(),
+        "outputs": outputs,
+    }
+
+    if reference_path:
+        references = json.loads(Path(reference_path).read_text(encoding="utf-8"))
+        nll_total, tok_total = 0.0, 0
+        for text, ref in zip(PROMPTS, references):
+            messages = [{"role": "system", "content": SYSTEM}, {"role": "user", "content": text}]
+            nll, n = _reference_nll(state, messages, ref)
+            nll_total += nll
+            tok_total += n
+        report["exact_match"] = round(sum(o == r for o, r in zip(outputs, references)) / len(references), 3)
+        report["similarity"] = round(
+            sum(difflib.SequenceMatcher(None, o, r).ratio() for o, r in zip(outputs, references)) / len(references),
+            3,
+        )
+        report["reference_ppl"] = round(math.exp(nll_total / tok_total), 3) if tok_total else None
+
+    return report
+
+
+def _spawn(precision: str, max_new_tokens: int, reference_path: str | None) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        out_path = f.name
+    cmd = [
+        sys.executable,
+        __file__,
+        "--worker",
+        precision,
+        "--max-new-tokens",
+        str(max_new_tokens),
+        "--worker-out",
+        out_path,
+    ]
+    if reference_path:
+        cmd += ["--reference", reference_path]
+    proc = subprocess.run(cmd, cwd=ROOT)
+    if proc.returncode != 0:
+        return {"precision": precision, "error": f"worker exited with code {proc.returncode}"}
+    return json.loads(Path(out_path).read_text(encoding="utf-8"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--precisions", default="fp32,bf16,int8,int4")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--out", default="bench_precision.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-out", help=argparse.SUPPRESS)
+    parser.add_argument("--reference", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        report = run_worker(args.worker, args.max_new_tokens, args.reference)
+        Path(args.worker_out).write_text(json.dumps(report, ensure_ascii=False), encoding="utf-8")
+        return 0
+
+    precisions = [p.strip() for p in args.precisions.split(",") if p.strip()]
+    if "fp32" in precisions:
+        precisions.remove("fp32")
+
+    reports = [_spawn("fp32", args.max_new_tokens, None)]
+    if "error" in reports[0]:
+        print(f"fp32 reference run failed: {reports[0]['error']}")
+        return 1
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+        json.dump(reports[0]["outputs"], f, ensure_ascii=False)
+        reference_path = f.name
+
+    for precision in precisions:
+        reports.append(_spawn(precision, args.max_new_tokens, reference_path))
+
+    Path(args.out).write_text(json.dumps(reports, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    cols = ["precision", "load_s", "latency_mean_s", "tokens_per_s", "weights_mb", "rss_peak_mb", "similarity", "reference_ppl"]
+    print(" | ".join(cols))
+    for r in reports:
+        print(" | ".join(str(r.get(c, r.get("error", "-"))) for c in cols))
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
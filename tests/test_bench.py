@@ -0,0 +1,43 @@
+import anyio
+import pytest
+
+from app.services.llm import LocalLLM
+from app.services.llm_bench import BenchConfig, StandInModel, run_benchmark
+
+pytestmark = pytest.mark.bench
+
+
+def test_stand_in_model_is_deterministic():
+    model = StandInModel(token_latency_ms=0, prefill_ms_per_token=0)
+    batch = [[{"role": "user", "content": "Привет"}], [{"role": "user", "content": "Пока"}]]
+    first = model(batch, (16, 0.7, 0.9))
+    assert first == model(batch, (16, 0.7, 0.9))
+    assert all(8 <= len(t.split()) <= 16 for t in first)
+
+
+@pytest.mark.parametrize("workload", ["chat", "stream", "summary"])
+def test_benchmark_report(workload):
+    llm = LocalLLM(runner=StandInModel(token_latency_ms=1, prefill_ms_per_token=0))
+    config = BenchConfig(workload=workload, requests=6, concurrency=3, reviews=5)
+    report = anyio.run(run_benchmark, llm, config)
+
+    assert report["model"] == "stand-in"
+    assert report["requests_ok"] == 6 and report["errors"] == 0
+    assert report["latency_p50_s"] <= report["latency_p99_s"]
+    assert report["tokens_per_s"] > 0
+    if workload == "stream":
+        assert report["ttft_p50_s"] <= report["latency_p50_s"]
+    else:
+        assert report["ttft_p50_s"] is None
+
+
+def test_rss_peak_without_the_resource_module(monkeypatch):
+    import sys
+
+    from app.services.llm_bench import _rss_peak_mb
+
+    assert _rss_peak_mb() > 0
+    # As on Windows without psutil: the report gets no memory figure instead of failing
+    monkeypatch.setitem(sys.modules, "resource", None)
+    monkeypatch.setitem(sys.modules, "psutil", None)
+    assert _rss_peak_mb() is None
@@ -0,0 +1,151 @@
+import time
+
+from app.services.cache import LRUCache, SQLiteCache, TieredCache
+from app.services.semantic_cache import SemanticCache
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    SQLiteCache(path).set("chat:1", "ответ")
+
+    assert SQLiteCache(path).get("chat:1") == "ответ"
+    assert SQLiteCache(path).get("chat:2") is None
+
+
+def test_sqlite_cache_expires_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=-1)
+    cache.set("k", "v")
+    assert cache.get("k") is None
+
+
+def test_sqlite_cache_evicts_least_recently_read(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "llm.sqlite3"), max_bytes=30)
+    cache.set("a", "x" * 9)
+    time.sleep(0.01)
+    cache.set("b", "x" * 9)
+    time.sleep(0.01)
+    assert cache.get("a") is not None
+    time.sleep(0.01)
+    cache.set("c", "x" * 9)
+    time.sleep(0.01)
+    cache.set("d", "x" * 9)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("d") is not None
+
+
+def test_sqlite_caches_in_one_file_keep_separate_budgets(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    replies = SQLiteCache(path, max_bytes=30)
+    chunks = SQLiteCache(path, table="summary_chunks", max_bytes=30)
+    replies.set("r", "x" * 9)
+    for i in range(5):
+        chunks.set(f"c{i}", "y" * 9)
+
+    # Filling one cache never evicts the other's entries
+    assert replies.get("r") == "x" * 9
+    assert chunks.get("c4") == "y" * 9 and chunks.get("c0") is None
+
+    # The running totals follow replaces, deletes and oversized writes
+    replies.set("r", "x" * 4)
+    replies.set("s", "x" * 9)
+    chunks.set("c4", "y" * 64)
+    assert chunks.get("c4") is None
+    for cache in (replies, chunks):
+        conn = cache._conn()
+        assert cache.total_bytes() == conn.execute(f"SELECT SUM(size) FROM {cache.table}").fetchone()[0]
+    assert replies.total_bytes() == 15
+    replies.clear()
+    assert replies.total_bytes() == 0
+
+
+def test_tiered_cache_fails_open_when_the_disk_tier_is_broken(tmp_path, caplog):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    corrupt = tmp_path / "corrupt.sqlite3"
+    corrupt.write_bytes(b"not a database" * 512)
+
+    for path in (blocker / "llm.sqlite3", corrupt):
+        cache = TieredCache(LRUCache(max_items=16), SQLiteCache(str(path)))
+        cache.set("k", "v")
+        assert cache.get("k") == "v"
+        assert cache.get("missing") is None
+        cache.clear()
+    assert "LLM disk cache write failed" in caplog.text
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "llm.sqlite3"))
+    disk.set("k", "v")
+    cache = TieredCache(LRUCache(max_items=16), disk)
+
+    assert cache.get("k") == "v"
+    assert cache.memory.get("k") == "v"
+
+
+def test_semantic_cache_matches_paraphrases_within_namespace():
+    cache = SemanticCache(threshold=0.9)
+    cache.set("kazan", "куда сходить с детьми в Казани", "Сходите в парк")
+
+    assert cache.get("kazan", "Где погулять с ребёнком в Казани?") == "Сходите в парк"
+    # Other candidate set, or a different question
+    assert cache.get("moscow", "куда сходить с детьми в Казани") is None
+    assert cache.get("kazan", "где вкусно поесть вечером в Казани") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["hit_rate"] == round(1 / 3, 4)
+    assert stats["threshold"] == 0.9
+
+
+def test_semantic_cache_evicts_least_recent_namespace():
+    cache = SemanticCache(max_items=2)
+    cache.set("a", "кафе в центре", "A")
+    cache.set("b", "музей в центре", "B")
+    cache.get("a", "кафе в центре")
+    cache.set("c", "парк в центре", "C")
+
+    assert cache.get("b", "музей в центре") is None
+    assert cache.get("a", "кафе в центре") == "A"
+    assert cache.stats()["entries"] == 2
+
+
+def test_lru_cache_evicts_least_recently_used_by_bytes():
+    cache = LRUCache(max_bytes=30, sizeof=lambda k, v: len(v))
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    cache.set("c", "z" * 10)
+    assert cache.get("a") == "x" * 10  # a is now most recent
+
+    cache.set("d", "w" * 10)
+    assert "b" not in cache
+    assert cache.get("a") and cache.get("c") and cache.get("d")
+
+    cache.set("huge", "h" * 31)
+    assert "huge" not in cache
+    # An oversized write must not leave the key's previous value behind
+    cache.set("a", "h" * 31)
+    assert "a" not in cache
+
+    stats = cache.stats()
+    assert stats.evictions == 1
+    assert stats.items == 2 and stats.bytes == 20
+    assert stats.hits == 4 and stats.misses == 0
+
+
+def test_lru_cache_sweeps_expired_entries_without_reads(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = LRUCache(ttl_seconds=10, sweep_batch=2)
+    for i in range(4):
+        cache.set(f"k{i}", "v")
+
+    now[0] += 11
+    assert cache.get("k0") is None
+    # Each call reclaims a bounded number of expired entries
+    assert len(cache) == 2
+    cache.set("fresh", "v")
+    assert len(cache) == 1
+    assert cache.stats().expirations == 4
+    assert cache.stats().misses == 1
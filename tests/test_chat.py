@@ -1,3 +1,5 @@
+import json
+
 from app.models.places import Place
 
 
@@ -31,3 +33,50 @@ def test_chat_grounding_returns_db_candidates(client, db):
 
     names = [p["name"] for p in body["places"]]
     assert names == ["Cafe A", "Cafe B"]
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_chat_stream_sends_places_then_tokens(client, db):
+    db.add_all(
+        [
+            Place(name="Cafe A", category="Кафе", city="Москва", address="Addr A", avg_rating=4.9, reviews_count=1),
+            Place(name="Cafe B", category="Кафе", city="Москва", address="Addr B", avg_rating=4.5, reviews_count=10),
+        ]
+    )
+    db.commit()
+
+    token = _register_get_token(client, email="stream@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    payload = {"message": "Хочу кафе", "city": "Москва", "category": "Кафе", "limit_places": 5}
+    r = client.post("/chat/stream", json=payload, headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_sse(r.text)
+    kinds = [e for e, _ in events]
+    assert kinds[0] == "places"
+    assert kinds[-1] == "done"
+    assert "token" in kinds
+    assert [p["name"] for p in events[0][1]["places"]] == ["Cafe A", "Cafe B"]
+
+
+def test_chat_returns_503_when_llm_overloaded(client, monkeypatch):
+    from app.services.llm import LLMOverloaded, llm
+
+    async def overloaded(**kwargs):
+        raise LLMOverloaded(7)
+
+    monkeypatch.setattr(llm, "chat", overloaded)
+
+    token = _register_get_token(client, email="busy@example.com")
+    r = client.post("/chat", json={"message": "Привет"}, headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 503, r.text
+    assert r.headers["Retry-After"] == "7"
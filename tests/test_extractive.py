@@ -0,0 +1,28 @@
+from app.services.extractive import extractive_summary, rank_sentences
+
+
+def test_rank_sentences_prefers_central_sentences():
+    sentences = [
+        "Вкусный кофе и свежая выпечка каждый день",
+        "Кофе вкусный, выпечка всегда свежая",
+        "Парковка платная и далеко от входа",
+        "Очень вкусный кофе рядом с метро",
+    ]
+    scores = rank_sentences(sentences)
+    assert scores.argmax() in (0, 1)
+    assert scores[2] == scores.min()
+
+
+def test_extractive_summary_rating_highlights_and_pros_cons():
+    reviews = [
+        (5, "Отличный сервис и вкусная еда. Официанты внимательные."),
+        (5, "Вкусная еда и быстрый сервис, вернёмся ещё."),
+        (1, "Ужасно шумно, музыка слишком громкая весь вечер."),
+    ]
+    summary = extractive_summary(reviews, rating_counts={5: 2, 1: 1, 3: 1})
+    lines = summary.splitlines()
+    assert lines[0] == "Средняя оценка 3.5 из 5 по 4 отзывам."
+    assert lines[1] == "Оценки: 5★ — 2, 4★ — 0, 3★ — 1, 2★ — 0, 1★ — 1."
+    assert "Чаще всего пишут:" in lines
+
+    assert extractive_summary([]) == ""
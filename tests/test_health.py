@@ -0,0 +1,21 @@
+def test_health_liveness(client):
+    r = client.get("/health")
+    assert r.status_code == 200, r.text
+    assert r.json() == {"status": "ok"}
+
+
+def test_health_ready_with_llm_disabled(client):
+    r = client.get("/health/ready")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["ready"] is True
+    assert body["database"] is True
+    assert body["llm"] == "disabled"
+
+
+def test_health_cache_stats(client):
+    r = client.get("/health/cache")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["semantic"] is None
+    assert set(body["llm_responses"]) >= {"hits", "misses", "evictions", "bytes"}
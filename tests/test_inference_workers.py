@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.inference_workers import WorkerPool
+from app.services.llm import InferenceBackend, LLMError
+
+# Spawned workers import the stub backends below by module name
+_HERE = f"{__name__}:"
+_PARAMS = (16, 0.0, 1.0)
+
+
+class StubBackend(InferenceBackend):
+    name = "stub"
+
+    def load(self) -> object:
+        return os.getpid()
+
+    def run(self, state, batch, params, on_text=None):
+        texts = []
+        for messages in batch:
+            content = messages[-1]["content"]
+            if content == "crash":
+                os._exit(3)
+            if content.startswith("sleep:"):
+                threading.Event().wait(float(content[6:]))
+            if content.startswith("touch:"):
+                open(content[6:], "w").close()
+            if on_text is not None:
+                on_text(content)
+            texts.append(f"{state}:{content}")
+        return texts
+
+
+class FailingBackend(StubBackend):
+    def load(self) -> object:
+        raise RuntimeError("no weights")
+
+
+class DyingBackend(StubBackend):
+    def load(self) -> object:
+        # Like an OOM kill: the process exits without reporting anything
+        os._exit(9)
+
+
+class SlowBackend(StubBackend):
+    def load(self) -> object:
+        threading.Event().wait(60)
+        return os.getpid()
+
+
+def _pool(backend: type, size: int = 1, **kwargs) -> WorkerPool:
+    return WorkerPool(size, provider=_HERE + backend.__name__, timeout_seconds=30, **kwargs)
+
+
+def _ask(pool: WorkerPool, text: str, on_text=None) -> str:
+    return pool.run([[{"role": "user", "content": text}]], _PARAMS, on_text)[0]
+
+
+def test_worker_pool_routes_replies_to_their_requests():
+    pool = _pool(StubBackend, size=2)
+    try:
+        pool.start()
+        results: dict[int, str] = {}
+
+        def ask(i: int) -> None:
+            results[i] = _ask(pool, f"q{i}")
+
+        threads = [threading.Thread(target=ask, args=(i,)) for i in range(12)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(30)
+        assert sorted(results) == list(range(12))
+        assert all(reply.endswith(f":q{i}") for i, reply in results.items())
+
+        chunks: list[str] = []
+        assert _ask(pool, "streamed", chunks.append).endswith(":streamed")
+        assert chunks == ["streamed"]
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.parametrize("backend, error", [(FailingBackend, "no weights"), (DyingBackend, "exited while loading")])
+def test_worker_pool_start_fails_when_loading_fails(backend, error):
+    pool = _pool(backend)
+    try:
+        with pytest.raises(LLMError, match=error):
+            pool.start()
+        assert not pool.started
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_start_times_out():
+    pool = _pool(SlowBackend, start_timeout_seconds=1)
+    try:
+        with pytest.raises(LLMError, match="did not load"):
+            pool.start()
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_survives_a_crashed_worker():
+    pool = _pool(StubBackend)
+    try:
+        pool.start()
+        first_pid = _ask(pool, "hello").split(":")[0]
+
+        with pytest.raises(LLMError, match="crashed"):
+            _ask(pool, "crash")
+
+        # The collector respawns the worker; the next request is served by the new process
+        pool.start()
+        reply = _ask(pool, "again")
+        assert reply.endswith(":again")
+        assert reply.split(":")[0] != first_pid
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_timeouts_kill_only_the_stuck_worker(tmp_path):
+    pool = WorkerPool(1, provider=_HERE + "StubBackend", timeout_seconds=1)
+    marker = tmp_path / "ran"
+    try:
+        pool.start()
+        errors: list[Exception] = []
+
+        def ask(text: str) -> None:
+            try:
+                _ask(pool, text)
+            except LLMError as e:
+                errors.append(e)
+
+        stuck = threading.Thread(target=ask, args=("sleep:30",))
+        stuck.start()
+        time.sleep(0.2)
+        # Queued behind the stuck request on the only worker: it times out without ever running
+        ask(f"touch:{marker}")
+        stuck.join(10)
+        assert [str(e) for e in errors] == ["Inference request timed out"] * 2
+
+        # The killed worker is respawned and serves again; the withdrawn request never ran
+        pool.timeout_seconds = 30
+        assert _ask(pool, "after").endswith(":after")
+        assert not marker.exists()
+    finally:
+        pool.shutdown()
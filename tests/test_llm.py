@@ -0,0 +1,439 @@
+import asyncio
+import threading
+
+import anyio
+import pytest
+
+from app.core.config import settings
+from app.services.llm import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    BatchScheduler,
+    HFBackend,
+    InferenceBackend,
+    LLMError,
+    LLMOverloaded,
+    LLMTimeout,
+    LocalLLM,
+    PrefixKVCache,
+    SingleFlight,
+    _HFState,
+    chunk_reviews,
+    get_backend,
+)
+
+
+def test_batch_scheduler_groups_concurrent_requests():
+    calls: list[int] = []
+    lock = threading.Lock()
+
+    def runner(batch, params, on_text):
+        with lock:
+            calls.append(len(batch))
+        return [f"{m[-1]['content']}:{params[0]}" for m in batch]
+
+    scheduler = BatchScheduler(runner, max_batch_size=4, window_ms=200)
+    results: dict[int, str] = {}
+
+    async def one(i: int) -> None:
+        msgs = [{"role": "user", "content": f"q{i}"}]
+        results[i] = await scheduler.submit(msgs, max_new_tokens=8, temperature=0.0, top_p=0.9)
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            for i in range(4):
+                tg.start_soon(one, i)
+
+    anyio.run(main)
+
+    assert results == {i: f"q{i}:8" for i in range(4)}
+    assert calls == [4]
+
+
+def test_batch_scheduler_propagates_errors():
+    def runner(batch, params, on_text):
+        raise RuntimeError("boom")
+
+    scheduler = BatchScheduler(runner, max_batch_size=2, window_ms=0)
+
+    async def main() -> str:
+        return await scheduler.submit([{"role": "user", "content": "x"}], max_new_tokens=8, temperature=0.0, top_p=0.9)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        anyio.run(main)
+
+
+def test_prefix_kv_cache_evicts_lru_by_bytes():
+    cache = PrefixKVCache(max_bytes=10, sizeof=len)
+    cache.put([1], "aaaa")
+    cache.put([2], "bbbb")
+    assert cache.get([1]) == "aaaa"
+
+    cache.put([3], "cccc")
+    assert cache.get([2]) is None
+    assert cache.get([1]) == "aaaa"
+    assert cache.get([3]) == "cccc"
+
+    cache.put([4], "x" * 11)
+    assert cache.get([4]) is None
+
+
+class _CharTokenizer:
+    def __call__(self, text):
+        return {"input_ids": [ord(c) for c in text]}
+
+
+def test_prefix_lengths_follow_system_prompt_paragraphs():
+    tok = _CharTokenizer()
+    system = "rules\n\nprofile\n\ncandidates"
+    messages = [{"role": "system", "content": system}, {"role": "user", "content": "hi"}]
+    prompt = HFBackend._build_prompt(tok, messages)
+    ids = tok(prompt)["input_ids"]
+
+    lengths = HFBackend._prefix_lengths(tok, messages, prompt, ids)
+
+    assert [prompt[:n] for n in lengths] == [
+        "[SYSTEM]\nrules\n\n",
+        "[SYSTEM]\nrules\n\nprofile\n\n",
+        f"[SYSTEM]\n{system}\n\n",
+    ]
+
+
+@pytest.mark.parametrize(
+    "new_tokens, target_calls, draft_calls, expected",
+    [
+        # 4 target passes emit 4 tokens, the other 6 were accepted out of 12 proposed
+        (10, 4, 12, "10 new tokens, 4 target passes, 6/12 draft tokens accepted (50%)"),
+        (5, 5, 8, "5 new tokens, 5 target passes, 0/8 draft tokens accepted (0%)"),
+        (3, 4, 0, "3 new tokens, 4 target passes, 0/0 draft tokens accepted (0%)"),
+    ],
+)
+def test_log_speculation_reports_acceptance_rate(caplog, new_tokens, target_calls, draft_calls, expected):
+    with caplog.at_level("INFO", logger="app.services.llm"):
+        HFBackend._log_speculation(new_tokens, target_calls=target_calls, draft_calls=draft_calls)
+    assert caplog.messages == [f"Speculative decoding: {expected}"]
+
+
+def test_batch_runs_row_by_row_with_a_draft_model(monkeypatch):
+    calls: list[tuple[str, dict]] = []
+
+    def generate_sync(cls, state, messages, **kwargs):
+        calls.append((messages[-1]["content"], kwargs))
+        return messages[-1]["content"].upper()
+
+    monkeypatch.setattr(HFBackend, "_generate_sync", classmethod(generate_sync))
+    state = _HFState(tokenizer=None, model=None, device="cpu", draft_model=object())
+    batch = [[{"role": "user", "content": c}] for c in ("a", "b", "c")]
+
+    # Assisted generation is batch-of-one only: no padded batch is built
+    assert HFBackend().run(state, batch, (16, 0.0, 1.0)) == ["A", "B", "C"]
+    assert [c for c, _ in calls] == ["a", "b", "c"]
+    assert all(kw == {"max_new_tokens": 16, "temperature": 0.0, "top_p": 1.0} for _, kw in calls)
+
+
+class _FakeKV:
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self.rows = 1
+
+    def batch_repeat_interleave(self, repeats: int) -> None:
+        self.rows *= repeats
+
+
+def test_batch_reuses_the_longest_prefix_shared_by_all_rows():
+    tok = _CharTokenizer()
+    batch = [
+        [{"role": "system", "content": f"rules\n\nprofile\n\n{c}"}, {"role": "user", "content": "hi"}]
+        for c in ("cafe", "museum")
+    ]
+    prompts = [HFBackend._build_prompt(tok, m) for m in batch]
+    rows = [tok(p)["input_ids"] for p in prompts]
+    cache = PrefixKVCache(1 << 20, sizeof=lambda kv: 1)
+    for n in HFBackend._prefix_lengths(tok, batch[0], prompts[0], rows[0]):
+        cache.put(rows[0][:n], _FakeKV(n))
+    state = _HFState(tokenizer=tok, model=None, device="cpu", prefix_cache=cache)
+
+    done, past = HFBackend._batch_prefix_past(state, batch[0], prompts[0], rows)
+
+    # The rows differ in the last paragraph, so the profile boundary is the longest shared one
+    assert prompts[0][:done] == "[SYSTEM]\nrules\n\nprofile\n\n"
+    assert past.n == done and past.rows == 2
+    # The cached entry itself is never expanded or handed to generate()
+    assert cache.get(rows[0][:done]).rows == 1
+
+
+def test_single_flight_coalesces_identical_calls():
+    calls = 0
+    flights = SingleFlight()
+    results: list[str] = []
+
+    async def generate() -> str:
+        nonlocal calls
+        calls += 1
+        await anyio.sleep(0.05)
+        return "summary"
+
+    async def one() -> None:
+        results.append(await flights.run("summary:1", generate))
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            for _ in range(5):
+                tg.start_soon(one)
+
+    anyio.run(main)
+
+    assert calls == 1
+    assert results == ["summary"] * 5
+    assert "summary:1" not in flights
+
+
+def test_pick_precision_validates_mode(monkeypatch):
+    monkeypatch.setattr(settings, "hf_precision", "auto")
+    assert HFBackend._pick_precision("cpu") == "fp32"
+    assert HFBackend._pick_precision("cuda") == "fp16"
+
+    monkeypatch.setattr(settings, "hf_precision", "BF16")
+    assert HFBackend._pick_precision("cpu") == "bf16"
+
+    monkeypatch.setattr(settings, "hf_precision", "fp16")
+    with pytest.raises(LLMError):
+        HFBackend._pick_precision("cpu")
+
+    monkeypatch.setattr(settings, "hf_precision", "int3")
+    with pytest.raises(LLMError):
+        HFBackend._pick_precision("cpu")
+
+
+def _blocking_runner(order: list[str], release: threading.Event):
+    def runner(batch, params, on_text):
+        release.wait(5)
+        order.extend(m[-1]["content"] for m in batch)
+        return ["ok"] * len(batch)
+
+    return runner
+
+
+def test_batch_scheduler_rejects_when_queue_full():
+    release = threading.Event()
+    scheduler = BatchScheduler(_blocking_runner([], release), max_batch_size=1, window_ms=0, max_queue=2)
+
+    async def submit(i: int) -> str:
+        return await scheduler.submit([{"role": "user", "content": str(i)}], max_new_tokens=8, temperature=0.0, top_p=0.9)
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(submit, 0)
+            await anyio.sleep(0.05)  # job 0 is running, the queue is empty
+            tg.start_soon(submit, 1)
+            tg.start_soon(submit, 2)
+            await anyio.sleep(0.05)
+            with pytest.raises(LLMOverloaded) as exc:
+                await submit(3)
+            assert exc.value.retry_after >= 1
+            release.set()
+
+    anyio.run(main)
+
+
+def test_batch_scheduler_serves_interactive_first_and_drops_expired():
+    order: list[str] = []
+    release = threading.Event()
+    scheduler = BatchScheduler(_blocking_runner(order, release), max_batch_size=1, window_ms=0)
+    errors: list[BaseException] = []
+
+    async def submit(name: str, priority: int, timeout: float | None = None) -> None:
+        try:
+            await scheduler.submit(
+                [{"role": "user", "content": name}],
+                max_new_tokens=8,
+                temperature=0.0,
+                top_p=0.9,
+                priority=priority,
+                timeout=timeout,
+            )
+        except LLMTimeout as e:
+            errors.append(e)
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(submit, "first", PRIORITY_INTERACTIVE)
+            await anyio.sleep(0.05)
+            tg.start_soon(submit, "summary", PRIORITY_BACKGROUND)
+            tg.start_soon(submit, "expired", PRIORITY_INTERACTIVE, 0.01)
+            tg.start_soon(submit, "chat", PRIORITY_INTERACTIVE)
+            await anyio.sleep(0.1)
+            release.set()
+
+    anyio.run(main)
+
+    assert order == ["first", "chat", "summary"]
+    assert len(errors) == 1
+
+
+def test_batch_scheduler_deadline_only_covers_the_queue():
+    order: list[str] = []
+    release = threading.Event()
+    scheduler = BatchScheduler(_blocking_runner(order, release), max_batch_size=1, window_ms=0)
+    results: dict[str, object] = {}
+
+    async def submit(name: str) -> None:
+        try:
+            results[name] = await scheduler.submit(
+                [{"role": "user", "content": name}], max_new_tokens=8, temperature=0.0, top_p=0.9, timeout=0.05
+            )
+        except LLMTimeout as e:
+            results[name] = e
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(submit, "running")
+            await anyio.sleep(0.02)
+            tg.start_soon(submit, "queued")
+            # The queued job times out while the running one is still busy
+            await anyio.sleep(0.2)
+            assert isinstance(results.get("queued"), LLMTimeout)
+            release.set()
+
+    anyio.run(main)
+
+    # The running job outlived its deadline and still got its result; the queued one never ran
+    assert results["running"] == "ok"
+    assert order == ["running"]
+
+
+def test_chunk_reviews_respects_budget_and_keeps_boundaries_stable():
+    reviews = [f"отзыв {i} " + "х" * (i * 7 % 40) for i in range(30)]
+    chunks = chunk_reviews(reviews, 40)
+
+    assert [r for c in chunks for r in c] == reviews
+    assert all(sum(len(r) // 3 + 1 for r in c) <= 40 for c in chunks if len(c) > 1)
+
+    # Appending a review only touches the last chunk
+    grown = chunk_reviews(reviews + ["новый отзыв"], 40)
+    assert grown[: len(chunks) - 1] == chunks[:-1]
+
+    assert chunk_reviews(["x" * 300], 40) == [["x" * 300]]
+    assert chunk_reviews([], 40) == []
+
+
+def test_summarize_reviews_honours_mode_and_always_converges(monkeypatch):
+    calls: list[str] = []
+
+    def runner(batch, params, on_text):
+        calls.extend(m[-1]["content"] for m in batch)
+        # Partial summaries longer than the whole chunk budget
+        return ["итог " * 600] * len(batch)
+
+    reviews = [f"отзыв {i} " + "очень длинный текст " * 40 for i in range(50)]
+
+    monkeypatch.setattr(settings, "summary_mode", "latest")
+    anyio.run(lambda: LocalLLM(runner=runner).summarize_reviews(place_name="Кафе", reviews=reviews))
+    assert len(calls) == 1
+
+    # A budget below the minimum is raised to it; oversized partials are merged pairwise
+    calls.clear()
+    monkeypatch.setattr(settings, "summary_mode", "map_reduce")
+    monkeypatch.setattr(settings, "summary_chunk_tokens", 10)
+    anyio.run(lambda: LocalLLM(runner=runner).summarize_reviews(place_name="Кафе", reviews=reviews))
+    chunks = len(chunk_reviews(reviews, 512))
+    assert chunks > 1
+    # Map calls, then at most halving reduce rounds, then the final merge
+    assert len(calls) <= 2 * chunks + 1
+
+
+def test_get_backend_by_provider():
+    assert isinstance(get_backend("hf_local"), HFBackend)
+    assert get_backend("llama_cpp").name == "llama_cpp"
+    with pytest.raises(LLMError):
+        get_backend("onnx-but-misspelled")
+
+    class Incomplete(InferenceBackend):
+        def load(self) -> object:
+            return None
+
+    # A backend must implement run() as well
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_chat_reuses_reply_for_similar_question(monkeypatch):
+    monkeypatch.setattr(settings, "semantic_cache_enabled", True)
+    calls: list[str] = []
+
+    def runner(batch, params, on_text):
+        calls.extend(m[-1]["content"] for m in batch)
+        return ["Парк Горького"] * len(batch)
+
+    llm = LocalLLM(runner=runner)
+
+    async def main():
+        first = await llm.chat(system="Кандидаты: [1] Парк", user_message="куда сходить с детьми в Казани")
+        second = await llm.chat(system="Кандидаты: [1] Парк", user_message="где погулять с ребёнком в Казани")
+        third = await llm.chat(system="Кандидаты: [2] Музей", user_message="где погулять с ребёнком в Казани")
+        return first, second, third
+
+    assert anyio.run(main) == ("Парк Горького",) * 3
+    assert len(calls) == 2
+    assert llm.semantic_cache.stats()["hits"] == 1
+
+
+def test_coalesced_chats_store_the_reply_once(monkeypatch):
+    monkeypatch.setattr(settings, "semantic_cache_enabled", True)
+    llm = LocalLLM(runner=lambda batch, params, on_text: ["Парк Горького"] * len(batch))
+
+    async def main():
+        return await asyncio.gather(
+            *(llm.chat(system="Кандидаты: [1] Парк", user_message="куда сходить с детьми") for _ in range(5))
+        )
+
+    assert anyio.run(main) == ["Парк Горького"] * 5
+    assert llm.semantic_cache.stats()["entries"] == 1
+
+
+def test_llama_cpp_backend_runs_a_stub_model(monkeypatch):
+    import sys
+    import types
+
+    from app.services.llama_cpp import LlamaCppBackend
+
+    class Llama:
+        def __init__(self, **kwargs):
+            self.init = kwargs
+            self.calls: list[dict] = []
+            self.cache = None
+
+        def set_cache(self, cache):
+            self.cache = cache
+
+        def create_chat_completion(self, *, messages, stream=False, **kwargs):
+            self.calls.append({"messages": messages, "stream": stream, **kwargs})
+            reply = f" ответ на {messages[-1]['content']} "
+            if not stream:
+                return {"choices": [{"message": {"role": "assistant", "content": reply}}]}
+            # The first delta carries only the role and the last one nothing, like llama.cpp's
+            deltas = [{"role": "assistant"}] + [{"content": w} for w in (" ответ", " на", f" {messages[-1]['content']}", " ")] + [{}]
+            return iter({"choices": [{"delta": d}]} for d in deltas)
+
+    module = types.SimpleNamespace(Llama=Llama, LlamaRAMCache=lambda capacity_bytes: ("ram", capacity_bytes))
+    monkeypatch.setitem(sys.modules, "llama_cpp", module)
+    monkeypatch.setattr(settings, "llama_model_path", "/models/q4.gguf")
+    monkeypatch.setattr(settings, "llama_n_threads", 3)
+    monkeypatch.setattr(settings, "llm_prefix_cache_mb", 2)
+
+    backend = LlamaCppBackend()
+    state = backend.load()
+    llama = state.llama
+    assert llama.init == {"model_path": "/models/q4.gguf", "n_ctx": settings.llama_n_ctx, "verbose": False, "n_threads": 3}
+    assert llama.cache == ("ram", 2 * 1024 * 1024)
+
+    batch = [[{"role": "system", "content": "s"}, {"role": "user", "content": q}] for q in ("a", "b")]
+    assert backend.run(state, batch, (64, 0.0, 0.9)) == ["ответ на a", "ответ на b"]
+    # Messages go through as is (llama.cpp applies the GGUF chat template), max_new_tokens maps to max_tokens
+    assert llama.calls[0] == {"messages": batch[0], "stream": False, "max_tokens": 64, "temperature": 0.0, "top_p": 0.9}
+
+    chunks: list[str] = []
+    assert backend.run(state, batch[:1], (8, 0.7, 1.0), chunks.append) == ["ответ на a"]
+    assert chunks == [" ответ", " на", " a", " "]
+    assert llama.calls[-1]["stream"] is True and llama.calls[-1]["max_tokens"] == 8
+    assert backend.describe(state) == "/models/q4.gguf (llama.cpp, cpu)"
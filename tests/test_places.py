@@ -1,3 +1,5 @@
+import pytest
+
 from app.models.places import Place
 
 
@@ -39,3 +41,435 @@ def test_places_search_and_pagination(client, db):
     body2 = r2.json()
     assert len(body2["items"]) == 1
     assert body2["items"][0]["id"] != body1["items"][0]["id"]
+
+
+def test_places_conditional_get(client, db):
+    _seed_places(db)
+
+    r = client.get("/places", params={"city": "Москва"})
+    assert r.status_code == 200, r.text
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+    assert "max-age" in r.headers["cache-control"]
+
+    r = client.get("/places", params={"city": "Москва"}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    place = db.query(Place).filter_by(name="Cafe Beta").one()
+    r = client.get(f"/places/{place.id}")
+    place_etag = r.headers["etag"]
+    assert client.get(f"/places/{place.id}", headers={"If-None-Match": place_etag}).status_code == 304
+    reviews_etag = client.get(f"/places/{place.id}/reviews").headers["etag"]
+
+    place.avg_rating = 4.2
+    db.commit()
+
+    assert client.get("/places", params={"city": "Москва"}, headers={"If-None-Match": etag}).status_code == 200
+    assert client.get(f"/places/{place.id}", headers={"If-None-Match": place_etag}).status_code == 200
+    assert client.get(f"/places/{place.id}/reviews", headers={"If-None-Match": reviews_etag}).status_code == 200
+
+
+def test_upgrade_schema_adds_new_columns(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+
+    from app.db.schema import upgrade_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE places (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, category VARCHAR(80) NOT NULL,"
+            " city VARCHAR(120) NOT NULL, address VARCHAR(250), description VARCHAR(1000), created_at DATETIME NOT NULL,"
+            " avg_rating FLOAT NOT NULL, reviews_count INTEGER NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO places (name, category, city, created_at, avg_rating, reviews_count)"
+            " VALUES ('Old', 'Кафе', 'Москва', '2024-01-01 00:00:00', 0, 0)"
+        ))
+
+    upgrade_schema(engine)
+
+    assert "updated_at" in {c["name"] for c in inspect(engine).get_columns("places")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT updated_at FROM places")).scalar() == "2024-01-01 00:00:00"
+
+
+def test_places_cursor_pagination_matches_offset(client, db):
+    _seed_places(db)
+    db.add(Place(name="Cafe Gamma", category="Кафе", city="Москва", address="Arbat 3", avg_rating=4.1, reviews_count=5))
+    db.commit()
+
+    expected = [x["id"] for x in client.get("/places", params={"limit": 100}).json()["items"]]
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/places", params=params).json()
+        seen.extend(x["id"] for x in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+    assert client.get("/places", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_places_search_is_russian_aware_and_ranked(client, db):
+    _seed_places(db)
+    db.add_all(
+        [
+            Place(name="Ёлки-Палки", category="Ресторан", city="Москва", address="Tverskaya 5", avg_rating=3.0),
+            Place(name="Кафе Ёлка", category="Кафе", city="Москва", address="Tverskaya 6", avg_rating=4.0),
+            Place(name="Елка", category="Кафе", city="Казань", address="Bauman 1", avg_rating=2.0),
+        ]
+    )
+    db.commit()
+
+    body = client.get("/places", params={"q": "ЕЛК"}).json()
+    assert body["total"] == 3
+    assert body["next_cursor"] is None
+    # The exact short name ranks first despite the lowest rating
+    assert body["items"][0]["name"] == "Елка"
+
+    body = client.get("/places", params={"q": "кафе ёлка"}).json()
+    assert [x["name"] for x in body["items"]] == ["Кафе Ёлка"]
+
+    assert client.get("/places", params={"q": "ёлка", "cursor": "abc"}).status_code == 400
+
+
+def test_places_total_modes_and_count_cache(client, db):
+    _seed_places(db)
+    params = {"city": "Москва", "limit": 1}
+
+    body = client.get("/places", params=params).json()
+    assert body["total"] == 3 and body["total_exact"] is True
+
+    body = client.get("/places", params={**params, "total": "none"}).json()
+    assert body["total"] is None and len(body["items"]) == 1
+
+    # A new place changes the catalog version, so the cached count is not reused as exact
+    db.add(Place(name="Museum", category="Музей", city="Москва", address="Kremlin 1"))
+    db.commit()
+    body = client.get("/places", params={**params, "total": "estimate"}).json()
+    assert body["total"] == 3 and body["total_exact"] is False
+    body = client.get("/places", params=params).json()
+    assert body["total"] == 4 and body["total_exact"] is True
+
+    assert client.get("/places", params={"total": "approx"}).status_code == 422
+
+
+def test_places_nearby_orders_by_distance(client, db):
+    from app.services.geo import encode_geohash
+
+    db.add_all(
+        [
+            # Distances from Red Square (55.7539, 37.6208): ~0.5 km, ~1.6 km, ~11 km
+            Place(name="Near", category="Кафе", city="Москва", lat=55.7575, lon=37.6150, avg_rating=3.0),
+            Place(name="Middle", category="Кафе", city="Москва", lat=55.7400, lon=37.6250, avg_rating=5.0),
+            Place(name="Far", category="Кафе", city="Москва", lat=55.8500, lon=37.6208, avg_rating=5.0),
+            Place(name="Nowhere", category="Кафе", city="Москва", avg_rating=5.0),
+        ]
+    )
+    db.commit()
+    db.add(Place(name="Core", category="Парк", city="Москва", lat=55.7540, lon=37.6209))
+    db.commit()
+
+    assert db.query(Place).filter_by(name="Near").one().geohash == encode_geohash(55.7575, 37.6150)
+    assert db.query(Place).filter_by(name="Core").one().geohash.startswith("ucfv0")
+    assert db.query(Place).filter_by(name="Nowhere").one().geohash is None
+
+    r = client.get("/places/nearby", params={"lat": 55.7539, "lon": 37.6208, "radius": 2000})
+    assert r.status_code == 200, r.text
+    items = r.json()["items"]
+    assert [x["name"] for x in items] == ["Core", "Near", "Middle"]
+    assert items[0]["distance_m"] < 20
+    assert 1400 < items[2]["distance_m"] < 1700
+
+    r = client.get("/places/nearby", params={"lat": 55.7539, "lon": 37.6208, "radius": 20000, "category": "Кафе", "min_rating": 4})
+    assert [x["name"] for x in r.json()["items"]] == ["Middle", "Far"]
+    assert client.get("/places/nearby", params={"lat": 95, "lon": 0}).status_code == 422
+
+
+def test_places_within_reads_pages_in_the_given_order(db):
+    from sqlalchemy import desc, event, select
+
+    from app.db.session import engine
+    from app.services.geo import places_within
+
+    # The best rated places sit in a corner of the box, outside the circle, and fill the first page
+    db.add_all(
+        [Place(name=f"Corner {i}", category="Кафе", city="Москва", address=str(i), lat=55.7659, lon=37.6418, avg_rating=5.0) for i in range(60)]
+        + [Place(name=f"Ring {i}", category="Кафе", city="Москва", lat=55.7539 + i / 10000, lon=37.6208, avg_rating=4 - i / 100) for i in range(100)]
+    )
+    db.commit()
+
+    reads = []
+
+    def count(conn, cursor, statement, *args):
+        reads.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        found = places_within(
+            db, select(Place).order_by(desc(Place.avg_rating)), lat=55.7539, lon=37.6208, radius_m=1500, limit=3
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert [p.name for p, _ in found] == ["Ring 0", "Ring 1", "Ring 2"]
+    assert found[0][1] < 1
+    # Two pages of 50 instead of all 160 rows of the box
+    assert len(reads) == 2 and all("LIMIT" in sql for sql in reads)
+
+
+def test_places_columnar_catalog_matches_sql(client, db, monkeypatch):
+    from app.core.config import settings
+    from app.services.columnar import places_catalog
+    from app.services.recommendations import recommend_places
+
+    _seed_places(db)
+    db.add_all(
+        [
+            Place(name="Cafe Gamma", category="Кафе", city="Москва", address="Arbat 3", avg_rating=4.1, reviews_count=5),
+            Place(name="Ёж", category="Кафе", city="Москва", address="Arbat 4", avg_rating=4.1, reviews_count=5),
+        ]
+    )
+    db.commit()
+
+    queries = [{}, {"city": "Москва"}, {"category": "Кафе", "min_rating": 4.2}, {"city": "Нигде"}, {"offset": 2, "limit": 2}]
+    expected = [client.get("/places", params=p).json() for p in queries]
+    expected_recs = [p.id for p in recommend_places(db, user_id="u", categories=["Кафе"], city="Москва")]
+
+    monkeypatch.setattr(settings, "places_columnar", True)
+    places_catalog.clear()
+    for params, body in zip(queries, expected):
+        assert client.get("/places", params=params).json() == body
+    assert [p.id for p in recommend_places(db, user_id="u", categories=["Кафе"], city="Москва")] == expected_recs
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        body = client.get("/places", params={"limit": 2, **({"cursor": cursor} if cursor else {})}).json()
+        seen.extend(x["id"] for x in body["items"])
+        if (cursor := body["next_cursor"]) is None:
+            break
+    assert seen == [x["id"] for x in expected[0]["items"]]
+
+    # Updates, inserts and deletes are picked up through the catalog version
+    beta = db.query(Place).filter_by(name="Cafe Beta").one()
+    beta.avg_rating = 5.0
+    db.add(Place(name="Cafe Delta", category="Кафе", city="Казань", avg_rating=1.0))
+    db.delete(db.query(Place).filter_by(name="Cinema One").one())
+    db.commit()
+
+    body = client.get("/places").json()
+    names = [x["name"] for x in body["items"]]
+    assert body["total"] == 6
+    assert names[0] == "Cafe Beta"
+    assert "Cafe Delta" in names and "Cinema One" not in names
+    assert len(places_catalog.snapshot(db)) == 6
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_places_deleting_an_older_place_changes_the_catalog(client, db, monkeypatch, columnar):
+    from app.core.config import settings
+    from app.services.columnar import places_catalog
+
+    monkeypatch.setattr(settings, "places_columnar", columnar)
+    places_catalog.clear()
+    _seed_places(db)
+    r = client.get("/places")
+    assert r.json()["total"] == 4
+    etag = r.headers["etag"]
+
+    # Not the newest place: max(id) and max(updated_at) stay the same
+    db.delete(db.query(Place).filter_by(name="Cafe Alpha").one())
+    db.commit()
+
+    r = client.get("/places", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["total"] == 3
+    assert len(body["items"]) == 3
+    assert "Cafe Alpha" not in [x["name"] for x in body["items"]]
+
+
+def test_places_fields_projection(client, db):
+    _seed_places(db)
+
+    full = client.get("/places", params={"city": "Москва"}).json()
+    # The fast path serializes like the response model does
+    first = full["items"][0]
+    assert client.get(f"/places/{first['id']}").json() == first
+
+    body = client.get("/places", params={"city": "Москва", "fields": "name, avg_rating", "limit": 2}).json()
+    assert body["items"] == [{"id": x["id"], "name": x["name"], "avg_rating": x["avg_rating"]} for x in full["items"][:2]]
+    assert body["total"] == 3
+    assert body["next_cursor"]
+
+    # The documented response model describes projected items too
+    from app.schemas.places import PlaceProjection, PlaceProjectionListResponse, PlaceResponse
+
+    assert PlaceProjectionListResponse.model_validate(body).items[0].reviews_count is None
+    assert list(PlaceProjection.model_fields) == list(PlaceResponse.model_fields)
+    schema = client.get("/openapi.json").json()["paths"]["/places"]["get"]["responses"]["200"]
+    assert schema["content"]["application/json"]["schema"]["$ref"].endswith("/PlaceProjectionListResponse")
+
+    r = client.get("/places", params={"fields": "name,password"})
+    assert r.status_code == 400
+    assert "password" in r.json()["detail"]
+
+
+def test_places_export_ndjson(client, db, monkeypatch):
+    import json
+    from datetime import datetime, timedelta
+
+    import app.routers.places as places_router
+
+    monkeypatch.setattr(places_router, "EXPORT_BATCH_SIZE", 2)
+    _seed_places(db)
+
+    r = client.get("/places/export")
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert len(lines) == 4
+    assert [x["updated_at"] for x in lines] == sorted(x["updated_at"] for x in lines)
+
+    r = client.get("/places/export", params={"city": "Москва", "fields": "name", "gzip": "true"})
+    # The client decompresses it transparently
+    assert r.headers["content-encoding"] == "gzip"
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(x["name"] for x in rows) == ["Cafe Alpha", "Cafe Beta", "Cinema One"]
+    assert set(rows[0]) == {"id", "name"}
+
+    # Incremental sync: only places updated at or after the last seen updated_at
+    since = lines[-1]["updated_at"]
+    place = db.query(Place).filter_by(name="Park Green").one()
+    place.updated_at = datetime.fromisoformat(since) + timedelta(seconds=1)
+    place.avg_rating = 4.0
+    db.commit()
+    r = client.get("/places/export", params={"updated_since": place.updated_at.isoformat()})
+    assert [json.loads(line)["name"] for line in r.text.splitlines()] == ["Park Green"]
+
+
+def test_insert_places_fills_geohash_per_row(db):
+    import anyio
+
+    from app.db.crud import insert_places
+    from app.services.geo import encode_geohash
+
+    places = [
+        Place(name=f"Place {i}", category="Кафе", city="Москва", address=f"Addr {i}", lat=55.7 + i / 100, lon=37.6)
+        for i in range(5)
+    ]
+    places.append(Place(name="No coords", category="Кафе", city="Москва", address="Addr x"))
+
+    assert anyio.run(insert_places, places) == 6
+    got = {p.name: p.geohash for p in db.query(Place).all()}
+    assert got == {
+        **{f"Place {i}": encode_geohash(55.7 + i / 100, 37.6) for i in range(5)},
+        "No coords": None,
+    }
+    # Already imported rows are skipped by the unique constraint
+    assert anyio.run(insert_places, places[:2]) == 0
+
+    moved = db.query(Place).filter_by(name="No coords").one()
+    moved.lat, moved.lon = 59.93, 30.31
+    db.commit()
+    assert moved.geohash == encode_geohash(59.93, 30.31)
+
+
+def test_startup_import_backfills_missing_coordinates(db, monkeypatch):
+    import anyio
+
+    from app.parsers import geoapify_importer
+    from app.services.geo import encode_geohash
+
+    # Imported before the coordinate columns existed
+    db.add_all([Place(name=f"Old {i}", category="Кафе", city="Москва", address=f"Addr {i}") for i in range(2)])
+    db.commit()
+    fetched = [
+        Place(name=f"Old {i}", category="Кафе", city="Москва", address=f"Addr {i}", lat=55.75 + i / 100, lon=37.62)
+        for i in range(2)
+    ]
+    calls = []
+
+    async def fetch_all_places():
+        calls.append(1)
+        return [Place(**{c: getattr(p, c) for c in ("name", "category", "city", "address", "lat", "lon")}) for p in fetched]
+
+    monkeypatch.setattr(geoapify_importer, "fetch_all_places", fetch_all_places)
+    anyio.run(geoapify_importer.import_places_on_startup)
+
+    db.expire_all()
+    got = {p.name: (p.lat, p.geohash) for p in db.query(Place).all()}
+    assert got == {f"Old {i}": (55.75 + i / 100, encode_geohash(55.75 + i / 100, 37.62)) for i in range(2)}
+    # Coordinates present now: nothing to refetch
+    anyio.run(geoapify_importer.import_places_on_startup)
+    assert len(calls) == 1
+
+
+def test_places_cursor_page_seeks_the_rating_index(db):
+    from sqlalchemy import select
+
+    from app.routers.places import _ORDER, _after_cursor
+
+    _seed_places(db)
+    page = select(Place).where(_after_cursor((4.5, 3, "Cafe", 7))).order_by(*_ORDER).limit(21)
+    sql = str(page.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = " ".join(row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    assert "SEARCH places USING INDEX ix_places_rating_order (avg_rating<?)" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_search_index_follows_writes_without_touching_reads(client, db):
+    import anyio
+    from sqlalchemy import text
+
+    from app.db.crud import insert_places
+    from app.db.session import engine
+    from app.services.search import reconcile_search_index
+
+    def names(q: str) -> list[str]:
+        return [x["name"] for x in client.get("/places", params={"q": q}).json()["items"]]
+
+    _seed_places(db)
+    anyio.run(insert_places, [Place(name="Чайхана Ёлка", category="Ресторан", city="Казань", address="Bauman 5")])
+    assert names("елка") == ["Чайхана Ёлка"]
+
+    alpha = db.query(Place).filter_by(name="Cafe Alpha").one()
+    alpha.name = "Bistro Alpha"
+    db.commit()
+    assert names("bistro") == ["Bistro Alpha"]
+    assert names("cafe") == ["Cafe Beta"]
+
+    db.delete(db.query(Place).filter_by(name="Cafe Beta").one())
+    db.commit()
+    assert names("cafe") == []
+
+    # Writes made behind the app's back are picked up by the startup reconcile
+    db.execute(text("UPDATE places SET name = 'Кофейня Вишня' WHERE name = 'Park Green'"))
+    db.commit()
+    assert names("вишня") == []
+    with engine.begin() as conn:
+        assert reconcile_search_index(conn) == 1
+    assert names("вишня") == ["Кофейня Вишня"]
+
+
+def test_postgres_search_without_pg_trgm_falls_back_to_like(monkeypatch):
+    from types import SimpleNamespace
+
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+
+    from app.services import search
+
+    db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()))
+    monkeypatch.setattr(search, "_pg_trgm", False)
+    stmt, order = search.apply_search(db, select(Place), "Ёлка")
+    assert order is None
+    assert "similarity" not in str(stmt.compile(dialect=postgresql.dialect()))
+
+    monkeypatch.setattr(search, "_pg_trgm", True)
+    assert search.apply_search(db, select(Place), "Ёлка")[1] is not None
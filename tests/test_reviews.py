@@ -0,0 +1,116 @@
+from app.models.places import Place
+from app.models.summaries import ReviewSummary
+
+
+def _register_get_token(client, email="reviews@example.com"):
+    r = client.post("/auth/register", json={"email": email, "password": "password123"})
+    assert r.status_code == 201, r.text
+    return r.json()["access_token"]
+
+
+def _seed_place(db):
+    place = Place(name="Cafe A", category="Кафе", city="Москва", address="Addr A")
+    db.add(place)
+    db.commit()
+    return place.id
+
+
+def test_summary_without_text_reviews(client, db):
+    place_id = _seed_place(db)
+    r = client.get(f"/places/{place_id}/reviews/summary")
+    assert r.status_code == 200, r.text
+    assert r.json()["summary"] == "Нет текстовых отзывов."
+
+
+def test_stored_summary_is_served_and_marked_stale(client, db):
+    place_id = _seed_place(db)
+    db.add(ReviewSummary(place_id=place_id, summary="Уютно и вкусно", reviews_count=0))
+    db.commit()
+
+    r = client.get(f"/places/{place_id}/reviews/summary")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["summary"] == "Уютно и вкусно"
+    assert body["stale"] is False
+    assert body["generated_at"]
+
+    token = _register_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(3):
+        rr = client.post(f"/places/{place_id}/reviews", json={"rating": 5, "text": f"Отзыв {i}"}, headers=headers)
+        assert rr.status_code == 201, rr.text
+
+    r = client.get(f"/places/{place_id}/reviews/summary")
+    body = r.json()
+    assert body["summary"] == "Уютно и вкусно"
+    assert body["stale"] is True
+
+
+def test_summary_is_extractive_until_the_llm_one_is_stored(client, db, monkeypatch):
+    from app.routers import reviews as reviews_router
+    from app.services.llm import llm
+
+    place_id = _seed_place(db)
+    token = _register_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    texts = [
+        (5, "Очень вкусный кофе и свежая выпечка. Персонал приветливый."),
+        (4, "Кофе вкусный, выпечка свежая, но бывает очередь по утрам."),
+        (2, "Долго ждали заказ, а столики были грязные."),
+    ]
+    for rating, text in texts:
+        rr = client.post(f"/places/{place_id}/reviews", json={"rating": rating, "text": text}, headers=headers)
+        assert rr.status_code == 201, rr.text
+
+    r = client.get(f"/places/{place_id}/reviews/summary")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["source"] == "extractive"
+    assert "Средняя оценка 3.7 из 5 по 3 отзывам." in body["summary"]
+    assert "- " in body["summary"]
+
+    # Even with the LLM ready the request never waits for a generation: it is queued instead
+    queued: list[int] = []
+    monkeypatch.setattr(llm, "status", "ready")
+    monkeypatch.setattr(llm, "summarize_reviews", None)
+    monkeypatch.setattr(reviews_router.summary_refresher, "enqueue", queued.append)
+    body = client.get(f"/places/{place_id}/reviews/summary").json()
+    assert body["source"] == "extractive"
+    assert queued == [place_id]
+
+
+def test_review_window_is_cut_at_stable_chunk_boundaries(db, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from app.core.config import settings
+    from app.models.reviews import Review
+    from app.models.users import UserAuth
+    from app.services.llm import chunk_reviews
+    from app.services.summaries import load_review_texts
+
+    monkeypatch.setattr(settings, "summary_mode", "map_reduce")
+    monkeypatch.setattr(settings, "summary_chunk_tokens", 512)
+    place_id = _seed_place(db)
+    start = datetime(2024, 1, 1)
+
+    def add(n: int, offset: int) -> None:
+        for i in range(offset, offset + n):
+            user = UserAuth(email=f"u{i}@example.com", password_hash="x")
+            db.add(user)
+            db.flush()
+            text = f"Отзыв {i}: " + "хорошо " * (i * 13 % 50 + 5)
+            db.add(Review(place_id=place_id, user_id=user.id, rating=4, text=text, created_at=start + timedelta(hours=i)))
+        db.commit()
+
+    history = [f"Отзыв {i}: " + "хорошо " * (i * 13 % 50 + 5) for i in range(140)]
+    add(120, 0)
+    before = chunk_reviews(load_review_texts(db, place_id=place_id, limit=60), 512)
+    for n in range(121, 141):
+        # The window slides one review at a time, yet always starts at a chunk boundary of the
+        # whole history, so its chunks are the history's own and stay cacheable
+        add(1, n - 1)
+        window = load_review_texts(db, place_id=place_id, limit=60)
+        after = chunk_reviews(window, 512)
+        assert 0 < len(window) <= 60
+        assert after == chunk_reviews(history[:n], 512)[-len(after):]
+    assert [c for c in after if c in before] == [c for c in before if c in after] != []